@@ -27,6 +27,8 @@ elif sys.version_info[:2] == (3, 3):
     install_requires.append("tornado>=4.2,<5.0")
 else:
     install_requires.append("tornado>=4.2")
+if sys.version_info[0] == 2:
+    install_requires.append("futures")
 
 setup(
     name='tornadis',
@@ -3,6 +3,12 @@
 
 import socket
 import unittest
+import hiredis
+import six
+import tornado.gen
+import tornado.iostream
+import tornado.tcpserver
+import tornado.testing
 
 
 try:
@@ -68,3 +74,60 @@ class FakeSocketObject(object):
 
     def send(self, *args, **kwargs):
         return self.__socket.send(*args, **kwargs)
+
+
+def unused_port():
+    sock, port = tornado.testing.bind_unused_port()
+    sock.close()
+    return port
+
+
+def encode_reply(reply):
+    if isinstance(reply, Exception):
+        return b"-" + str(reply).encode() + b"\r\n"
+    if isinstance(reply, six.integer_types):
+        return b":" + str(reply).encode() + b"\r\n"
+    if isinstance(reply, six.text_type):
+        reply = reply.encode()
+    if isinstance(reply, six.binary_type):
+        return b"$" + str(len(reply)).encode() + b"\r\n" + reply + b"\r\n"
+    return b"*" + str(len(reply)).encode() + b"\r\n" + \
+        b"".join(encode_reply(x) for x in reply)
+
+
+class FakeRedisServer(tornado.tcpserver.TCPServer):
+    """Minimal redis protocol server (handle_command() must be overridden).
+
+    handle_command() returns the reply (an Exception object for errors,
+    None for no reply at all).
+    """
+
+    def __init__(self):
+        tornado.tcpserver.TCPServer.__init__(self)
+        sock, self.port = tornado.testing.bind_unused_port()
+        self.add_sockets([sock])
+        self.commands = []
+
+    @tornado.gen.coroutine
+    def handle_stream(self, stream, address):
+        reader = hiredis.Reader()
+        try:
+            while True:
+                data = yield stream.read_bytes(65536, partial=True)
+                reader.feed(data)
+                while True:
+                    command = reader.gets()
+                    if command is False:
+                        break
+                    self.commands.append(command)
+                    reply = self.handle_command(stream, command)
+                    if reply is not None:
+                        stream.write(encode_reply(reply))
+        except tornado.iostream.StreamClosedError:
+            self.on_close(stream)
+
+    def handle_command(self, stream, command):
+        raise NotImplementedError()
+
+    def on_close(self, stream):
+        pass
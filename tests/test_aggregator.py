@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+
+from tornadis.client import Client
+from tornadis.pool import ClientPool
+from tornadis.aggregator import WriteBehindAggregator
+from tornadis.exceptions import ConnectionError
+from support import mock, test_redis_or_raise_skiptest
+
+
+class WriteBehindAggregatorTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(WriteBehindAggregatorTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.testing.gen_test
+    def test_flush(self):
+        c = Client()
+        yield c.call("DEL", "test_agg_incr", "test_agg_hash", "test_agg_hll")
+        agg = WriteBehindAggregator(c, interval=60)
+        for i in range(0, 1000):
+            agg.incrby("test_agg_incr", 2)
+            agg.hincrby("test_agg_hash", "field%i" % (i % 2))
+            agg.pfadd("test_agg_hll", "e%i" % (i % 10))
+        self.assertEqual(agg.pending, 13)
+        res = yield c.call("EXISTS", "test_agg_incr")
+        self.assertEqual(res, 0)
+        res = yield agg.close()
+        self.assertTrue(res)
+        self.assertEqual(agg.pending, 0)
+        res = yield c.call("GET", "test_agg_incr")
+        self.assertEqual(res, b"2000")
+        res = yield c.call("HGETALL", "test_agg_hash")
+        self.assertEqual(res, [b"field0", b"500", b"field1", b"500"])
+        res = yield c.call("PFCOUNT", "test_agg_hll")
+        self.assertEqual(res, 10)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_triggers(self):
+        pool = ClientPool(max_size=1)
+        yield pool.call("DEL", "test_agg_trigger1", "test_agg_trigger2")
+        agg = WriteBehindAggregator(pool, interval=0.05, max_pending=2)
+        agg.incrby("test_agg_trigger1", 5)
+        yield tornado.gen.sleep(0.2)
+        res = yield pool.call("GET", "test_agg_trigger1")
+        self.assertEqual(res, b"5")
+        agg.close()
+        agg = WriteBehindAggregator(pool, interval=60, max_pending=2)
+        agg.incrby("test_agg_trigger1", 1)
+        agg.incrby("test_agg_trigger2", 1)
+        yield tornado.gen.sleep(0.1)
+        res = yield pool.call("MGET", "test_agg_trigger1", "test_agg_trigger2")
+        self.assertEqual(res, [b"6", b"1"])
+        yield agg.close()
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_single_background_flush(self):
+        c = Client()
+        keys = ["test_agg_single%i" % i for i in range(0, 100)]
+        agg = WriteBehindAggregator(c, interval=60, max_pending=2)
+        with mock.patch.object(agg, "flush", wraps=agg.flush) as flush:
+            for key in keys:
+                agg.incrby(key)
+            yield tornado.gen.sleep(0.1)
+            self.assertEqual(flush.call_count, 1)
+        self.assertEqual(agg.pending, 0)
+        res = yield c.call("DEL", *keys)
+        self.assertEqual(res, 100)
+        yield agg.close()
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_flush_error(self):
+        c = Client(port=11111, reconnect_attempts=1)
+        agg = WriteBehindAggregator(c, interval=60)
+        agg.incrby("test_agg_error")
+        res = yield agg.close()
+        self.assertTrue(isinstance(res, ConnectionError))
+        self.assertEqual(agg.pending, 0)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+
+from tornadis.client import Client
+from tornadis.exceptions import ConnectionError
+from support import test_redis_or_raise_skiptest
+
+
+class BulkWriterTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(BulkWriterTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.testing.gen_test
+    def test_bulk_writer(self):
+        c = Client()
+        yield c.connect()
+        yield c.call("DEL", "test_bulk_writer")
+        writer = c.bulk_writer(flush_size=1024)
+        for i in range(0, 1000):
+            writer.call("INCR", "test_bulk_writer")
+        writer.flush()
+        future = c.call("GET", "test_bulk_writer")
+        for i in range(0, 1000):
+            writer.call("INCR", "test_bulk_writer")
+        res = yield writer.finish()
+        self.assertTrue(res)
+        self.assertEqual(writer.stacked_calls, 0)
+        res = yield future
+        self.assertEqual(res, b"1000")
+        res = yield c.call("GET", "test_bulk_writer")
+        self.assertEqual(res, b"2000")
+        self.assertEqual(len(c._Client__callback_queue), 0)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_bulk_writer_flush(self):
+        c = Client()
+        yield c.connect()
+        writer = c.bulk_writer()
+        res = yield writer.flush()
+        self.assertTrue(res)
+        writer.call("SET", "test_bulk_writer_flush", "foo")
+        writer.call("BADCOMMAND")
+        res = yield writer.flush()
+        self.assertTrue(res)
+        res = yield c.call("GET", "test_bulk_writer_flush")
+        self.assertEqual(res, b"foo")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_bulk_writer_autoconnect(self):
+        c = Client()
+        writer = c.bulk_writer()
+        writer.call("SET", "test_bulk_writer_autoconnect", "foo")
+        res = yield writer.finish()
+        self.assertTrue(res)
+        res = yield c.call("GET", "test_bulk_writer_autoconnect")
+        self.assertEqual(res, b"foo")
+        c.disconnect()
+        c = Client(port=11111)
+        writer = c.bulk_writer()
+        writer.call("PING")
+        res = yield writer.finish()
+        self.assertTrue(isinstance(res, ConnectionError))
+        self.assertEqual(writer.stacked_calls, 1)
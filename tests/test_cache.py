@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+import unittest
+import time
+import json
+
+from tornadis.pool import ClientPool
+from tornadis.cache import TwoTierCache, LocalCache
+from support import test_redis_or_raise_skiptest
+
+
+class LocalCacheTestCase(unittest.TestCase):
+
+    def test_lru(self):
+        cache = LocalCache(max_bytes=10)
+        cache.set("a", b"1234", time.time() + 60)
+        cache.set("b", b"1234", time.time() + 60, "extra")
+        self.assertEqual(cache.get("a"), (b"1234", None))
+        cache.set("c", b"1234", time.time() + 60)
+        # b is the least recently used entry
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.size, 8)
+        cache.set("d", b"12345678901", time.time() + 60)
+        self.assertEqual(cache.get("d"), None)
+        cache.set("a", b"1", time.time() - 1)
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.size, 4)
+
+    def test_nested_size(self):
+        cache = LocalCache(max_bytes=1000)
+        value = [b"x" * 600, [b"y" * 600]]
+        # (nested elements are counted)
+        cache.set("a", value, time.time() + 60)
+        self.assertEqual(cache.get("a"), None)
+        cache.set("b", {b"f": b"z" * 100}, time.time() + 60)
+        self.assertTrue(cache.size > 100)
+
+
+class TwoTierCacheTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(TwoTierCacheTestCase, self).setUp()
+        self.computed = 0
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.gen.coroutine
+    def _compute(self):
+        self.computed += 1
+        yield tornado.gen.sleep(0.05)
+        raise tornado.gen.Return(b"value")
+
+    @tornado.testing.gen_test
+    def test_get(self):
+        pool = ClientPool(max_size=2)
+        yield pool.call("DEL", "test_cache_get")
+        cache = TwoTierCache(pool, ttl=10, beta=0)
+        res = yield [cache.get("test_cache_get", self._compute)
+                     for _ in range(0, 10)]
+        self.assertEqual(res, [b"value"] * 10)
+        self.assertEqual(self.computed, 1)
+        res = yield pool.call("HGET", "test_cache_get", "v")
+        self.assertEqual(res, b"value")
+        # L2 hit
+        cache.local_cache.clear()
+        res = yield cache.get("test_cache_get", self._compute)
+        self.assertEqual(res, b"value")
+        self.assertEqual(self.computed, 1)
+        yield cache.invalidate("test_cache_get")
+        res = yield cache.get("test_cache_get", self._compute)
+        self.assertEqual(self.computed, 2)
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_early_refresh(self):
+        pool = ClientPool(max_size=2)
+        yield pool.call("DEL", "test_cache_early")
+        # with a huge beta, values are always recomputed early
+        cache = TwoTierCache(pool, ttl=10, beta=1000000)
+        yield cache.get("test_cache_early", self._compute)
+        res = yield [cache.get("test_cache_early", self._compute)
+                     for _ in range(0, 10)]
+        self.assertEqual(res, [b"value"] * 10)
+        # only one recomputation (the others got the current value)
+        self.assertEqual(self.computed, 2)
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_decorator(self):
+        pool = ClientPool(max_size=2)
+        yield pool.call("DEL", "test_cache_deco:1")
+        cache = TwoTierCache(pool, dumps=json.dumps, loads=json.loads)
+        calls = []
+
+        @cache.cached(key_fn=lambda x: "test_cache_deco:%i" % x)
+        def double(x):
+            calls.append(x)
+            return {"result": x * 2}
+
+        res = yield double(1)
+        self.assertEqual(res, {"result": 2})
+        cache.local_cache.clear()
+        res = yield double(1)
+        self.assertEqual(res, {"result": 2})
+        self.assertEqual(calls, [1])
+        pool.destroy()
@@ -6,10 +6,12 @@ import tornado.ioloop
 import tornado
 import functools
 import socket
+import time
+import concurrent.futures
 
 from tornadis.client import Client
-from tornadis.exceptions import ConnectionError, ClientError
-from support import test_redis_or_raise_skiptest
+from tornadis.exceptions import ConnectionError, ClientError, WatchError
+from support import mock, test_redis_or_raise_skiptest
 from support import FakeSocketObject
 from support import fake_socket_constructor
 
@@ -147,3 +149,212 @@ class ClientTestCase(tornado.testing.AsyncTestCase):
         self.assertTrue(isinstance(res, ConnectionError))
         self.assertFalse(c.is_connected())
         c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_transaction(self):
+        c = Client()
+        c2 = Client()
+        yield c.connect()
+        yield c2.connect()
+        yield c.call("SET", "test_transaction", "1")
+        self._test_transaction_calls = 0
+
+        @tornado.gen.coroutine
+        def incr(client, pipeline):
+            self._test_transaction_calls += 1
+            value = yield client.call("GET", "test_transaction")
+            if self._test_transaction_calls == 1:
+                # concurrent modification => the first try must be aborted
+                yield c2.call("SET", "test_transaction", "10")
+            pipeline.stack_call("SET", "test_transaction", int(value) + 1)
+            pipeline.stack_call("GET", "test_transaction")
+
+        res = yield c.transaction(incr, "test_transaction")
+        self.assertEqual(res, [b"OK", b"11"])
+        self.assertEqual(self._test_transaction_calls, 2)
+        c.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_transaction_max_retries(self):
+        c = Client()
+        c2 = Client()
+        yield c.connect()
+        yield c2.connect()
+
+        @tornado.gen.coroutine
+        def always_modified(client, pipeline):
+            yield c2.call("INCR", "test_transaction_max_retries")
+            pipeline.stack_call("INCR", "test_transaction_max_retries")
+
+        res = yield c.transaction(always_modified,
+                                  "test_transaction_max_retries",
+                                  max_retries=2)
+        self.assertTrue(isinstance(res, WatchError))
+        c.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_transaction_nothing_stacked(self):
+        c = Client()
+        yield c.connect()
+        res = yield c.transaction(lambda client, pipeline: None, "foo")
+        self.assertEqual(res, [])
+        res = yield c.call("PING")
+        self.assertEqual(res, b"PONG")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_autoconnect_single_connection(self):
+        c = Client()
+        futures = [c.call("PING") for _ in range(0, 10)]
+        self.assertEqual(len(c._Client__offline_queue), 10)
+        connection = c._Client__connection
+        res = yield futures
+        self.assertEqual(res, [b"PONG"] * 10)
+        self.assertTrue(c._Client__connection is connection)
+        self.assertEqual(len(c._Client__offline_queue), 0)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_autoconnect_single_connect_future(self):
+        c = Client()
+        future1 = c.connect()
+        future2 = c.connect()
+        self.assertTrue(future1 is future2)
+        res = yield future1
+        self.assertTrue(res)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_offline_queue_full(self):
+        c = Client(offline_queue_size=2)
+        future1 = c.call("PING")
+        future2 = c.call("PING")
+        res3 = yield c.call("PING")
+        self.assertTrue(isinstance(res3, ClientError))
+        res = yield [future1, future2]
+        self.assertEqual(res, [b"PONG", b"PONG"])
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_autoconnect_failure(self):
+        c = Client(port=11111, reconnect_attempts=2, reconnect_backoff=0.1)
+        res = yield c.call("PING")
+        self.assertTrue(isinstance(res, ConnectionError))
+        self.assertEqual(c._Client__failed_connects, 2)
+        condition = tornado.locks.Condition()
+        results = []
+
+        def cb(result):
+            results.append(result)
+            condition.notify()
+
+        c.async_call("PING", callback=cb)
+        yield condition.wait()
+        self.assertTrue(isinstance(results[0], ConnectionError))
+
+    @tornado.testing.gen_test
+    def test_autoconnect_two_outages(self):
+        c = Client(port=11111, reconnect_attempts=2, reconnect_backoff=0.5,
+                   reconnect_max_backoff=0.5)
+        for _ in range(0, 2):
+            res = yield c.call("PING")
+            self.assertTrue(isinstance(res, ConnectionError))
+        # (the server is back: no backoff delay for the first attempt)
+        c.connection_kwargs['port'] = 6379
+        before = time.time()
+        res = yield c.call("PING")
+        self.assertEqual(res, b"PONG")
+        self.assertTrue(time.time() - before < 0.2)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_autoreconnect(self):
+        c = Client()
+        c2 = Client()
+        res = yield c.call("CLIENT", "SETNAME", "test_autoreconnect")
+        self.assertEqual(res, b"OK")
+        yield c2.call("CLIENT", "KILL", "TYPE", "normal", "SKIPME", "YES")
+        yield tornado.gen.sleep(0.1)
+        self.assertFalse(c.is_connected())
+        res = yield [c.call("PING"), c.call("PING")]
+        self.assertEqual(res, [b"PONG", b"PONG"])
+        c.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_handshake(self):
+        c = Client(db=3, client_name="test_handshake")
+        res = yield c.connect()
+        self.assertTrue(res)
+        res = yield c.call("CLIENT", "GETNAME")
+        self.assertEqual(res, b"test_handshake")
+        res = yield c.call("CLIENT", "INFO")
+        self.assertTrue(b" db=3 " in res)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_handshake_hello(self):
+        c = Client(hello=2, client_name="test_handshake_hello")
+        res = yield c.connect()
+        self.assertTrue(res)
+        res = yield c.call("CLIENT", "GETNAME")
+        self.assertEqual(res, b"test_handshake_hello")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_handshake_errors(self):
+        c = Client(password="foo", client_name="test_handshake_errors")
+        res = yield c.connect()
+        self.assertFalse(res)
+        self.assertFalse(c.is_connected())
+        c = Client(db=100000)
+        res = yield c.connect()
+        self.assertFalse(res)
+        self.assertFalse(c.is_connected())
+
+    @tornado.testing.gen_test
+    def test_call_during_handshake(self):
+        c = Client(db=4)
+        c2 = Client(db=4)
+        yield c2.call("SET", "test_call_during_handshake", "db4")
+        future = c.connect()
+        res = yield c.call("GET", "test_call_during_handshake")
+        self.assertEqual(res, b"db4")
+        res = yield future
+        self.assertTrue(res)
+        c.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_fork_detection(self):
+        c = Client()
+        res = yield c.call("PING")
+        self.assertEqual(res, b"PONG")
+        with mock.patch("tornadis.client.get_pid", return_value=-1):
+            # the inherited connection is dropped and a new one is made
+            self.assertFalse(c.is_connected())
+            res = yield c.call("PING")
+            self.assertEqual(res, b"PONG")
+            self.assertTrue(c.is_connected())
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_submit(self):
+        c = Client()
+        executor = concurrent.futures.ThreadPoolExecutor(4)
+
+        def worker(i):
+            futures = [c.submit("INCR", "test_submit_%i" % i)
+                       for _ in range(0, 100)]
+            return [f.result() for f in futures]
+
+        yield c.call("DEL", *["test_submit_%i" % i for i in range(0, 4)])
+        res = yield [executor.submit(worker, i) for i in range(0, 4)]
+        for i in range(0, 4):
+            self.assertEqual(res[i], list(range(1, 101)))
+        res = yield c.submit("GET", "test_submit_0")
+        self.assertEqual(res, b"100")
+        executor.shutdown()
+        c.disconnect()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+
+from tornadis.cluster import ClusterClient, parse_cluster_slots
+from tornadis.cluster import parse_cluster_shards, parse_redirection
+from tornadis.cluster import call_slot
+from tornadis.pipeline import Pipeline
+from tornadis.hashing import key_slot
+from tornadis.exceptions import ClientError
+from support import test_redis_or_raise_skiptest, unused_port
+from support import FakeRedisServer
+
+REDIS = ("127.0.0.1", 6379)
+
+
+class FakeClusterNode(FakeRedisServer):
+    """Fake cluster node (other nodes are the real redis server).
+
+    Commands other than CLUSTER SLOTS and PING are redirected to the real redis
+    server (with MOVED or ASK errors, see the redirection attribute). In a
+    transaction, queued commands are redirected and EXEC is aborted.
+    """
+
+    def __init__(self):
+        FakeRedisServer.__init__(self)
+        self.slots = [[0, 16383, [b"", self.port]]]
+        self.redirection = "MOVED"
+
+    def handle_command(self, stream, command):
+        name = command[0].upper()
+        if name == b"CLUSTER" and command[1].upper() == b"SLOTS":
+            return self.slots
+        if name == b"PING":
+            return b"PONG"
+        if name == b"MULTI":
+            return b"OK"
+        if name == b"EXEC":
+            return Exception("EXECABORT Transaction discarded because of "
+                             "previous errors.")
+        return Exception("%s %i %s:%i" % ((self.redirection,
+                                           key_slot(command[1])) + REDIS))
+
+
+class ClusterUtilsTestCase(unittest.TestCase):
+
+    def test_parse_cluster_slots(self):
+        reply = [[0, 5460, [b"10.0.0.1", 7000, b"id1"],
+                  [b"10.0.0.4", 7003, b"id4"]],
+                 [5461, 16383, [b"", 7001, b"id2"]]]
+        self.assertEqual(parse_cluster_slots(reply, "10.0.0.9"),
+                         [(0, 5460, ("10.0.0.1", 7000)),
+                          (5461, 16383, ("10.0.0.9", 7001))])
+
+    def test_parse_cluster_shards(self):
+        reply = [[b"slots", [0, 100, 200, 16383], b"nodes",
+                  [[b"id", b"id4", b"port", 7003, b"ip", b"10.0.0.4",
+                    b"role", b"replica", b"health", b"online"],
+                   [b"id", b"id1", b"port", 7000, b"ip", b"10.0.0.1",
+                    b"role", b"master", b"health", b"online"]]]]
+        self.assertEqual(parse_cluster_shards(reply),
+                         [(0, 100, ("10.0.0.1", 7000)),
+                          (200, 16383, ("10.0.0.1", 7000))])
+
+    def test_parse_redirection(self):
+        res = parse_redirection(ClientError("MOVED 3999 127.0.0.1:6381"))
+        self.assertEqual(res, ("MOVED", 3999, ("127.0.0.1", 6381)))
+        res = parse_redirection(ClientError("ASK 3999 ::1:6381"))
+        self.assertEqual(res, ("ASK", 3999, ("::1", 6381)))
+        self.assertTrue(parse_redirection(ClientError("ERR foo")) is None)
+        self.assertTrue(parse_redirection(b"MOVED 1 foo:1") is None)
+
+    def test_call_slot(self):
+        self.assertEqual(call_slot(("GET", "foo")), 12182)
+        self.assertTrue(call_slot(("PING",)) is None)
+        self.assertTrue(isinstance(call_slot(("MGET", "foo", "bar")),
+                                   ClientError))
+        pipeline = Pipeline()
+        pipeline.stack_call("SET", "{foo}1", "bar")
+        pipeline.stack_call("PING")
+        pipeline.stack_call("GET", "{foo}2")
+        self.assertEqual(call_slot((pipeline,)), 12182)
+
+
+class ClusterClientTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(ClusterClientTestCase, self).setUp()
+        self.node = FakeClusterNode()
+        self.node_addr = ("127.0.0.1", self.node.port)
+
+    def tearDown(self):
+        self.node.stop()
+        super(ClusterClientTestCase, self).tearDown()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def _commands(self):
+        return [c for c in self.node.commands if c[0] != b"CLUSTER"]
+
+    @tornado.testing.gen_test
+    def test_slot_map(self):
+        self.node.slots = [[0, 8191, list(REDIS)],
+                           [8192, 16383, [b"", self.node.port]]]
+        c = ClusterClient([self.node_addr])
+        res = yield c.connect()
+        self.assertTrue(res)
+        self.assertEqual(c.get_node("foo"), self.node_addr)
+        self.assertEqual(c.get_node("bar"), REDIS)
+        res = yield c.call("SET", "bar", "foo")
+        self.assertEqual(res, b"OK")
+        res = yield c.call("DEL", "bar")
+        self.assertEqual(res, 1)
+        self.assertEqual(self._commands(), [])
+        self.assertEqual(c.stats()["covered_slots"], 16384)
+        c.disconnect()
+        self.assertFalse(c.is_connected())
+
+    @tornado.testing.gen_test
+    def test_moved(self):
+        c = ClusterClient([self.node_addr])
+        yield c.connect()
+        self.node.slots = [[0, 16383, list(REDIS)]]
+        res = yield c.call("SET", "foo", "bar")
+        self.assertEqual(res, b"OK")
+        self.assertEqual(c.get_node("foo"), REDIS)
+        res = yield c.call("GET", "foo")
+        self.assertEqual(res, b"bar")
+        self.assertEqual(len(self._commands()), 1)
+        yield c.refresh_slots()
+        self.assertEqual(c.get_node("bar"), REDIS)
+        yield c.call("DEL", "foo")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_ask(self):
+        self.node.redirection = "ASK"
+        c = ClusterClient([self.node_addr])
+        res = yield c.call("SET", "foo", "bar")
+        self.assertEqual(res, b"OK")
+        pipeline = Pipeline()
+        pipeline.stack_call("GET", "foo")
+        pipeline.stack_call("DEL", "foo")
+        res = yield c.call(pipeline)
+        self.assertEqual(res, [b"bar", 1])
+        # (the slot map is not updated)
+        self.assertEqual(c.get_node("foo"), self.node_addr)
+        self.assertEqual(len(self._commands()), 3)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_moved_transaction(self):
+        c = ClusterClient([self.node_addr])
+        yield c.connect()
+        self.node.slots = [[0, 16383, list(REDIS)]]
+        pipeline = Pipeline(transaction=True)
+        pipeline.stack_call("SET", "{foo}1", "bar")
+        pipeline.stack_call("GET", "{foo}1")
+        res = yield c.call(pipeline)
+        self.assertEqual(res, [b"OK", b"bar"])
+        self.assertEqual(c.get_node("foo"), REDIS)
+        yield c.call("DEL", "{foo}1")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_ask_transaction(self):
+        self.node.redirection = "ASK"
+        c = ClusterClient([self.node_addr])
+        pipeline = Pipeline(transaction=True)
+        pipeline.stack_call("SET", "{foo}1", "bar")
+        pipeline.stack_call("GET", "{foo}1")
+        pipeline.stack_call("DEL", "{foo}1")
+        res = yield c.call(pipeline)
+        self.assertEqual(res, [b"OK", b"bar", 1])
+        # (the slot map is not updated)
+        self.assertEqual(c.get_node("foo"), self.node_addr)
+        self.assertEqual([x[0] for x in self._commands()],
+                         [b"MULTI", b"SET", b"GET", b"DEL", b"EXEC"])
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_crossslot(self):
+        c = ClusterClient([REDIS])
+        c.startup_nodes = [self.node_addr]
+        self.node.slots = [[0, 16383, list(REDIS)]]
+        res = yield c.call("SUNION", "foo", "bar")
+        self.assertTrue(isinstance(res, ClientError))
+        res = yield c.call("MGET", "{foo}1", "{foo}2")
+        self.assertEqual(res, [None, None])
+        # (the member of SMOVE is not a key)
+        yield c.call("SADD", "{foo}1", "bar")
+        res = yield c.call("SMOVE", "{foo}1", "{foo}2", "bar")
+        self.assertEqual(res, 1)
+        res = yield c.call("DEL", "{foo}2")
+        self.assertEqual(res, 1)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_split(self):
+        # ("foo" => fake node which redirects to redis, "bar" => redis)
+        self.node.slots = [[0, 8191, list(REDIS)],
+                           [8192, 16383, [b"", self.node.port]]]
+        c = ClusterClient([self.node_addr])
+        res = yield c.call("MSET", "foo", "1", "bar", "2", "{bar}2", "3")
+        self.assertEqual(res, b"OK")
+        res = yield c.call("MGET", "bar", "foo", "{bar}2")
+        self.assertEqual(res, [b"2", b"1", b"3"])
+        pipeline = Pipeline()
+        pipeline.stack_call("GET", "foo")
+        pipeline.stack_call("PING")
+        pipeline.stack_call("INCR", "bar")
+        pipeline.stack_call("RENAME", "foo", "bar")
+        pipeline.stack_call("DEL", "foo", "bar", "{bar}2")
+        res = yield c.call(pipeline)
+        self.assertEqual(res[:3], [b"1", b"PONG", 3])
+        self.assertTrue(isinstance(res[3], ClientError))
+        self.assertEqual(res[4], 3)
+        pipeline = Pipeline(transaction=True)
+        pipeline.stack_call("GET", "foo")
+        pipeline.stack_call("GET", "bar")
+        res = yield c.call(pipeline)
+        self.assertTrue(isinstance(res, ClientError))
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_no_node(self):
+        c = ClusterClient([("127.0.0.1", unused_port())])
+        res = yield c.connect()
+        self.assertFalse(res)
+        res = yield c.call("GET", "foo")
+        self.assertTrue(isinstance(res, ClientError))
+        c.disconnect()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import six
+import tornado.testing
+import tornado.ioloop
+
+from tornadis.client import Client
+from tornadis.pool import ClientPool
+from tornadis.pipeline import Pipeline
+from tornadis.codec import CompressionCodec, ZlibCompressor, LzmaCompressor
+from tornadis.codec import MAGIC, lzma
+from support import test_redis_or_raise_skiptest
+
+
+BIG_VALUE = b"foobar" * 1000
+
+
+class CodecTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(CodecTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def test_encode_value(self):
+        codec = CompressionCodec(threshold=10)
+        self.assertEqual(codec.encode_value(b"foo"), b"foo")
+        self.assertEqual(codec.encode_value(12), 12)
+        value = codec.encode_value(BIG_VALUE)
+        self.assertTrue(value.startswith(MAGIC + ZlibCompressor.id))
+        self.assertTrue(len(value) < len(BIG_VALUE))
+        self.assertEqual(codec.decode_value(value), BIG_VALUE)
+        value = codec.encode_value(six.u("foobar") * 100)
+        self.assertEqual(codec.decode_value(value), b"foobar" * 100)
+        # incompressible value
+        value = codec.encode_value(b"0123456789a")
+        self.assertEqual(value, b"0123456789a")
+        # corrupted value
+        value = MAGIC + ZlibCompressor.id + b"garbage"
+        self.assertEqual(codec.decode_value(value), value)
+
+    def test_encode_command(self):
+        codec = CompressionCodec()
+        args = codec.encode_command(("HSET", "key", "f1", BIG_VALUE,
+                                     "f2", "small"))
+        self.assertEqual(args[0:3], ("HSET", "key", "f1"))
+        self.assertTrue(args[3].startswith(MAGIC))
+        self.assertEqual(args[4:], ("f2", b"small"))
+        args = ("GET", BIG_VALUE)
+        self.assertTrue(codec.encode_command(args) is args)
+        self.assertTrue(codec.decodes_reply(("get", "key")))
+        self.assertFalse(codec.decodes_reply(("SET", "key", "value")))
+        self.assertTrue(codec.decodes_reply(("SET", "key", "value", "get")))
+        args = codec.encode_command(("LREM", "key", 0, BIG_VALUE))
+        self.assertTrue(args[3].startswith(MAGIC))
+
+    def test_lzma(self):
+        if lzma is None:
+            return
+        codec = CompressionCodec(compressor=LzmaCompressor())
+        value = codec.encode_value(BIG_VALUE)
+        self.assertTrue(value.startswith(MAGIC + LzmaCompressor.id))
+        self.assertEqual(CompressionCodec().decode_value(value), BIG_VALUE)
+
+    @tornado.testing.gen_test
+    def test_client(self):
+        c = Client(codec=CompressionCodec())
+        c2 = Client()
+        res = yield c.call("SET", "test_codec1", BIG_VALUE)
+        self.assertEqual(res, b"OK")
+        res = yield c2.call("STRLEN", "test_codec1")
+        self.assertTrue(res < len(BIG_VALUE))
+        yield c2.call("SET", "test_codec2", b"legacy")
+        res = yield c.call("MGET", "test_codec1", "test_codec2")
+        self.assertEqual(res, [BIG_VALUE, b"legacy"])
+        res = yield c.call("GET", "test_codec1")
+        self.assertEqual(res, BIG_VALUE)
+        c.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_set_get(self):
+        c = Client(codec=CompressionCodec())
+        yield c.call("SET", "test_codec5", BIG_VALUE)
+        res = yield c.call("SET", "test_codec5", "new", "GET")
+        self.assertEqual(res, BIG_VALUE)
+        yield c.call("RPUSH", "test_codec6", BIG_VALUE, "small")
+        res = yield c.call("LREM", "test_codec6", 0, BIG_VALUE)
+        self.assertEqual(res, 1)
+        yield c.call("DEL", "test_codec5", "test_codec6")
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_pipeline(self):
+        c = ClientPool(codec=CompressionCodec())
+        for transaction in (False, True):
+            p = Pipeline(transaction=transaction)
+            p.stack_call("DEL", "test_codec3")
+            p.stack_call("RPUSH", "test_codec3", BIG_VALUE, "small")
+            p.stack_call("LRANGE", "test_codec3", 0, -1)
+            p.stack_call("STRLEN", "test_codec1")
+            res = yield c.call(p)
+            self.assertEqual(res[1], 2)
+            self.assertEqual(res[2], [BIG_VALUE, b"small"])
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_bulk_writer(self):
+        c = Client(codec=CompressionCodec())
+        writer = c.bulk_writer()
+        writer.call("SET", "test_codec4", BIG_VALUE)
+        res = yield writer.finish()
+        self.assertTrue(res)
+        res = yield c.call("STRLEN", "test_codec4")
+        self.assertTrue(res < len(BIG_VALUE))
+        res = yield c.call("GET", "test_codec4")
+        self.assertEqual(res, BIG_VALUE)
+        c.disconnect()
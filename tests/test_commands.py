@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from tornadis.commands import command_name, is_exclusive_command
+from tornadis.commands import is_exclusive_call, is_readonly_command
+from tornadis.commands import is_readonly_call, command_keys
+from tornadis.pipeline import Pipeline
+
+
+class CommandsTestCase(unittest.TestCase):
+
+    def test_command_name(self):
+        self.assertEqual(command_name(("get", "foo")), b"GET")
+        self.assertEqual(command_name((b"Get", "foo")), b"GET")
+
+    def test_is_exclusive_command(self):
+        self.assertFalse(is_exclusive_command(("GET", "foo")))
+        self.assertTrue(is_exclusive_command(("blpop", "foo", 0)))
+        self.assertTrue(is_exclusive_command(("WATCH", "foo")))
+        self.assertFalse(is_exclusive_command(("XREAD", "STREAMS", "s", 0)))
+        self.assertTrue(is_exclusive_command(("XREAD", "block", 10,
+                                              "STREAMS", "s", 0)))
+        self.assertFalse(is_exclusive_command(("XREAD", "COUNT", 1,
+                                               "STREAMS", "block", 0)))
+        self.assertFalse(is_exclusive_command(("XREAD", "STREAMS", "s",
+                                               "block")))
+        self.assertFalse(is_exclusive_command(("XREADGROUP", "GROUP",
+                                               "block", "block", "STREAMS",
+                                               "block", ">")))
+        self.assertTrue(is_exclusive_command(("XREADGROUP", "GROUP", "g",
+                                              "c", "NOACK", "BLOCK", 0,
+                                              "STREAMS", "s", ">")))
+
+    def test_is_exclusive_call(self):
+        pipeline = Pipeline()
+        pipeline.stack_call("SET", "foo", "bar")
+        self.assertFalse(is_exclusive_call((pipeline,)))
+        pipeline.stack_call("BRPOP", "foo", 1)
+        self.assertTrue(is_exclusive_call((pipeline,)))
+        pipeline = Pipeline(transaction=True)
+        pipeline.stack_call("SET", "foo", "bar")
+        self.assertTrue(is_exclusive_call((pipeline,)))
+
+    def test_is_readonly_command(self):
+        self.assertTrue(is_readonly_command(("get", "foo")))
+        self.assertFalse(is_readonly_command(("SET", "foo", "bar")))
+        self.assertTrue(is_readonly_command(("XREAD", "STREAMS", "s", 0)))
+        self.assertTrue(is_readonly_command(("XREAD", "STREAMS", "block",
+                                             0)))
+        self.assertFalse(is_readonly_command(("XREAD", "BLOCK", 10,
+                                              "STREAMS", "s", 0)))
+
+    def test_is_readonly_call(self):
+        pipeline = Pipeline()
+        self.assertFalse(is_readonly_call((pipeline,)))
+        pipeline.stack_call("GET", "foo")
+        pipeline.stack_call("HGETALL", "bar")
+        self.assertTrue(is_readonly_call((pipeline,)))
+        pipeline.stack_call("INCR", "foo")
+        self.assertFalse(is_readonly_call((pipeline,)))
+        pipeline = Pipeline(transaction=True)
+        pipeline.stack_call("GET", "foo")
+        self.assertFalse(is_readonly_call((pipeline,)))
+
+    def test_command_keys(self):
+        self.assertEqual(command_keys(("GET", "foo")), ["foo"])
+        self.assertEqual(command_keys(("PING",)), [])
+        self.assertEqual(command_keys(("INFO", "replication")), [])
+        self.assertEqual(command_keys(("MGET", "a", "b")), ["a", "b"])
+        self.assertEqual(command_keys(("MSET", "a", 1, "b", 2)), ["a", "b"])
+        self.assertEqual(command_keys(("BLPOP", "a", "b", 0)), ["a", "b"])
+        self.assertEqual(command_keys(("EVALSHA", "sha", 2, "a", "b", "c")),
+                         ["a", "b"])
+        self.assertEqual(command_keys(("XREAD", "COUNT", 2, "STREAMS", "a",
+                                       "b", 0, 0)), ["a", "b"])
+        self.assertEqual(command_keys(("BITOP", "AND", "d", "a")),
+                         ["d", "a"])
+        self.assertEqual(command_keys(("OBJECT", "ENCODING", "a")), ["a"])
+        self.assertEqual(command_keys(("LMOVE", "{q}a", "{q}b", "LEFT",
+                                       "RIGHT")), ["{q}a", "{q}b"])
+        self.assertEqual(command_keys(("BLMOVE", "a", "b", "LEFT", "RIGHT",
+                                       0)), ["a", "b"])
+        self.assertEqual(command_keys(("COPY", "a", "b", "REPLACE")),
+                         ["a", "b"])
+        self.assertEqual(command_keys(("SMOVE", "{a}s1", "{a}s2", "m")),
+                         ["{a}s1", "{a}s2"])
+        self.assertEqual(command_keys(("ZUNION", 2, "a", "b", "WITHSCORES")),
+                         ["a", "b"])
+        self.assertEqual(command_keys(("SINTERCARD", 2, "a", "b", "LIMIT",
+                                       1)), ["a", "b"])
+        self.assertEqual(command_keys(("LMPOP", 1, "a", "LEFT")), ["a"])
+        self.assertEqual(command_keys(("BLMPOP", 0, 2, "a", "b", "LEFT")),
+                         ["a", "b"])
+        self.assertEqual(command_keys(("BZMPOP", 1, 1, "a", "MIN")), ["a"])
+        self.assertEqual(command_keys(("ZUNIONSTORE", "d", 2, "a", "b",
+                                       "AGGREGATE", "SUM")), ["d", "a", "b"])
+        self.assertEqual(command_keys(("XINFO", "STREAM", "s")), ["s"])
+        self.assertEqual(command_keys(("XGROUP", "CREATE", "s", "g", "$")),
+                         ["s"])
+        self.assertEqual(command_keys(("XINFO", "HELP")), [])
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+
+from tornadis.client import Client
+from tornadis.executor import StreamingExecutor
+from tornadis.exceptions import ClientError
+from support import test_redis_or_raise_skiptest
+
+
+class DummyException(Exception):
+    pass
+
+
+class StreamingExecutorTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(StreamingExecutorTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.testing.gen_test
+    def test_ordered_results(self):
+        c1 = Client()
+        c2 = Client()
+        commands = (("ECHO", "%i" % i) for i in range(0, 5000))
+        executor = StreamingExecutor([c1, c2], commands, window=4,
+                                     min_epoch_duration=0)
+        results = []
+        while True:
+            batch = yield executor.next_batch()
+            if batch is None:
+                break
+            results.extend(batch)
+        self.assertEqual(results, [("%i" % i).encode()
+                                   for i in range(0, 5000)])
+        self.assertTrue(executor.window > 4)
+        batch = yield executor.next_batch()
+        self.assertTrue(batch is None)
+        c1.disconnect()
+        c2.disconnect()
+
+    @tornado.testing.gen_test
+    def test_errors_only(self):
+        c = Client()
+        commands = [("SET", "test_executor", "foo"), ("BADCOMMAND",),
+                    ("GET", "test_executor"), ("BADCOMMAND",)]
+        executor = StreamingExecutor(c, commands, errors_only=True)
+        batch = yield executor.next_batch()
+        self.assertEqual([x[0] for x in batch], [1, 3])
+        self.assertTrue(isinstance(batch[0][1], ClientError))
+        batch = yield executor.next_batch()
+        self.assertTrue(batch is None)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_run(self):
+        c = Client()
+        commands = [("SET", "test_executor", "foo"), ("BADCOMMAND",),
+                    ("GET", "test_executor"), ("BADCOMMAND",)]
+        executor = StreamingExecutor(c, commands, window=1, adaptive=False)
+        errors = yield executor.run()
+        self.assertEqual([x[0] for x in errors], [1, 3])
+        self.assertEqual(executor.window, 1)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_iterator_exception(self):
+        c = Client()
+
+        def commands():
+            yield ("PING",)
+            raise DummyException()
+
+        executor = StreamingExecutor(c, commands())
+        try:
+            yield executor.run()
+            raise Exception("exception not raised")
+        except DummyException:
+            pass
+        c.disconnect()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+import tornado.gen
+
+from tornadis.fanout import SplitCall, fanout
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import ClientError
+
+
+def first_letter(key):
+    return key[0]
+
+
+class SplitCallTestCase(unittest.TestCase):
+
+    def test_single_group(self):
+        split = SplitCall(("MGET", "a1", "a2"), first_letter)
+        self.assertEqual(split.sub_commands, [("a", ("MGET", "a1", "a2"))])
+        self.assertEqual(split.merge([[b"x", b"y"]]), [b"x", b"y"])
+
+    def test_mget(self):
+        split = SplitCall(("MGET", "a1", "b1", "a2"), first_letter)
+        self.assertEqual(split.sub_commands, [("a", ("MGET", "a1", "a2")),
+                                              ("b", ("MGET", "b1"))])
+        self.assertEqual(split.merge([[b"x", b"z"], [b"y"]]),
+                         [b"x", b"y", b"z"])
+        error = ClientError("foo")
+        self.assertTrue(split.merge([[b"x", b"z"], error]) is error)
+
+    def test_mset_and_del(self):
+        split = SplitCall(("MSET", "a1", 1, "b1", 2), first_letter)
+        self.assertEqual(split.sub_commands, [("a", ("MSET", "a1", 1)),
+                                              ("b", ("MSET", "b1", 2))])
+        self.assertEqual(split.merge([b"OK", b"OK"]), b"OK")
+        split = SplitCall(("DEL", "a1", "b1", "c1"), first_letter)
+        self.assertEqual(len(split.sub_commands), 3)
+        self.assertEqual(split.merge([1, 0, 1]), 2)
+
+    def test_pipeline(self):
+        pipeline = Pipeline()
+        pipeline.stack_call("SET", "a1", 1)
+        pipeline.stack_call("PING")
+        pipeline.stack_call("SUNION", "a1", "b1")
+        pipeline.stack_call("EXISTS", "a1", "b1")
+        split = SplitCall((pipeline,), first_letter)
+        self.assertEqual(split.sub_commands, [("a", ("SET", "a1", 1)),
+                                              (None, ("PING",)),
+                                              ("a", ("EXISTS", "a1")),
+                                              ("b", ("EXISTS", "b1"))])
+        res = split.merge([b"OK", b"PONG", 1, 0])
+        self.assertEqual(res[:2], [b"OK", b"PONG"])
+        self.assertTrue(isinstance(res[2], ClientError))
+        self.assertEqual(res[3], 1)
+
+
+class FanoutTestCase(tornado.testing.AsyncTestCase):
+
+    @tornado.testing.gen_test
+    def test_fanout(self):
+        pipelines = {}
+
+        @tornado.gen.coroutine
+        def call_node(node, pipeline):
+            pipelines[node] = pipeline.pipelined_args
+            if node == "b":
+                raise tornado.gen.Return(ClientError("down"))
+            raise tornado.gen.Return([args[1] for args in
+                                      pipeline.pipelined_args])
+
+        pipeline = Pipeline()
+        pipeline.stack_call("GET", "a1")
+        pipeline.stack_call("GET", "b1")
+        pipeline.stack_call("GET", "a2")
+        split = SplitCall((pipeline,), first_letter)
+        replies = yield fanout(split, lambda group: group, call_node)
+        self.assertEqual(pipelines, {"a": [("GET", "a1"), ("GET", "a2")],
+                                     "b": [("GET", "b1")]})
+        self.assertEqual(replies[0], "a1")
+        self.assertTrue(isinstance(replies[1], ClientError))
+        self.assertEqual(replies[2], "a2")
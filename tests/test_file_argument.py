@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+import tempfile
+import os
+
+from tornadis.client import Client
+from tornadis.pipeline import Pipeline
+from tornadis.file_argument import FileArgument
+from tornadis.utils import format_args_in_redis_protocol
+from support import test_redis_or_raise_skiptest
+
+
+class FileArgumentTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(FileArgumentTestCase, self).setUp()
+        fd, self.path = tempfile.mkstemp()
+        self.data = os.urandom(3000000)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.unlink(self.path)
+        super(FileArgumentTestCase, self).tearDown()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def test_format(self):
+        arg = FileArgument(self.path, offset=70000, length=10)
+        res = bytes(format_args_in_redis_protocol("SET", "foo", arg))
+        self.assertEqual(res, b"*3\r\n$3\r\nSET\r\n$3\r\nfoo\r\n$10\r\n" +
+                         self.data[70000:70010] + b"\r\n")
+        arg = FileArgument(self.path, offset=len(self.data))
+        res = bytes(format_args_in_redis_protocol("SET", "foo", arg))
+        self.assertEqual(res, b"*3\r\n$3\r\nSET\r\n$3\r\nfoo\r\n$0\r\n\r\n")
+
+    @tornado.testing.gen_test
+    def test_call(self):
+        c = Client()
+        res = yield c.call("SET", "test_file_argument",
+                           FileArgument(self.path))
+        self.assertEqual(res, b"OK")
+        res = yield c.call("GET", "test_file_argument")
+        self.assertEqual(res, self.data)
+        pipeline = Pipeline()
+        pipeline.stack_call("SET", "test_file_argument",
+                            FileArgument(self.path, offset=5, length=100000))
+        pipeline.stack_call("GET", "test_file_argument")
+        res = yield c.call(pipeline)
+        self.assertEqual(res, [b"OK", self.data[5:100005]])
+        c.disconnect()
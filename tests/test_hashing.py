@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from tornadis.hashing import crc16, hash_tag, key_slot
+
+
+class HashingTestCase(unittest.TestCase):
+
+    def test_crc16(self):
+        self.assertEqual(crc16(b"123456789"), 0x31C3)
+        self.assertEqual(crc16(b""), 0)
+
+    def test_hash_tag(self):
+        self.assertEqual(hash_tag("{user1000}.following"), b"user1000")
+        self.assertEqual(hash_tag("foo{}{bar}"), b"foo{}{bar}")
+        self.assertEqual(hash_tag("foo{{bar}}zap"), b"{bar")
+        self.assertEqual(hash_tag("foo{bar}{zap}"), b"bar")
+        self.assertEqual(hash_tag(123), b"123")
+
+    def test_key_slot(self):
+        self.assertEqual(key_slot("foo"), 12182)
+        self.assertEqual(key_slot(b"foo"), 12182)
+        self.assertEqual(key_slot("{user1000}.following"),
+                         key_slot("{user1000}.followers"))
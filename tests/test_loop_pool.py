@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+import threading
+
+from tornadis.loop_pool import LoopAwareClientPool, merge_stats
+from tornadis.client import Client
+from support import test_redis_or_raise_skiptest
+
+
+def new_ioloop():
+    try:
+        import asyncio
+        asyncio.set_event_loop(asyncio.new_event_loop())
+    except ImportError:
+        pass
+    ioloop = tornado.ioloop.IOLoop()
+    ioloop.make_current()
+    return ioloop
+
+
+class LoopAwareClientPoolTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(LoopAwareClientPoolTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def test_merge_stats(self):
+        res = merge_stats([{"a": 1, "b": {"x": 1}, "c": "foo"},
+                           {"a": 2, "b": {"x": 2, "y": 1}}])
+        self.assertEqual(res, {"a": 3, "b": {"x": 3, "y": 1}})
+
+    @tornado.testing.gen_test
+    def test_one_pool_per_ioloop(self):
+        pool = LoopAwareClientPool(max_size=2)
+        client = yield pool.get_connected_client()
+        self.assertTrue(isinstance(client, Client))
+        self.assertTrue(client.connection_kwargs['ioloop'] is self.io_loop)
+        pool.release_client(client)
+        results = []
+
+        def run_in_thread():
+            ioloop = new_ioloop()
+
+            @tornado.gen.coroutine
+            def work():
+                client2 = yield pool.get_connected_client()
+                res = yield client2.call("PING")
+                results.append((client2, res))
+                pool.release_client(client2)
+                res = yield pool.call("PING")
+                results.append(res)
+                pool.destroy()
+
+            ioloop.run_sync(work)
+            ioloop.close(all_fds=True)
+
+        thread = threading.Thread(target=run_in_thread)
+        thread.start()
+        while thread.is_alive():
+            yield tornado.gen.sleep(0.01)
+        client2, res = results[0]
+        self.assertEqual(res, b"PONG")
+        self.assertEqual(results[1], b"PONG")
+        self.assertTrue(client2 is not client)
+        self.assertFalse(client2.connection_kwargs['ioloop'] is self.io_loop)
+        self.assertEqual(pool.stats()['shards'], 0)
+        client = yield pool.get_connected_client()
+        pool.release_client(client)
+        stats = pool.stats()
+        self.assertEqual(stats["shards"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.)
+        pool.destroy()
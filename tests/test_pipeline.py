@@ -40,3 +40,47 @@ class PipelineTestCase(tornado.testing.AsyncTestCase):
         res = yield c.call(p)
         self.assertTrue(isinstance(res, ClientError))
         c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_transaction_pipeline(self):
+        c = Client()
+        yield c.connect()
+        yield c.call('DEL', 'test_transaction_pipeline')
+        p = Pipeline(transaction=True)
+        p.stack_call('INCR', 'test_transaction_pipeline')
+        p.stack_call('INCR', 'test_transaction_pipeline')
+        res = yield c.call(p)
+        self.assertEqual(res, [1, 2])
+        res = yield c.call('PING')
+        self.assertEqual(res, b'PONG')
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_transaction_pipeline_execabort(self):
+        c = Client()
+        yield c.connect()
+        p = Pipeline(transaction=True)
+        p.stack_call('PING')
+        p.stack_call('BADCOMMAND')
+        res = yield c.call(p)
+        self.assertTrue(isinstance(res, ClientError))
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_concurrent_pipelines(self):
+        c = Client()
+        yield c.connect()
+        pipelines = []
+        for i in range(0, 10):
+            p = Pipeline()
+            for j in range(0, i + 1):
+                p.stack_call('ECHO', "%i-%i" % (i, j))
+            pipelines.append(p)
+        futures = [c.call(p) for p in pipelines]
+        futures.append(c.call('PING'))
+        res = yield futures
+        for i in range(0, 10):
+            expected = [("%i-%i" % (i, j)).encode() for j in range(0, i + 1)]
+            self.assertEqual(res[i], expected)
+        self.assertEqual(res[10], b'PONG')
+        c.disconnect()
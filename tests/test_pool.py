@@ -3,6 +3,8 @@
 
 import tornado.testing
 import tornado.ioloop
+import tornado.gen
+import tornado.concurrent
 import time
 import functools
 
@@ -174,6 +176,23 @@ class ClientPoolTestCase(tornado.testing.AsyncTestCase):
         self.assertFalse(client1.is_connected())
         c.destroy()
 
+    @tornado.testing.gen_test
+    def test_autoclose_disconnected(self):
+        c = ClientPool(max_size=5, client_timeout=0.5, autoclose=True)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        c.release_client(client1)
+        c.release_client(client2)
+        # (a dead client is the coldest one)
+        client1.disconnect()
+        yield tornado.gen.sleep(0.7)
+        self.assertFalse(client2.is_connected())
+        stats = c.stats()
+        self.assertEqual(stats["idle"], 0)
+        self.assertEqual(stats["destroyed"]["disconnected"], 1)
+        self.assertEqual(stats["destroyed"]["autoclose"], 1)
+        c.destroy()
+
     @tornado.testing.gen_test
     def test_release_expired_client_disconnect(self):
         with mock.patch.object(ClientPool,
@@ -184,3 +203,347 @@ class ClientPoolTestCase(tornado.testing.AsyncTestCase):
             self.assertTrue(client.is_connected())
             c.release_client(client)
             self.assertFalse(client.is_connected())
+
+    @tornado.testing.gen_test
+    def test_transaction(self):
+        c = ClientPool(max_size=1)
+
+        def set_value(client, pipeline):
+            pipeline.stack_call("SET", "test_pool_transaction", "foo")
+            pipeline.stack_call("GET", "test_pool_transaction")
+
+        res = yield c.transaction(set_value, "test_pool_transaction")
+        self.assertEqual(res, [b"OK", b"foo"])
+        client = c.get_client_nowait()
+        self.assertTrue(isinstance(client, Client))
+        c.release_client(client)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_call(self):
+        c = ClientPool(max_size=1)
+        res = yield c.call("PING")
+        self.assertEqual(res, b"PONG")
+        res = yield c.call("PING")
+        self.assertEqual(res, b"PONG")
+        c.destroy()
+        c = ClientPool(max_size=1, port=11111)
+        res = yield c.call("PING")
+        self.assertTrue(isinstance(res, ClientError))
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_fork_detection(self):
+        c = ClientPool(max_size=2)
+        yield c.preconnect()
+        client = c.get_client_nowait()
+        self.assertTrue(client.is_connected())
+        with mock.patch("tornadis.pool.get_pid", return_value=-1), \
+                mock.patch("tornadis.client.get_pid", return_value=-1):
+            # the pool is reset (and prewarmed again in background)
+            client2 = c.get_client_nowait()
+            self.assertFalse(client2.is_connected())
+            self.assertFalse(client.is_connected())
+            c.release_client(client2)
+            yield tornado.gen.sleep(0.1)
+            client3 = c.get_client_nowait()
+            client4 = c.get_client_nowait()
+            self.assertTrue(client3.is_connected())
+            self.assertTrue(client4.is_connected())
+            self.assertTrue(c.get_client_nowait() is None)
+            c.release_client(client3)
+            c.release_client(client4)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_lifo(self):
+        c = ClientPool(max_size=5)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        c.release_client(client1)
+        c.release_client(client2)
+        client3 = yield c.get_connected_client()
+        self.assertTrue(client3 is client2)
+        c.release_client(client3)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_min_idle(self):
+        c = ClientPool(max_size=3, min_idle=2)
+        yield tornado.gen.sleep(0.1)
+        self.assertEqual(c.stats()['idle'], 2)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        yield tornado.gen.sleep(0.1)
+        # refilled in background (but max_size is respected)
+        self.assertEqual(c.stats()['idle'], 1)
+        c.release_client(client1)
+        c.release_client(client2)
+        self.assertEqual(c.stats()['idle'], 3)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_max_idle(self):
+        c = ClientPool(max_size=5, max_idle=1)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        c.release_client(client1)
+        c.release_client(client2)
+        self.assertEqual(c.stats()['idle'], 1)
+        # the coldest client is disconnected
+        self.assertFalse(client1.is_connected())
+        self.assertTrue(client2.is_connected())
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_idle_time_expiration(self):
+        c = ClientPool(max_size=5, client_timeout=0.5, autoclose=True)
+        client1 = yield c.get_connected_client()
+        # the connection age does not matter
+        yield tornado.gen.sleep(0.6)
+        c.release_client(client1)
+        client2 = yield c.get_connected_client()
+        self.assertTrue(client1 is client2)
+        c.release_client(client2)
+        yield tornado.gen.sleep(0.7)
+        self.assertFalse(client1.is_connected())
+        self.assertEqual(c.stats()['idle'], 0)
+        c.destroy()
+
+    def _make_half_open(self, client):
+        # the PING will never be answered
+        client.call = mock.Mock(return_value=tornado.concurrent.Future())
+
+    @tornado.testing.gen_test
+    def test_validate_on_borrow(self):
+        c = ClientPool(max_size=5, validate_idle_after=0.05,
+                       validate_timeout=0.1)
+        client1 = yield c.get_connected_client()
+        c.release_client(client1)
+        client2 = yield c.get_connected_client()
+        # not validated (not idle for long enough)
+        self.assertTrue(client1 is client2)
+        c.release_client(client2)
+        yield tornado.gen.sleep(0.1)
+        client3 = yield c.get_connected_client()
+        # validated
+        self.assertTrue(client1 is client3)
+        self._make_half_open(client3)
+        c.release_client(client3)
+        yield tornado.gen.sleep(0.1)
+        client4 = yield c.get_connected_client()
+        self.assertFalse(client4 is client1)
+        self.assertTrue(client4.is_connected())
+        self.assertFalse(client1.is_connected())
+        c.release_client(client4)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_validate_on_return(self):
+        c = ClientPool(max_size=5, validate_on_return=True,
+                       validate_timeout=0.1)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        self._make_half_open(client2)
+        c.release_client(client1)
+        c.release_client(client2)
+        yield tornado.gen.sleep(0.2)
+        self.assertEqual(c.stats()['idle'], 1)
+        self.assertFalse(client2.is_connected())
+        client3 = yield c.get_connected_client()
+        self.assertTrue(client3 is client1)
+        c.release_client(client3)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_validate_on_return_reuse(self):
+        c = ClientPool(max_size=1, validate_on_return=True)
+        client1 = yield c.get_connected_client()
+        c.release_client(client1)
+        # (the client being validated is still counted against max_size)
+        self.assertTrue(c.get_client_nowait() is None)
+        client2 = yield c.get_connected_client()
+        self.assertTrue(client2 is client1)
+        c.release_client(client2)
+        c2 = ClientPool(validate_on_return=True)
+        client1 = yield c2.get_connected_client()
+        c2.release_client(client1)
+        # (an immediate borrow waits for the validation)
+        client2 = yield c2.get_connected_client()
+        self.assertTrue(client2 is client1)
+        stats = c2.stats()
+        self.assertEqual((stats["created"], stats["misses"]), (1, 1))
+        c2.release_client(client2)
+        c.destroy()
+        c2.destroy()
+
+    @tornado.testing.gen_test
+    def test_sweep_borrowed(self):
+        c = ClientPool(max_size=5, validate_timeout=0.1)
+        client1 = yield c.get_connected_client()
+        c.release_client(client1)
+        self._make_half_open(client1)
+        sweep = c._sweep()
+        # (borrowed during the validation => not disconnected)
+        client2 = yield c.get_connected_client()
+        self.assertTrue(client2 is client1)
+        yield sweep
+        self.assertTrue(client1.is_connected())
+        c.release_client(client2)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_sweep(self):
+        c = ClientPool(max_size=5, sweep_interval=0.1, validate_timeout=0.1)
+        client1 = yield c.get_connected_client()
+        client2 = yield c.get_connected_client()
+        c.release_client(client1)
+        c.release_client(client2)
+        self._make_half_open(client1)
+        yield tornado.gen.sleep(0.35)
+        self.assertEqual(c.stats()['idle'], 1)
+        self.assertFalse(client1.is_connected())
+        self.assertTrue(client2.is_connected())
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_acquire_timeout(self):
+        c = ClientPool(max_size=1, acquire_timeout=0.1)
+        client1 = yield c.get_connected_client()
+        before = time.time()
+        res = yield c.get_connected_client()
+        self.assertTrue(isinstance(res, ClientError))
+        self.assertTrue(str(res).startswith("timeout"))
+        self.assertTrue(time.time() - before >= 0.09)
+        self.assertEqual(c.stats()["timeouts"], 1)
+        c.release_client(res)
+        c.release_client(client1)
+        client2 = yield c.get_connected_client()
+        self.assertTrue(client2 is client1)
+        c.release_client(client2)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_max_waiters(self):
+        c = ClientPool(max_size=1, max_waiters=1)
+        client1 = yield c.get_connected_client()
+        future1 = c.get_connected_client()
+        res = yield c.get_connected_client()
+        self.assertTrue(isinstance(res, ClientError))
+        c.release_client(client1)
+        client2 = yield future1
+        self.assertTrue(client2 is client1)
+        c.release_client(client2)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_fifo_waiters(self):
+        c = ClientPool(max_size=1)
+        client1 = yield c.get_connected_client()
+        futures = [c.get_connected_client() for _ in range(0, 3)]
+        order = []
+        for i, future in enumerate(futures):
+            future.add_done_callback(lambda f, i=i: order.append(i))
+        c.release_client(client1)
+        for future in futures:
+            client = yield future
+            # (no barging)
+            self.assertTrue(c.get_client_nowait() is None)
+            c.release_client(client)
+        self.assertEqual(order, [0, 1, 2])
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_cancelled_waiter(self):
+        c = ClientPool(max_size=1)
+        client1 = yield c.get_connected_client()
+        future1 = c.get_connected_client()
+        future2 = c.get_connected_client()
+        if not future1.cancel():
+            # tornado < 5 futures can't be cancelled
+            c.release_client(client1)
+            c.release_client((yield future1))
+            c.release_client((yield future2))
+            c.destroy()
+            return
+        c.release_client(client1)
+        client2 = yield future2
+        self.assertTrue(client2 is client1)
+        c.release_client(client2)
+        self.assertTrue(c.get_client_nowait() is client1)
+        # (an abandoned wait is not a timeout)
+        self.assertEqual(c.stats()["timeouts"], 0)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_stats(self):
+        c = ClientPool(max_size=1, max_waiters=1, acquire_timeout=0.05)
+        stats = c.stats()
+        self.assertEqual(stats["hit_ratio"], None)
+        client1 = yield c.get_connected_client()
+        stats = c.stats()
+        self.assertEqual(stats["in_use"], 1)
+        self.assertEqual(stats["idle"], 0)
+        self.assertEqual(stats["created"], 1)
+        future = c.get_connected_client()
+        res = yield c.get_connected_client()
+        self.assertTrue(isinstance(res, ClientError))
+        self.assertEqual(c.stats()["waiters"], 1)
+        self.assertEqual(c.stats()["rejected"], 1)
+        res = yield future
+        self.assertTrue(isinstance(res, ClientError))
+        c.release_client(client1)
+        client2 = yield c.get_connected_client()
+        c.release_client(client2)
+        stats = c.stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(stats["waiters"], 0)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        self.assertEqual(sum(stats["wait_histogram"].values()), 2)
+        c.destroy()
+        stats = c.stats()
+        self.assertEqual(stats["destroyed"]["destroy"], 1)
+        self.assertEqual(sum(stats["destroyed"].values()), 1)
+
+    @tornado.testing.gen_test
+    def test_multiplexed(self):
+        c = ClientPool(max_size=1, multiplex_size=2)
+        # the exclusive client is not used by multiplexed calls
+        client1 = yield c.get_connected_client()
+        res = yield [c.call("PING") for _ in range(0, 10)]
+        self.assertEqual(res, [b"PONG"] * 10)
+        self.assertEqual(c.stats()["shared"], 2)
+        # (exclusive command => waits for the exclusive client)
+        future = c.call("CLIENT", "GETNAME")
+        yield tornado.gen.sleep(0.05)
+        self.assertFalse(future.done())
+        c.release_client(client1)
+        res = yield future
+        self.assertTrue(res is None)
+        yield c.call("DEL", "test_multiplexed")
+        res = yield c.call("BLPOP", "test_multiplexed", "0.01")
+        self.assertTrue(res is None)
+        stats = c.stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 2)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_drain(self):
+        c = ClientPool(max_size=1)
+        client1 = yield c.get_connected_client()
+        future = c.get_connected_client()
+        c.drain()
+        res = yield future
+        self.assertTrue(isinstance(res, ClientError))
+        self.assertEqual(str(res), "the pool is drained")
+        self.assertEqual(c.stats()["timeouts"], 0)
+        self.assertTrue(client1.is_connected())
+        c.release_client(client1)
+        self.assertFalse(client1.is_connected())
+        self.assertEqual(c.stats()["idle"], 0)
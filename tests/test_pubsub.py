@@ -86,6 +86,17 @@ class PubSubClientTestCase(tornado.testing.AsyncTestCase):
         self.assertFalse(c.subscribed)
         c.disconnect()
 
+    @tornado.testing.gen_test
+    def test_pubsub_ping(self):
+        c = PubSubClient()
+        yield c.connect()
+        self.assertFalse(c.pubsub_ping())
+        yield c.pubsub_subscribe("foo")
+        self.assertTrue(c.pubsub_ping())
+        msg = yield c.pubsub_pop_message(deadline=1)
+        self.assertEqual(msg, [b"pong", b""])
+        c.disconnect()
+
     @tornado.testing.gen_test
     def test_empty_subscribe(self):
         c = PubSubClient()
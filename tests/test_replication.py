@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+
+from tornadis.replication import ReplicatedClientPool, parse_info
+from tornadis.replication import replica_lag
+from tornadis.client import Client
+from tornadis.pipeline import Pipeline
+from support import test_redis_or_raise_skiptest, unused_port
+
+INFO_PRIMARY = b"""# Replication\r
+role:master\r
+connected_slaves:1\r
+master_repl_offset:1000\r
+"""
+
+INFO_REPLICA = b"""# Replication\r
+role:slave\r
+master_link_status:up\r
+slave_repl_offset:900\r
+"""
+
+
+class ReplicationUtilsTestCase(unittest.TestCase):
+
+    def test_parse_info(self):
+        info = parse_info(INFO_PRIMARY)
+        self.assertEqual(info["role"], "master")
+        self.assertEqual(info["master_repl_offset"], "1000")
+        self.assertFalse("# Replication" in info)
+
+    def test_replica_lag(self):
+        primary = parse_info(INFO_PRIMARY)
+        self.assertEqual(replica_lag(primary, parse_info(INFO_REPLICA)), 100)
+        down = parse_info(INFO_REPLICA.replace(b":up", b":down"))
+        self.assertTrue(replica_lag(primary, down) is None)
+        self.assertTrue(replica_lag(primary, primary) is None)
+
+
+class ReplicatedClientPoolTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(ReplicatedClientPoolTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.gen.coroutine
+    def _call_in_db(self, db, *args):
+        client = Client(db=db)
+        yield client.connect()
+        yield client.call(*args)
+        client.disconnect()
+
+    # (the "replica" is simulated with another database of the same server)
+
+    @tornado.testing.gen_test
+    def test_read_write_splitting(self):
+        yield self._call_in_db(1, "SET", "foo", "replica")
+        pool = ReplicatedClientPool(primary={"db": 0}, replicas=[{"db": 1}],
+                                    check_interval=None)
+        res = yield pool.call("SET", "foo", "primary")
+        self.assertEqual(res, b"OK")
+        res = yield pool.call("GET", "foo")
+        self.assertEqual(res, b"replica")
+        pipeline = Pipeline()
+        pipeline.stack_call("GET", "foo")
+        pipeline.stack_call("EXISTS", "foo")
+        res = yield pool.call(pipeline)
+        self.assertEqual(res, [b"replica", 1])
+        pipeline.stack_call("INCR", "bar")
+        res = yield pool.call(pipeline)
+        self.assertEqual(res[0], b"primary")
+        yield pool.call("DEL", "foo", "bar")
+        stats = pool.stats()
+        self.assertEqual(len(stats["replicas"]), 1)
+        self.assertTrue(stats["replicas"][0]["latency"] > 0)
+        pool.destroy()
+        yield self._call_in_db(1, "DEL", "foo")
+
+    @tornado.testing.gen_test
+    def test_replica_check(self):
+        yield self._call_in_db(1, "SET", "foo", "replica")
+        yield self._call_in_db(0, "SET", "foo", "primary")
+        pool = ReplicatedClientPool(primary={"db": 0}, replicas=[{"db": 1}],
+                                    check_interval=None)
+        # (the db 1 of the primary is not a real replica => excluded)
+        yield pool._check_replicas()
+        self.assertTrue(pool.stats()["replicas"][0]["excluded"])
+        res = yield pool.call("GET", "foo")
+        self.assertEqual(res, b"primary")
+        yield pool.call("DEL", "foo")
+        pool.destroy()
+        yield self._call_in_db(1, "DEL", "foo")
+
+    @tornado.testing.gen_test
+    def test_replica_failure(self):
+        yield self._call_in_db(0, "SET", "foo", "primary")
+        pool = ReplicatedClientPool(primary={"db": 0},
+                                    replicas=[{"port": 1}],
+                                    check_interval=None)
+        res = yield pool.call("GET", "foo")
+        self.assertEqual(res, b"primary")
+        self.assertTrue(pool.stats()["replicas"][0]["excluded"])
+        yield pool.call("DEL", "foo")
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_replica_retry(self):
+        # (without checks, a failed replica is tried again after
+        # retry_delay)
+        pool = ReplicatedClientPool(primary={"db": 0},
+                                    replicas=[{"port": unused_port()}],
+                                    check_interval=None, retry_delay=0.1)
+        res = yield pool.call("GET", "test_replica_retry")
+        self.assertTrue(res is None)
+        self.assertTrue(pool.stats()["replicas"][0]["excluded"])
+        yield tornado.gen.sleep(0.2)
+        self.assertFalse(pool.stats()["replicas"][0]["excluded"])
+        res = yield pool.call("GET", "test_replica_retry")
+        self.assertTrue(res is None)
+        stats = pool.stats()["replicas"][0]
+        self.assertTrue(stats["excluded"])
+        self.assertEqual(stats["stats"]["misses"], 2)
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_set_topology(self):
+        pool = ReplicatedClientPool(primary={"db": 0}, replicas=[{"db": 1}],
+                                    check_interval=None)
+        before = pool.stats()["replicas"][0]
+        pool.set_topology({"db": 0}, [{"db": 1}, {"db": 2}])
+        stats = pool.stats()
+        self.assertEqual(len(stats["replicas"]), 2)
+        self.assertEqual(stats["replicas"][0]["node"], before["node"])
+        pool.set_topology({"db": 1}, [{"db": 0}])
+        stats = pool.stats()
+        self.assertEqual([r["node"] for r in stats["replicas"]], [{"db": 0}])
+        res = yield pool.call("PING")
+        self.assertEqual(res, b"PONG")
+        pool.destroy()
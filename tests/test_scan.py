@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+
+from tornadis.client import Client
+from tornadis.scan import ScanIterator, _StopAsyncIteration
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import ConnectionError
+from support import test_redis_or_raise_skiptest
+
+
+class ScanIteratorTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(ScanIteratorTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    @tornado.gen.coroutine
+    def _populate(self, client):
+        p = Pipeline()
+        p.stack_call("DEL", "test_scan_hash", "test_scan_set",
+                     "test_scan_zset")
+        for i in range(0, 500):
+            p.stack_call("SET", "test_scan_key_%i" % i, "foo")
+            p.stack_call("HSET", "test_scan_hash", "field%i" % i, i)
+            p.stack_call("SADD", "test_scan_set", "member%i" % i)
+            p.stack_call("ZADD", "test_scan_zset", i, "member%i" % i)
+        yield client.call(p)
+
+    @tornado.gen.coroutine
+    def _consume(self, iterator):
+        res = []
+        while True:
+            batch = yield iterator.next_batch()
+            if batch is None:
+                break
+            self.assertTrue(len(batch) > 0)
+            res.extend(batch)
+        raise tornado.gen.Return(res)
+
+    @tornado.testing.gen_test
+    def test_scan(self):
+        c = Client()
+        yield c.connect()
+        yield self._populate(c)
+        iterator = c.scan_iter(match="test_scan_key_*", count=10)
+        keys = yield self._consume(iterator)
+        self.assertEqual(len(set(keys)), 500)
+        batch = yield iterator.next_batch()
+        self.assertTrue(batch is None)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_scan_type(self):
+        c = Client()
+        yield c.connect()
+        yield self._populate(c)
+        iterator = c.scan_iter(match="test_scan_*", type="hash")
+        keys = yield self._consume(iterator)
+        self.assertEqual(set(keys), set([b"test_scan_hash"]))
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_hscan_sscan_zscan(self):
+        c = Client()
+        yield c.connect()
+        yield self._populate(c)
+        fields = yield self._consume(c.hscan_iter("test_scan_hash"))
+        self.assertEqual(len(fields), 500)
+        self.assertTrue((b"field12", b"12") in fields)
+        members = yield self._consume(c.sscan_iter("test_scan_set",
+                                                   count=10))
+        self.assertEqual(len(set(members)), 500)
+        members = yield self._consume(c.zscan_iter("test_scan_zset"))
+        self.assertTrue((b"member12", b"12") in members)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_adaptive_count(self):
+        iterator = ScanIterator(None, "SCAN", count=100, min_count=10,
+                                max_count=150, target_latency=0.01)
+        iterator._adapt_count(0.001)
+        self.assertEqual(iterator.count, 150)
+        iterator._adapt_count(1)
+        self.assertEqual(iterator.count, 75)
+        for i in range(0, 10):
+            iterator._adapt_count(1)
+        self.assertEqual(iterator.count, 10)
+
+    @tornado.testing.gen_test
+    def test_anext(self):
+        c = Client()
+        yield c.connect()
+        yield self._populate(c)
+        iterator = c.sscan_iter("test_scan_set").__aiter__()
+        members = []
+        try:
+            while True:
+                batch = yield iterator.__anext__()
+                members.extend(batch)
+        except _StopAsyncIteration:
+            pass
+        self.assertEqual(len(set(members)), 500)
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_error(self):
+        c = Client(autoconnect=False)
+        iterator = c.scan_iter()
+        res = yield iterator.next_batch()
+        self.assertTrue(isinstance(res, ConnectionError))
+        res = yield iterator.next_batch()
+        self.assertTrue(res is None)
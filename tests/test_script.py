@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tornado.testing
+import tornado.ioloop
+
+from tornadis.client import Client
+from tornadis.pool import ClientPool
+from tornadis.pipeline import Pipeline
+from tornadis.script import Script
+from tornadis.exceptions import ClientError
+from support import test_redis_or_raise_skiptest
+
+
+SCRIPT = "return {KEYS[1], ARGV[1]}"
+
+
+class ScriptTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(ScriptTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def test_sha(self):
+        s = Script("return 1")
+        self.assertEqual(s.sha, "e0e1f9fabfc9d4800c877a703b823ac0578ff8db")
+
+    @tornado.testing.gen_test
+    def test_no_target(self):
+        s = Script(SCRIPT)
+        res = yield s.call(keys=["foo"], args=["bar"])
+        self.assertTrue(isinstance(res, ClientError))
+
+    @tornado.testing.gen_test
+    def test_call_noscript(self):
+        c = Client()
+        yield c.connect()
+        yield c.call("SCRIPT", "FLUSH")
+        s = Script(SCRIPT, c)
+        res = yield s.call(keys=["foo"], args=["bar"])
+        self.assertEqual(res, [b"foo", b"bar"])
+        res = yield c.call("SCRIPT", "EXISTS", s.sha)
+        self.assertEqual(res, [1])
+        res = yield s.call(keys=["foo2"], args=["bar2"])
+        self.assertEqual(res, [b"foo2", b"bar2"])
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_call_pool(self):
+        c = ClientPool(max_size=2)
+        s = Script(SCRIPT, c)
+        res = yield s.call(keys=["foo"], args=["bar"])
+        self.assertEqual(res, [b"foo", b"bar"])
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_pipeline(self):
+        c = Client()
+        yield c.connect()
+        yield c.call("SCRIPT", "FLUSH")
+        s = Script(SCRIPT)
+        for transaction in (False, True):
+            p = Pipeline(transaction=transaction)
+            s.stack_call(p, keys=["foo"], args=["bar"])
+            p.stack_call("PING")
+            s.stack_call(p, keys=["foo2"], args=["bar2"])
+            res = yield c.call(p)
+            self.assertEqual(res, [[b"foo", b"bar"], b"PONG",
+                                   [b"foo2", b"bar2"]])
+        c.disconnect()
+
+    @tornado.testing.gen_test
+    def test_pipeline_flushed_script(self):
+        c = Client()
+        yield c.connect()
+        s = Script(SCRIPT)
+        p = Pipeline()
+        s.stack_call(p, keys=["foo"], args=["bar"])
+        res = yield c.call(p)
+        self.assertEqual(res, [[b"foo", b"bar"]])
+        yield c.call("SCRIPT", "FLUSH")
+        res = yield c.call(p)
+        self.assertTrue(isinstance(res[0], ClientError))
+        # the script is reloaded with the next pipeline
+        res = yield c.call(p)
+        self.assertEqual(res, [[b"foo", b"bar"]])
+        c.disconnect()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+
+from tornadis.sentinel import SentinelClientPool, parse_sentinel_replicas
+from tornadis.sentinel import parse_switch_master, is_failover_error
+from tornadis.exceptions import ConnectionError, ClientError
+from support import test_redis_or_raise_skiptest, unused_port
+from support import FakeRedisServer, encode_reply
+
+
+class FakeSentinel(FakeRedisServer):
+    """Minimal sentinel server (for a single "mymaster" service)."""
+
+    def __init__(self):
+        FakeRedisServer.__init__(self)
+        self.primary = ("127.0.0.1", "6379")
+        self.replicas = []
+        self.subscribers = []
+        # (if False, PINGs are not answered: half-open connection)
+        self.answer_ping = True
+
+    def publish(self, payload):
+        for stream in self.subscribers:
+            stream.write(encode_reply([b"message", b"+switch-master",
+                                       payload]))
+
+    def handle_command(self, stream, command):
+        name = command[0].upper()
+        if name == b"SUBSCRIBE":
+            self.subscribers.append(stream)
+            return [b"subscribe", command[1], 1]
+        if name == b"PING":
+            return [b"pong", b""] if self.answer_ping else None
+        if name == b"SENTINEL" and command[2] == b"mymaster":
+            subcommand = command[1].lower()
+            if subcommand == b"get-master-addr-by-name":
+                return list(self.primary)
+            if subcommand == b"replicas":
+                return self.replicas
+        return Exception("ERR unknown command")
+
+    def on_close(self, stream):
+        if stream in self.subscribers:
+            self.subscribers.remove(stream)
+
+
+class SentinelUtilsTestCase(unittest.TestCase):
+
+    def test_parse_sentinel_replicas(self):
+        reply = [[b"ip", b"10.0.0.2", b"port", b"6380", b"flags", b"slave",
+                  b"master-link-status", b"ok"],
+                 [b"ip", b"10.0.0.3", b"port", b"6380", b"flags",
+                  b"s_down,slave", b"master-link-status", b"ok"],
+                 [b"ip", b"10.0.0.4", b"port", b"6380", b"flags", b"slave",
+                  b"master-link-status", b"err"]]
+        self.assertEqual(parse_sentinel_replicas(reply),
+                         [{"host": "10.0.0.2", "port": 6380}])
+
+    def test_parse_switch_master(self):
+        res = parse_switch_master(b"mymaster 10.0.0.1 6379 10.0.0.2 6380")
+        self.assertEqual(res, ("mymaster", {"host": "10.0.0.2",
+                                            "port": 6380}))
+        self.assertTrue(parse_switch_master(b"foo") is None)
+
+    def test_is_failover_error(self):
+        self.assertTrue(is_failover_error(ConnectionError("closed")))
+        self.assertTrue(is_failover_error(ClientError("READONLY You can't "
+                                                      "write")))
+        self.assertFalse(is_failover_error(ClientError("WRONGTYPE")))
+        self.assertFalse(is_failover_error(b"OK"))
+
+
+class SentinelClientPoolTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(SentinelClientPoolTestCase, self).setUp()
+        self.sentinel = FakeSentinel()
+        self.sentinel_port = self.sentinel.port
+
+    def tearDown(self):
+        self.sentinel.stop()
+        super(SentinelClientPoolTestCase, self).tearDown()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    def _new_pool(self, **kwargs):
+        return SentinelClientPool("mymaster",
+                                  [("127.0.0.1", self.sentinel_port)],
+                                  check_interval=None, **kwargs)
+
+    @tornado.gen.coroutine
+    def _wait_for(self, condition):
+        for _ in range(100):
+            if condition():
+                break
+            yield tornado.gen.sleep(0.01)
+
+    @tornado.testing.gen_test
+    def test_discovery(self):
+        pool = self._new_pool()
+        res = yield pool.call("PING")
+        self.assertEqual(res, b"PONG")
+        stats = pool.stats()
+        self.assertEqual(stats["primary_node"], {"host": "127.0.0.1",
+                                                 "port": 6379})
+        self.assertEqual(stats["replicas"], [])
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_no_sentinel(self):
+        port = unused_port()
+        pool = SentinelClientPool("mymaster", [("127.0.0.1", port)],
+                                  check_interval=None)
+        res = yield pool.call("PING")
+        self.assertTrue(isinstance(res, ClientError))
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_switch_master(self):
+        pool = self._new_pool()
+        yield self._wait_for(lambda: len(self.sentinel.subscribers) == 1)
+        self.assertEqual(len(self.sentinel.subscribers), 1)
+        client = yield pool.get_connected_client()
+        self.sentinel.primary = ("localhost", "6379")
+        self.sentinel.publish(b"mymaster 127.0.0.1 6379 localhost 6379")
+        yield self._wait_for(lambda: pool.stats()["failovers"] == 1)
+        stats = pool.stats()
+        self.assertEqual(stats["primary_node"], {"host": "localhost",
+                                                 "port": 6379})
+        # (the old primary pool is drained)
+        pool.release_client(client)
+        self.assertFalse(client.is_connected())
+        res = yield pool.call("PING")
+        self.assertEqual(res, b"PONG")
+        pool.destroy()
+        yield self._wait_for(lambda: len(self.sentinel.subscribers) == 0)
+        self.assertEqual(len(self.sentinel.subscribers), 0)
+
+    @tornado.testing.gen_test
+    def test_dead_sentinel_connection(self):
+        pool = self._new_pool(watch_ping_interval=0.05,
+                              watch_retry_delay=0.01)
+
+        def subscribes():
+            return len([c for c in self.sentinel.commands
+                        if c[0] == b"SUBSCRIBE"])
+        yield self._wait_for(lambda: subscribes() == 1)
+        # (answered PINGs => the connection is kept)
+        yield tornado.gen.sleep(0.2)
+        self.assertEqual(subscribes(), 1)
+        self.sentinel.answer_ping = False
+        yield self._wait_for(lambda: subscribes() == 2)
+        self.assertEqual(subscribes(), 2)
+        pool.destroy()
+
+    @tornado.testing.gen_test
+    def test_retry_reads(self):
+        port = unused_port()
+        self.sentinel.primary = ("127.0.0.1", str(port))
+        pool = self._new_pool()
+        yield pool.discover()
+        self.sentinel.primary = ("127.0.0.1", "6379")
+        # (not retried but the topology is refreshed)
+        res = yield pool.call("SET", "foo", "bar")
+        self.assertTrue(isinstance(res, ClientError))
+        self.sentinel.primary = ("127.0.0.1", str(port))
+        yield pool.discover()
+        self.sentinel.primary = ("127.0.0.1", "6379")
+        res = yield pool.call("GET", "foo")
+        self.assertTrue(res is None)
+        pool.destroy()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import tornado.testing
+import tornado.ioloop
+import tornado.gen
+
+from tornadis.sharding import HashRing, ShardedClient
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import ClientError
+from support import test_redis_or_raise_skiptest
+
+KEYS = ["key%i" % i for i in range(0, 10000)]
+
+
+class HashRingTestCase(unittest.TestCase):
+
+    def test_get_node(self):
+        self.assertTrue(HashRing().get_node("foo") is None)
+        ring = HashRing({"a": 1, "b": 1, "c": 1})
+        self.assertTrue(ring.get_node("foo") in ("a", "b", "c"))
+        self.assertEqual(ring.get_node("{user1}.name"),
+                         ring.get_node("{user1}.email"))
+        # (the ring doesn't depend on the insertion order)
+        ring2 = HashRing()
+        for name in ("c", "a", "b"):
+            ring2.add_node(name)
+        self.assertEqual([ring.get_node(k) for k in KEYS],
+                         [ring2.get_node(k) for k in KEYS])
+
+    def test_minimal_remapping(self):
+        ring = HashRing({"a": 1, "b": 1, "c": 1, "d": 1})
+        before = dict((k, ring.get_node(k)) for k in KEYS)
+        ring.remove_node("d")
+        for key in KEYS:
+            if before[key] != "d":
+                self.assertEqual(ring.get_node(key), before[key])
+        ring.add_node("d")
+        self.assertEqual(before, dict((k, ring.get_node(k)) for k in KEYS))
+
+    def test_weights(self):
+        ring = HashRing({"a": 1, "b": 3})
+        on_b = sum(1 for k in KEYS if ring.get_node(k) == "b")
+        self.assertTrue(0.65 < float(on_b) / len(KEYS) < 0.85)
+
+
+class ShardedClientTestCase(tornado.testing.AsyncTestCase):
+
+    def setUp(self):
+        test_redis_or_raise_skiptest()
+        super(ShardedClientTestCase, self).setUp()
+
+    def get_new_ioloop(self):
+        return tornado.ioloop.IOLoop.instance()
+
+    # (shards are simulated with several databases of the same server)
+
+    def _new_client(self):
+        return ShardedClient([{"name": "s%i" % i, "db": i}
+                              for i in range(0, 3)])
+
+    @tornado.testing.gen_test
+    def test_call(self):
+        c = self._new_client()
+        keys = ["foo%i" % i for i in range(0, 30)]
+        self.assertEqual(len(set(c.get_node(k) for k in keys)), 3)
+        args = []
+        for i, key in enumerate(keys):
+            args.extend([key, str(i)])
+        res = yield c.call("MSET", *args)
+        self.assertEqual(res, b"OK")
+        res = yield c.call("GET", "foo3")
+        self.assertEqual(res, b"3")
+        # (the key is stored on its own shard only)
+        res = yield c.get_pool("foo3").call("GET", "foo3")
+        self.assertEqual(res, b"3")
+        res = yield c.call("MGET", *keys)
+        self.assertEqual(res, [str(i).encode() for i in range(0, 30)])
+        pipeline = Pipeline()
+        pipeline.stack_call("INCR", "foo1")
+        pipeline.stack_call("PING")
+        pipeline.stack_call("SUNION", "foo1", "foo2", "foo3")
+        pipeline.stack_call("GET", "foo2")
+        res = yield c.call(pipeline)
+        self.assertEqual(res[0:2], [2, b"PONG"])
+        self.assertTrue(isinstance(res[2], ClientError))
+        self.assertEqual(res[3], b"2")
+        res = yield c.call("DEL", *keys)
+        self.assertEqual(res, 30)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_numkeys_call(self):
+        c = self._new_client()
+        keys = ["{foo}1", "{foo}2"]
+        # (the numkeys argument must not be used to route the command)
+        self.assertNotEqual(c.get_node(2), c.get_node(keys[0]))
+        for key in keys:
+            res = yield c.call("ZADD", key, 1, "x")
+            self.assertEqual(res, 1)
+        res = yield c.call("ZINTER", 2, *keys)
+        self.assertEqual(res, [b"x"])
+        res = yield c.get_pool(keys[0]).call("ZINTER", 2, *keys)
+        self.assertEqual(res, [b"x"])
+        res = yield c.call("DEL", *keys)
+        self.assertEqual(res, 2)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_non_key_argument(self):
+        c = self._new_client()
+        keys = ["{foo}1", "{foo}2"]
+        # (the member of SMOVE must not be used to route the command)
+        self.assertNotEqual(c.get_node("x"), c.get_node(keys[0]))
+        yield c.call("SADD", keys[0], "x")
+        res = yield c.call("SMOVE", keys[0], keys[1], "x")
+        self.assertEqual(res, 1)
+        res = yield c.get_pool(keys[1]).call("SMEMBERS", keys[1])
+        self.assertEqual(res, [b"x"])
+        res = yield c.call("DEL", *keys)
+        self.assertEqual(res, 1)
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_transaction(self):
+        c = self._new_client()
+
+        def incr(client, pipeline):
+            pipeline.stack_call("INCR", "{foo}1")
+        res = yield c.transaction(incr, "{foo}1")
+        self.assertEqual(res, [1])
+        res = yield c.transaction(incr, "foo1", "foo2", "foo3", "foo4")
+        self.assertTrue(isinstance(res, ClientError))
+        yield c.call("DEL", "{foo}1")
+        c.destroy()
+
+    @tornado.testing.gen_test
+    def test_remove_node(self):
+        c = self._new_client()
+        keys = ["foo%i" % i for i in range(0, 10)]
+        before = dict((k, c.get_node(k)) for k in keys)
+        c.remove_node("s1")
+        for key in keys:
+            self.assertNotEqual(c.get_node(key), "s1")
+            if before[key] != "s1":
+                self.assertEqual(c.get_node(key), before[key])
+        self.assertEqual(sorted(c.stats().keys()), ["s0", "s2"])
+        res = yield c.call("MGET", *keys)
+        self.assertEqual(res, [None] * 10)
+        c.destroy()
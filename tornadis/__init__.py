@@ -15,11 +15,31 @@ from tornadis.utils import WriteBuffer  # noqa
 from tornadis.client import Client  # noqa
 from tornadis.pubsub import PubSubClient  # noqa
 from tornadis.pool import ClientPool  # noqa
+from tornadis.loop_pool import LoopAwareClientPool  # noqa
+from tornadis.replication import ReplicatedClientPool  # noqa
+from tornadis.sentinel import SentinelClientPool  # noqa
+from tornadis.cluster import ClusterClient  # noqa
+from tornadis.sharding import ShardedClient, HashRing  # noqa
 from tornadis.pipeline import Pipeline  # noqa
+from tornadis.file_argument import FileArgument  # noqa
+from tornadis.script import Script  # noqa
+from tornadis.scan import ScanIterator  # noqa
+from tornadis.bulk import BulkWriter  # noqa
+from tornadis.executor import StreamingExecutor  # noqa
+from tornadis.aggregator import WriteBehindAggregator  # noqa
+from tornadis.cache import TwoTierCache, LocalCache  # noqa
+from tornadis.codec import CompressionCodec, Compressor  # noqa
+from tornadis.codec import ZlibCompressor, LzmaCompressor  # noqa
 from tornadis.connection import Connection  # noqa
 from tornadis.exceptions import ConnectionError, ClientError  # noqa
-from tornadis.exceptions import TornadisException  # noqa
+from tornadis.exceptions import TornadisException, WatchError  # noqa
 
-__all__ = ['Client', 'ClientPool', 'Pipeline',
-           'ConnectionError', 'ClientError', 'TornadisException',
-           'PubSubClient', 'WriteBuffer', 'Connection']
+__all__ = ['Client', 'ClientPool', 'LoopAwareClientPool', 'Pipeline',
+           'Script', 'ScanIterator', 'BulkWriter', 'StreamingExecutor',
+           'CompressionCodec', 'Compressor', 'ZlibCompressor',
+           'LzmaCompressor', 'ConnectionError', 'ClientError',
+           'TornadisException', 'WatchError', 'PubSubClient', 'WriteBuffer',
+           'Connection', 'FileArgument', 'WriteBehindAggregator',
+           'TwoTierCache', 'LocalCache', 'ReplicatedClientPool',
+           'SentinelClientPool', 'ClusterClient', 'ShardedClient',
+           'HashRing']
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.ioloop
+import logging
+
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import TornadisException
+
+LOG = logging.getLogger(__name__)
+
+
+class WriteBehindAggregator(object):
+    """Write-behind aggregator for counters (INCRBY, HINCRBY and PFADD).
+
+    Increments are merged in memory (per key or per (key, field)) and sent
+    to redis as a single pipeline on a regular interval (so a counter is
+    never more than "interval" seconds stale on the redis side) or when the
+    number of pending entries reaches max_pending. The close() method makes
+    a final flush.
+
+    Note: if a flush fails (for example because of a connection error), the
+    corresponding increments are lost (they are not merged back because a
+    part of the pipeline may have been applied).
+
+    Attributes:
+        target: the Client or ClientPool object to use.
+        interval (float): max delay (in seconds) between two flushes.
+        max_pending (int): number of pending entries (keys, (key, field)
+            couples and PFADD elements) which triggers a flush.
+    """
+
+    def __init__(self, target, interval=1.0, max_pending=10000, ioloop=None):
+        """Constructor.
+
+        Args:
+            target: the Client or ClientPool object to use.
+            interval (float): max delay (in seconds) between two flushes.
+            max_pending (int): number of pending entries (keys,
+                (key, field) couples and PFADD elements) which triggers a
+                flush.
+            ioloop (IOLoop): the tornado ioloop to use.
+        """
+        self.target = target
+        self.interval = interval
+        self.max_pending = max_pending
+        self.__ioloop = ioloop or tornado.ioloop.IOLoop.instance()
+        self.__flush_scheduled = False
+        self.__reset()
+        every = int(interval * 1000)
+        if int(tornado.version[0]) >= 5:
+            cb = tornado.ioloop.PeriodicCallback(self._on_interval, every)
+        else:
+            cb = tornado.ioloop.PeriodicCallback(self._on_interval, every,
+                                                 self.__ioloop)
+        self.__periodic_callback = cb
+        self.__periodic_callback.start()
+
+    def __reset(self):
+        self.__incrby = {}
+        self.__hincrby = {}
+        self.__pfadd = {}
+        self.__pending = 0
+
+    @property
+    def pending(self):
+        """Number of pending (not flushed) entries."""
+        return self.__pending
+
+    def incrby(self, key, amount=1):
+        """Merges an INCRBY increment.
+
+        Args:
+            key: the redis key.
+            amount (int): the increment.
+        """
+        if key in self.__incrby:
+            self.__incrby[key] += amount
+        else:
+            self.__incrby[key] = amount
+            self._add_pending(1)
+
+    def hincrby(self, key, field, amount=1):
+        """Merges an HINCRBY increment.
+
+        Args:
+            key: the redis key.
+            field: the hash field.
+            amount (int): the increment.
+        """
+        k = (key, field)
+        if k in self.__hincrby:
+            self.__hincrby[k] += amount
+        else:
+            self.__hincrby[k] = amount
+            self._add_pending(1)
+
+    def pfadd(self, key, *elements):
+        """Merges PFADD elements.
+
+        Args:
+            key: the redis key.
+            *elements: elements to add to the HyperLogLog.
+        """
+        try:
+            elements_set = self.__pfadd[key]
+        except KeyError:
+            elements_set = self.__pfadd[key] = set()
+        before = len(elements_set)
+        elements_set.update(elements)
+        self._add_pending(len(elements_set) - before)
+
+    def _add_pending(self, number):
+        self.__pending += number
+        if self.__pending >= self.max_pending and \
+                not self.__flush_scheduled:
+            # (a single background flush at a time)
+            self.__flush_scheduled = True
+            self.__ioloop.add_callback(self._background_flush)
+
+    def _on_interval(self):
+        if self.__pending > 0 and not self.__flush_scheduled:
+            self.__flush_scheduled = True
+            self._background_flush()
+
+    @tornado.gen.coroutine
+    def _background_flush(self):
+        try:
+            res = yield self.flush()
+        finally:
+            self.__flush_scheduled = False
+        if isinstance(res, TornadisException):
+            LOG.warning("can't flush aggregated counters: %s", res)
+
+    @tornado.gen.coroutine
+    def flush(self):
+        """Sends all pending increments to redis (in a single pipeline).
+
+        Returns:
+            a Future with True as result (or a TornadisException object in
+                case of errors).
+        """
+        pipeline = Pipeline()
+        for key, amount in self.__incrby.items():
+            if amount != 0:
+                pipeline.stack_call("INCRBY", key, amount)
+        for (key, field), amount in self.__hincrby.items():
+            if amount != 0:
+                pipeline.stack_call("HINCRBY", key, field, amount)
+        for key, elements in self.__pfadd.items():
+            pipeline.stack_call("PFADD", key, *elements)
+        self.__reset()
+        if pipeline.number_of_stacked_calls == 0:
+            raise tornado.gen.Return(True)
+        res = yield self.target.call(pipeline)
+        if isinstance(res, TornadisException):
+            raise tornado.gen.Return(res)
+        for reply in res:
+            if isinstance(reply, TornadisException):
+                raise tornado.gen.Return(reply)
+        raise tornado.gen.Return(True)
+
+    def close(self):
+        """Stops the periodic flush and makes a final flush.
+
+        Returns:
+            a Future with True as result (or a TornadisException object in
+                case of errors).
+        """
+        self.__periodic_callback.stop()
+        return self.flush()
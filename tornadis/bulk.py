@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+
+from tornadis.utils import format_args_in_redis_protocol
+from tornadis.write_buffer import WriteBuffer
+from tornadis.exceptions import ConnectionError, TornadisException
+
+REPLY_OFF = bytes(format_args_in_redis_protocol("CLIENT", "REPLY", "OFF"))
+REPLY_ON = bytes(format_args_in_redis_protocol("CLIENT", "REPLY", "ON"))
+PING = bytes(format_args_in_redis_protocol("PING"))
+
+
+class BulkWriter(object):
+    """Fire-and-forget writer object for write-only workloads.
+
+    Commands are buffered and written by chunks bracketed with
+    CLIENT REPLY OFF / CLIENT REPLY ON (in the same write). So redis does
+    not send any reply for these commands and there is nothing to parse or
+    to dispatch on the client side. The finish() method ends the stream
+    with a single PING barrier which confirms the delivery.
+
+    Note: as there is no reply, errors on individual commands are silently
+    ignored. Redis >= 3.2 is required.
+
+    More informations on the redis side: http://redis.io/commands/client-reply
+
+    Attributes:
+        client (Client): the Client object to use.
+        flush_size (int): size (in bytes) of buffered commands which
+            triggers an automatic flush.
+        stacked_calls (int): number of buffered (not flushed) commands.
+    """
+
+    def __init__(self, client, flush_size=65536):
+        """Constructor.
+
+        Args:
+            client (Client): the Client object to use.
+            flush_size (int): size (in bytes) of buffered commands which
+                triggers an automatic flush.
+        """
+        self.client = client
+        self.flush_size = flush_size
+        self.stacked_calls = 0
+        self.__buffer = WriteBuffer()
+
+    def call(self, *args):
+        """Buffers a redis command (without any reply).
+
+        If the buffer size exceeds flush_size, the buffer is automatically
+        flushed (if the client is connected).
+
+        Args:
+            *args: full redis command as variable length argument list.
+        """
+        if self.client.codec is not None:
+            args = self.client.codec.encode_command(args)
+        self.__buffer.append(format_args_in_redis_protocol(*args))
+        self.stacked_calls = self.stacked_calls + 1
+        if len(self.__buffer) >= self.flush_size and \
+                self.client.is_connected():
+            self._flush(barrier=False)
+
+    def _flush(self, barrier):
+        buf = WriteBuffer()
+        replies = 0
+        if self.stacked_calls > 0:
+            buf.append(REPLY_OFF)
+            buf.append(self.__buffer)
+            buf.append(REPLY_ON)
+            replies = replies + 1
+            self.__buffer = WriteBuffer()
+            self.stacked_calls = 0
+        if barrier:
+            buf.append(PING)
+            replies = replies + 1
+        if replies == 0:
+            return tornado.gen.maybe_future(True)
+        return tornado.gen.Task(self.client._raw_call, buf, replies)
+
+    @tornado.gen.coroutine
+    def _flush_and_check(self, barrier):
+        if not self.client.is_connected():
+            res = yield self.client.connect()
+            if not res:
+                raise tornado.gen.Return(
+                    ConnectionError("impossible to connect"))
+        replies = yield self._flush(barrier)
+        if replies is True:
+            raise tornado.gen.Return(True)
+        for reply in replies:
+            if isinstance(reply, TornadisException):
+                raise tornado.gen.Return(reply)
+        raise tornado.gen.Return(True)
+
+    def flush(self):
+        """Flushes buffered commands.
+
+        You can yield the returned Future from time to time to bound the
+        memory used by buffers (backpressure).
+
+        Returns:
+            a Future with True as result when redis has processed flushed
+                commands (or a TornadisException object in case of errors).
+        """
+        return self._flush_and_check(False)
+
+    def finish(self):
+        """Flushes buffered commands and sends a PING barrier.
+
+        Returns:
+            a Future with True as result when redis has processed all
+                commands (or a TornadisException object in case of errors).
+
+        Examples:
+
+            >>> writer = client.bulk_writer()
+            >>> for i in range(0, 1000000):
+                    writer.call("INCR", "counter")
+            >>> result = yield writer.finish()
+        """
+        return self._flush_and_check(True)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.concurrent
+import collections
+import functools
+import logging
+import math
+import random
+import sys
+import time
+import six
+
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import TornadisException
+
+LOG = logging.getLogger(__name__)
+
+
+def _sizeof(value):
+    if isinstance(value, (six.binary_type, six.text_type)):
+        return len(value)
+    # (containers: their own size plus the size of their elements, for
+    # example HGETALL or LRANGE replies)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(x) for x in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + \
+            sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+
+class LocalCache(object):
+    """In-process LRU cache bounded in bytes with a TTL per entry.
+
+    Attributes:
+        max_bytes (int): max size (in bytes) of stored values.
+        size (int): current size (in bytes) of stored values.
+    """
+
+    def __init__(self, max_bytes=10485760):
+        """Constructor.
+
+        Args:
+            max_bytes (int): max size (in bytes) of stored values.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.__entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def get(self, key):
+        """Returns the (value, extra) tuple of a key (or None).
+
+        Expired entries are removed (and None is returned).
+        """
+        try:
+            entry = self.__entries[key]
+        except KeyError:
+            return None
+        if entry[2] <= time.time():
+            self.delete(key)
+            return None
+        # most recently used at the end
+        del self.__entries[key]
+        self.__entries[key] = entry
+        return (entry[0], entry[3])
+
+    def set(self, key, value, expire_at, extra=None):
+        """Stores a value (and some extra data) until expire_at (timestamp).
+
+        Least recently used entries are evicted if necessary. Values bigger
+        than max_bytes are not stored.
+        """
+        self.delete(key)
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        while self.size + size > self.max_bytes:
+            _, entry = self.__entries.popitem(last=False)
+            self.size -= entry[1]
+        self.__entries[key] = (value, size, expire_at, extra)
+        self.size += size
+
+    def delete(self, key):
+        """Removes a key (if it exists)."""
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        """Removes all entries."""
+        self.__entries.clear()
+        self.size = 0
+
+
+class TwoTierCache(object):
+    """Cache-aside helper with an in-process L1 (LocalCache) over redis (L2).
+
+    Values are computed by a user function (on misses) and stored in redis
+    (with a ttl) and in the local LRU cache (with a ttl <= l1_ttl).
+
+    Expiration stampedes are avoided with:
+
+    - probabilistic early recomputation (XFetch): a value is recomputed
+      before its expiration with a probability which increases when the
+      expiration approaches (and with the time needed to compute it),
+    - a per-key recompute lock: only one coroutine per process recomputes
+      a given key, the others get the current (not expired) value or wait
+      for the computed one.
+
+    Values are stored in redis as hashes (value and computation time) so
+    redis >= 2.0 is required. They must be strings (bytes) or you have to
+    provide dumps/loads functions.
+
+    Attributes:
+        target: the Client or ClientPool object to use.
+        ttl (float): default ttl (in seconds) of values.
+        l1_ttl (float): max ttl (in seconds) of values in the local cache.
+        beta (float): XFetch beta parameter (> 1.0 favors earlier
+            recomputations, 0 disables early recomputations).
+        prefix (string): prefix of redis keys.
+        local_cache (LocalCache): the local (L1) cache.
+    """
+
+    def __init__(self, target, ttl=60, l1_ttl=5, l1_max_bytes=10485760,
+                 beta=1.0, prefix="", dumps=None, loads=None):
+        """Constructor.
+
+        Args:
+            target: the Client or ClientPool object to use.
+            ttl (float): default ttl (in seconds) of values.
+            l1_ttl (float): max ttl (in seconds) of values in the local
+                cache.
+            l1_max_bytes (int): max size (in bytes) of the local cache.
+            beta (float): XFetch beta parameter (> 1.0 favors earlier
+                recomputations, 0 disables early recomputations).
+            prefix (string): prefix of redis keys.
+            dumps (callable): function to serialize values (None means that
+                values are already strings).
+            loads (callable): function to unserialize values (None means
+                that values are strings).
+        """
+        self.target = target
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl
+        self.beta = beta
+        self.prefix = prefix
+        self.dumps = dumps
+        self.loads = loads
+        self.local_cache = LocalCache(l1_max_bytes)
+        self.__inflight = {}
+
+    def _is_fresh(self, expire_at, delta):
+        if self.beta <= 0 or delta <= 0:
+            return True
+        # XFetch: -delta * beta * log(rand()) is a random "advance" which
+        # is >= 0 (random() can return 0.0 => 1.0 - random() in ]0, 1])
+        advance = -delta * self.beta * math.log(1.0 - random.random())
+        return time.time() + advance < expire_at
+
+    @tornado.gen.coroutine
+    def get(self, key, fn, ttl=None):
+        """Returns the cached value of a key (computing it if necessary).
+
+        Args:
+            key (string): the cache key.
+            fn (callable): function (or coroutine) called without argument
+                to compute the value.
+            ttl (float): ttl (in seconds) of the value (None means the
+                default ttl).
+
+        Returns:
+            a Future with the value as result (exceptions raised by fn
+                are propagated).
+        """
+        entry = self.local_cache.get(key)
+        if entry is None:
+            entry = yield self._get_from_redis(key)
+        if entry is not None:
+            value, (expire_at, delta) = entry
+            if key in self.__inflight or self._is_fresh(expire_at, delta):
+                raise tornado.gen.Return(value)
+        elif key in self.__inflight:
+            # somebody else is computing the value
+            res = yield self.__inflight[key]
+            raise tornado.gen.Return(res)
+        res = yield self._compute(key, fn, ttl if ttl is not None
+                                  else self.ttl)
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def _get_from_redis(self, key):
+        pipeline = Pipeline()
+        pipeline.stack_call("HMGET", self.prefix + key, "v", "d")
+        pipeline.stack_call("PTTL", self.prefix + key)
+        res = yield self.target.call(pipeline)
+        if not isinstance(res, TornadisException):
+            res = next((x for x in res if isinstance(x, TornadisException)),
+                       res)
+        if isinstance(res, TornadisException):
+            LOG.warning("can't read cached value: %s", res)
+            raise tornado.gen.Return(None)
+        (value, delta), pttl = res
+        if value is None or pttl <= 0:
+            raise tornado.gen.Return(None)
+        if self.loads is not None:
+            value = self.loads(value)
+        delta = float(delta) if delta is not None else 0.
+        expire_at = time.time() + pttl / 1000.
+        self._set_local(key, value, expire_at, delta)
+        raise tornado.gen.Return((value, (expire_at, delta)))
+
+    def _set_local(self, key, value, expire_at, delta):
+        # (the redis expiration is kept for XFetch decisions)
+        l1_expire_at = min(expire_at, time.time() + self.l1_ttl)
+        self.local_cache.set(key, value, l1_expire_at, (expire_at, delta))
+
+    @tornado.gen.coroutine
+    def _compute(self, key, fn, ttl):
+        future = tornado.concurrent.Future()
+        self.__inflight[key] = future
+        try:
+            before = time.time()
+            value = yield tornado.gen.maybe_future(fn())
+            delta = time.time() - before
+            yield self._set(key, value, ttl, delta)
+        except Exception as e:
+            future.set_exception(e)
+            # (avoid "exception never retrieved" logs if nobody waits)
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            del self.__inflight[key]
+        raise tornado.gen.Return(value)
+
+    @tornado.gen.coroutine
+    def _set(self, key, value, ttl, delta=0.):
+        self._set_local(key, value, time.time() + ttl, delta)
+        dumped = self.dumps(value) if self.dumps is not None else value
+        pipeline = Pipeline()
+        pipeline.stack_call("HMSET", self.prefix + key, "v", dumped,
+                            "d", "%f" % delta)
+        pipeline.stack_call("PEXPIRE", self.prefix + key, int(ttl * 1000))
+        res = yield self.target.call(pipeline)
+        if isinstance(res, TornadisException):
+            LOG.warning("can't store cached value: %s", res)
+
+    @tornado.gen.coroutine
+    def set(self, key, value, ttl=None):
+        """Stores a value in the cache (L1 and L2).
+
+        Args:
+            key (string): the cache key.
+            value: the value to store.
+            ttl (float): ttl (in seconds) of the value (None means the
+                default ttl).
+        """
+        yield self._set(key, value, ttl if ttl is not None else self.ttl)
+
+    @tornado.gen.coroutine
+    def invalidate(self, key):
+        """Removes a key from the cache (L1 and L2).
+
+        Note: other processes keep their local copy until l1_ttl.
+
+        Args:
+            key (string): the cache key.
+        """
+        self.local_cache.delete(key)
+        yield self.target.call("DEL", self.prefix + key)
+
+    def cached(self, key_fn=None, ttl=None):
+        """Decorator which caches the result of a function (or coroutine).
+
+        Args:
+            key_fn (callable): function called with the decorated function
+                arguments to build the cache key (None means a key built
+                with the function name and the repr of the arguments).
+            ttl (float): ttl (in seconds) of values (None means the
+                default ttl).
+
+        Examples:
+
+            >>> cache = TwoTierCache(pool, ttl=30)
+            >>> @cache.cached(key_fn=lambda user_id: "user:%s" % user_id)
+                @tornado.gen.coroutine
+                def get_user_profile(user_id):
+                    ...
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if key_fn is not None:
+                    key = key_fn(*args, **kwargs)
+                else:
+                    key = "%s:%r:%r" % (fn.__name__, args,
+                                        sorted(kwargs.items()))
+                compute = functools.partial(fn, *args, **kwargs)
+                return self.get(key, compute, ttl=ttl)
+            return wrapper
+        return decorator
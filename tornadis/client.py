@@ -5,17 +5,25 @@
 # See the LICENSE file for more information.
 
 import tornado.gen
+import tornado.ioloop
 import tornado.locks
 import hiredis
 import collections
+import concurrent.futures
 import functools
+import itertools
 import logging
+import random
 
 from tornadis.connection import Connection
 from tornadis.pipeline import Pipeline
-from tornadis.utils import format_args_in_redis_protocol
+from tornadis.script import is_noscript_error
+from tornadis.scan import ScanIterator
+from tornadis.bulk import BulkWriter
+from tornadis.utils import format_args_in_redis_protocol, get_pid
 from tornadis.write_buffer import WriteBuffer
-from tornadis.exceptions import ConnectionError, ClientError
+from tornadis.exceptions import ConnectionError, ClientError, WatchError
+from tornadis.exceptions import TornadisException
 
 
 LOG = logging.getLogger(__name__)
@@ -25,21 +33,65 @@ def discard_reply_cb(reply):
     pass
 
 
+class _ReplyCollector(object):
+    """Collects a fixed number of replies and calls a callback once.
+
+    Replies are stored by index in a preallocated list. The same object
+    is put in the callback queue once per expected reply so several
+    pipelines can be in flight on the same connection.
+    """
+
+    __slots__ = ('callback', 'replies', 'index')
+
+    def __init__(self, callback, size):
+        self.callback = callback
+        self.replies = [None] * size
+        self.index = 0
+
+    def __call__(self, reply):
+        self.replies[self.index] = reply
+        self.index = self.index + 1
+        if self.index == len(self.replies):
+            self.callback(self.replies)
+
+
 class Client(object):
     """High level object to interact with redis.
 
+    In autoconnect mode, commands issued while the client is not connected
+    are stored in a bounded offline queue. A single (re)connection process
+    (with a jittered exponential backoff between attempts) is started and
+    the queue is flushed (in a single write) when the connection is back.
+
     Attributes:
         autoconnect (boolean): True if the client is in autoconnect mode
             (and in autoreconnection mode) (default True).
         password (string): the password to authenticate with.
         db (int): database number.
+        client_name (string): connection name (CLIENT SETNAME) (None means
+            no name).
+        hello (int): if set, the protocol version to negotiate with HELLO
+            (redis >= 6, the hiredis parser only supports 2).
+        reconnect_attempts (int): max number of connection attempts before
+            failing the commands of the offline queue (autoconnect mode).
+        reconnect_backoff (float): first backoff delay (in seconds) between
+            two failed connection attempts (autoconnect mode).
+        reconnect_max_backoff (float): max backoff delay (in seconds)
+            between two failed connection attempts (autoconnect mode).
+        offline_queue_size (int): max number of commands stored while
+            the client is not connected (autoconnect mode).
+        codec (CompressionCodec): codec object used to compress values
+            (None means no compression).
         connection_kwargs (dict): :class:`Connection` object
             kwargs (note that read_callback and close_callback args are
             set automatically).
     """
 
     def __init__(self, autoconnect=True, password=None, db=0,
-                 **connection_kwargs):
+                 client_name=None, hello=None, reconnect_attempts=3,
+                 reconnect_backoff=0.1,
+                 reconnect_max_backoff=5.0, offline_queue_size=10000,
+                 codec=None, **connection_kwargs):
         """Constructor.
 
         Args:
@@ -47,6 +99,21 @@ class Client(object):
                 (and in autoreconnection mode) (default True).
             password (string): the password to authenticate with.
             db (int): database number.
+            client_name (string): connection name (CLIENT SETNAME) (None
+                means no name).
+            hello (int): if set, the protocol version to negotiate with
+                HELLO (redis >= 6, the hiredis parser only supports 2).
+            reconnect_attempts (int): max number of connection attempts
+                before failing the commands of the offline queue
+                (autoconnect mode).
+            reconnect_backoff (float): first backoff delay (in seconds)
+                between two failed connection attempts (autoconnect mode).
+            reconnect_max_backoff (float): max backoff delay (in seconds)
+                between two failed connection attempts (autoconnect mode).
+            offline_queue_size (int): max number of commands stored while
+                the client is not connected (autoconnect mode).
+            codec (CompressionCodec): codec object used to compress values
+                (None means no compression).
             **connection_kwargs: :class:`Connection` object kwargs.
         """
         if 'read_callback' in connection_kwargs or \
@@ -57,15 +124,39 @@ class Client(object):
         self.autoconnect = autoconnect
         self.password = password
         self.db = db
+        self.client_name = client_name
+        self.hello = hello
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self.reconnect_max_backoff = reconnect_max_backoff
+        self.offline_queue_size = offline_queue_size
+        self.codec = codec
         self.__connection = None
         self.subscribed = False
         self.__connection = None
         self.__reader = None
+        self.__connect_future = None
+        self.__handshaking = False
+        # Used by the autoconnect mode
+        self.__reconnect_future = None
+        self.__failed_connects = 0
+        self.__offline_queue = collections.deque()
+        # Used to build a single write with several calls
+        self.__write_batch = None
         # Used for normal clients
         self.__callback_queue = None
         # Used for subscribed clients
         self._condition = tornado.locks.Condition()
         self._reply_list = None
+        # SHA1 digests of scripts loaded through this connection
+        self._loaded_scripts = set()
+        # pid of the process which owns the connection
+        self.__pid = get_pid()
+        # Used by submit() (thread-safe handoff queue)
+        self.__ioloop = connection_kwargs.get('ioloop',
+                                              tornado.ioloop.IOLoop.instance())
+        self.__submit_queue = collections.deque()
+        self.__submit_scheduled = False
 
     @property
     def title(self):
@@ -77,25 +168,46 @@ class Client(object):
         Returns:
             True if the client if connected to redis.
         """
+        if self.__pid != get_pid():
+            self._reset_after_fork()
         return (self.__connection is not None) and \
-               (self.__connection.is_connected())
+               (self.__connection.is_connected()) and \
+               (not self.__handshaking)
 
-    @tornado.gen.coroutine
     def connect(self):
         """Connects the client object to redis.
 
-        It's safe to use this method even if you are already connected.
+        It's safe to use this method even if you are already connected
+        (or connecting: the same Future is returned in that case).
         Note: this method is useless with autoconnect mode (default).
 
         Returns:
             a Future object with True as result if the connection was ok.
         """
         if self.is_connected():
-            raise tornado.gen.Return(True)
+            return tornado.gen.maybe_future(True)
+        if self.__connect_future is not None:
+            return self.__connect_future
+        future = self._connect()
+        if not future.done():
+            self.__connect_future = future
+        return future
+
+    @tornado.gen.coroutine
+    def _connect(self):
+        try:
+            res = yield self._connect_and_handshake()
+        finally:
+            self.__connect_future = None
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def _connect_and_handshake(self):
         cb1 = self._read_callback
         cb2 = self._close_callback
         self.__callback_queue = collections.deque()
         self._reply_list = []
+        self._loaded_scripts = set()
         self.__reader = hiredis.Reader(replyError=ClientError)
         kwargs = self.connection_kwargs
         self.__connection = Connection(cb1, cb2, **kwargs)
@@ -103,30 +215,93 @@ class Client(object):
         if connection_status is not True:
             # nothing left to do here, return
             raise tornado.gen.Return(False)
-        if self.password is not None:
-            authentication_status = yield self._call('AUTH', self.password)
-            if authentication_status != b'OK':
-                # incorrect password, return back the result
-                LOG.warning("impossible to connect: bad password")
+        handshake = self._make_handshake_pipeline()
+        if handshake.number_of_stacked_calls == 0:
+            raise tornado.gen.Return(True)
+        # all handshake commands are sent in a single write (so the client
+        # is ready after a single round trip)
+        self.__handshaking = True
+        try:
+            replies = yield self._call(handshake)
+        finally:
+            self.__handshaking = False
+        if not isinstance(replies, list):
+            LOG.warning("impossible to connect: %s", replies)
+            self.__connection.disconnect()
+            raise tornado.gen.Return(False)
+        for args, reply in zip(handshake.pipelined_args, replies):
+            if isinstance(reply, TornadisException) or \
+                    (args[0] != "HELLO" and reply != b'OK'):
+                if args[0] in ("AUTH", "HELLO"):
+                    LOG.warning("impossible to connect: bad password or "
+                                "handshake error (%s)", reply)
+                elif args[0] == "SELECT":
+                    LOG.warning("can't select db %s", self.db)
+                else:
+                    LOG.warning("handshake error: %s", reply)
                 self.__connection.disconnect()
                 raise tornado.gen.Return(False)
-        if self.db != 0:
-            db_status = yield self._call('SELECT', self.db)
-            if db_status != b'OK':
-                LOG.warning("can't select db %s", self.db)
-                raise tornado.gen.Return(False)
         raise tornado.gen.Return(True)
 
+    def _make_handshake_pipeline(self):
+        pipeline = Pipeline()
+        if self.hello is not None:
+            args = ["HELLO", self.hello]
+            if self.password is not None:
+                args.extend(("AUTH", "default", self.password))
+            if self.client_name is not None:
+                args.extend(("SETNAME", self.client_name))
+            pipeline.stack_call(*args)
+        else:
+            if self.password is not None:
+                pipeline.stack_call("AUTH", self.password)
+            if self.client_name is not None:
+                pipeline.stack_call("CLIENT", "SETNAME", self.client_name)
+        if self.db != 0:
+            pipeline.stack_call("SELECT", self.db)
+        return pipeline
+
     def disconnect(self):
         """Disconnects the client object from redis.
 
         It's safe to use this method even if you are already disconnected.
         """
-        if not self.is_connected():
-            return
+        if self.__pid != get_pid():
+            self._reset_after_fork()
         if self.__connection is not None:
             self.__connection.disconnect()
 
+    def _reset_after_fork(self):
+        """Forgets the state inherited from the parent process (after a fork).
+
+        The inherited connection is dropped without sending anything on it
+        (it still belongs to the parent process) and pending callbacks
+        (which belong to the parent process too) are silently forgotten.
+        In autoconnect mode, the client will reconnect with a brand new
+        connection when needed.
+        """
+        LOG.debug("fork detected, resetting the client state")
+        self.__pid = get_pid()
+        if self.__connection is not None:
+            self.__connection._drop_after_fork()
+            self.__connection = None
+        self.__reader = None
+        self.__connect_future = None
+        self.__handshaking = False
+        self.__reconnect_future = None
+        self.__failed_connects = 0
+        self.__offline_queue = collections.deque()
+        self.__write_batch = None
+        self.__callback_queue = None
+        self.subscribed = False
+        self._condition = tornado.locks.Condition()
+        self._reply_list = None
+        self._loaded_scripts = set()
+        self.__submit_queue = collections.deque()
+        self.__submit_scheduled = False
+        if 'ioloop' not in self.connection_kwargs:
+            self.__ioloop = tornado.ioloop.IOLoop.instance()
+
     def _close_callback(self):
         """Callback called when redis closed the connection.
 
@@ -174,6 +349,77 @@ class Client(object):
             LOG.warning("corrupted stream => disconnect")
             self.disconnect()
 
+    @tornado.gen.coroutine
+    def _reconnect(self):
+        """(Re)connects the client object and flushes the offline queue.
+
+        Only one instance of this coroutine is running at a time. Between
+        two failed attempts, we wait for a jittered exponential backoff
+        delay (the first attempt of each reconnection process is
+        immediate).
+        """
+        # (the server may be back since the last process gave up)
+        self.__failed_connects = 0
+        try:
+            for _ in range(0, max(1, self.reconnect_attempts)):
+                if self.__failed_connects > 0:
+                    delay = min(self.reconnect_max_backoff,
+                                self.reconnect_backoff *
+                                (2 ** (self.__failed_connects - 1)))
+                    delay = random.uniform(delay / 2.0, delay)
+                    LOG.debug("waiting %f seconds before reconnecting", delay)
+                    yield tornado.gen.sleep(delay)
+                res = yield self.connect()
+                if res and self.is_connected():
+                    self.__failed_connects = 0
+                    self._flush_offline_queue()
+                    raise tornado.gen.Return(True)
+                self.__failed_connects = self.__failed_connects + 1
+            LOG.warning("impossible to connect after %i attempt(s)",
+                        self.reconnect_attempts)
+            error = ConnectionError("impossible to connect")
+            while True:
+                try:
+                    _, kwargs = self.__offline_queue.popleft()
+                except IndexError:
+                    break
+                kwargs['callback'](error)
+            raise tornado.gen.Return(False)
+        finally:
+            self.__reconnect_future = None
+
+    def _flush_offline_queue(self):
+        self.__write_batch = WriteBuffer()
+        try:
+            while True:
+                try:
+                    args, kwargs = self.__offline_queue.popleft()
+                except IndexError:
+                    break
+                self._call(*args, **kwargs)
+        finally:
+            batch = self.__write_batch
+            self.__write_batch = None
+        if not batch.is_empty():
+            self.__connection.write(batch)
+
+    def _offline_call(self, *args, **kwargs):
+        if len(self.__offline_queue) >= self.offline_queue_size:
+            error = ClientError("offline queue is full")
+            kwargs['callback'](error)
+            return
+        self.__offline_queue.append((args, kwargs))
+        if self.__reconnect_future is None:
+            future = self._reconnect()
+            if not future.done():
+                self.__reconnect_future = future
+
+    def _write(self, data):
+        if self.__write_batch is not None:
+            self.__write_batch.append(data)
+        else:
+            self.__connection.write(data)
+
     def call(self, *args, **kwargs):
         """Calls a redis command and returns a Future of the reply.
 
@@ -196,25 +442,17 @@ class Client(object):
                     client = Client()
                     result = yield client.call("HSET", "key", "field", "val")
         """
-        if not self.is_connected():
+        if not self.is_connected() or len(self.__offline_queue) > 0:
             if self.autoconnect:
-                # We use this method only when we are not contected
-                # to void performance penaly due to gen.coroutine decorator
-                return self._call_with_autoconnect(*args, **kwargs)
+                # (note: we also use the offline queue while it's not
+                # flushed to keep commands order)
+                return tornado.gen.Task(self._offline_call, *args, **kwargs)
             else:
                 error = ConnectionError("you are not connected and "
                                         "autoconnect=False")
                 return tornado.gen.maybe_future(error)
         return self._call(*args, **kwargs)
 
-    @tornado.gen.coroutine
-    def _call_with_autoconnect(self, *args, **kwargs):
-        yield self.connect()
-        if not self.is_connected():
-            raise tornado.gen.Return(ConnectionError("impossible to connect"))
-        res = yield self._call(*args, **kwargs)
-        raise tornado.gen.Return(res)
-
     def async_call(self, *args, **kwargs):
         """Calls a redis command, waits for the reply and call a callback.
 
@@ -237,20 +475,11 @@ class Client(object):
                     pass
             >>> client.async_call("HSET", "key", "field", "val", callback=cb)
         """
-        def after_autoconnect_callback(future):
-            if self.is_connected():
-                self._call(*args, **kwargs)
-            else:
-                # FIXME
-                pass
-
         if 'callback' not in kwargs:
             kwargs['callback'] = discard_reply_cb
-        if not self.is_connected():
+        if not self.is_connected() or len(self.__offline_queue) > 0:
             if self.autoconnect:
-                connect_future = self.connect()
-                cb = after_autoconnect_callback
-                self.__connection._ioloop.add_future(connect_future, cb)
+                self._offline_call(*args, **kwargs)
             else:
                 error = ConnectionError("you are not connected and "
                                         "autoconnect=False")
@@ -258,6 +487,67 @@ class Client(object):
         else:
             self._call(*args, **kwargs)
 
+    def submit(self, *args, **kwargs):
+        """Submits a redis command from any thread.
+
+        This is the only thread-safe method of the client (all the others
+        must be called from the ioloop thread). Commands are appended to a
+        handoff queue which is drained (in a single write) by a single
+        ioloop callback (so a burst of submitted commands costs only one
+        ioloop wakeup).
+
+        Args:
+            *args: full redis command as variable length argument list or
+                a Pipeline object (as a single argument).
+            **kwargs: internal private options (do not use).
+
+        Returns:
+            a concurrent.futures.Future with the decoded redis reply as
+                result (or a TornadisException object in case of errors).
+
+        Examples:
+
+            >>> def worker(client):
+                    # in a ThreadPoolExecutor thread
+                    future = client.submit("INCR", "counter")
+                    result = future.result()
+        """
+        future = concurrent.futures.Future()
+        # note: deque.append() is atomic
+        self.__submit_queue.append((args, kwargs, future))
+        if not self.__submit_scheduled:
+            self.__submit_scheduled = True
+            self.__ioloop.add_callback(self._drain_submit_queue)
+        return future
+
+    def _drain_submit_queue(self):
+        # (reset the flag before draining: commands submitted during the
+        # drain are consumed by this drain or by a new callback)
+        self.__submit_scheduled = False
+        batch = self.is_connected() and len(self.__offline_queue) == 0 \
+            and self.__write_batch is None
+        if batch:
+            self.__write_batch = WriteBuffer()
+        try:
+            while True:
+                try:
+                    args, kwargs, future = self.__submit_queue.popleft()
+                except IndexError:
+                    break
+                if not future.set_running_or_notify_cancel():
+                    continue
+                kwargs['callback'] = future.set_result
+                try:
+                    self.async_call(*args, **kwargs)
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if batch:
+                data = self.__write_batch
+                self.__write_batch = None
+                if not data.is_empty():
+                    self.__connection.write(data)
+
     def _call(self, *args, **kwargs):
         callback = False
         if 'callback' in kwargs:
@@ -284,36 +574,291 @@ class Client(object):
         else:
             return tornado.gen.Task(fn, *arguments, **kwargs)
 
-    def _reply_aggregator(self, callback, replies, reply):
-        self._reply_list.append(reply)
-        if len(self._reply_list) == replies:
-            callback(self._reply_list)
-            self._reply_list = []
-
     def _simple_call(self, *args, **kwargs):
         callback = kwargs['callback']
+        if self.codec is not None:
+            if self.codec.decodes_reply(args):
+                callback = functools.partial(self._decode_reply_cb, callback)
+            args = self.codec.encode_command(args)
         msg = format_args_in_redis_protocol(*args)
         self.__callback_queue.append(callback)
-        self.__connection.write(msg)
+        self._write(msg)
 
     def _simple_call_with_multiple_replies(self, replies, *args, **kwargs):
-        original_callback = kwargs['callback']
+        collector = _ReplyCollector(kwargs['callback'], replies)
         msg = format_args_in_redis_protocol(*args)
-        callback = functools.partial(self._reply_aggregator, original_callback,
-                                     replies)
-        for _ in range(0, replies):
-            self.__callback_queue.append(callback)
-        self.__connection.write(msg)
+        self.__callback_queue.extend(itertools.repeat(collector, replies))
+        self._write(msg)
 
     def _pipelined_call(self, pipeline, callback):
         buf = WriteBuffer()
         replies = len(pipeline.pipelined_args)
-        cb = functools.partial(self._reply_aggregator, callback, replies)
-        for args in pipeline.pipelined_args:
-            self.__callback_queue.append(cb)
-            tmp_buf = format_args_in_redis_protocol(*args)
-            buf.append(tmp_buf)
-        self.__connection.write(buf)
+        pipelined_args = pipeline.pipelined_args
+        if self.codec is not None:
+            decoded = [self.codec.decodes_reply(x) for x in pipelined_args]
+            if any(decoded):
+                callback = functools.partial(self._decode_replies_cb,
+                                             callback, decoded)
+            pipelined_args = [self.codec.encode_command(x)
+                              for x in pipelined_args]
+        if pipeline.transaction:
+            # MULTI + stacked commands + EXEC in a single write
+            replies = replies + 2
+            callback = functools.partial(self._transaction_reply_cb, callback)
+        if len(pipeline.scripts) > 0:
+            # SCRIPT LOAD (in the same write) of scripts unknown by
+            # this connection
+            preloaded = [x for x in pipeline.scripts.values()
+                         if x.sha not in self._loaded_scripts]
+            for script in preloaded:
+                self._loaded_scripts.add(script.sha)
+                buf.append(format_args_in_redis_protocol("SCRIPT", "LOAD",
+                                                         script.source))
+                self.__callback_queue.append(discard_reply_cb)
+            callback = functools.partial(self._scripts_reply_cb, callback)
+        if pipeline.transaction:
+            buf.append(format_args_in_redis_protocol("MULTI"))
+        for args in pipelined_args:
+            buf.append(format_args_in_redis_protocol(*args))
+        if pipeline.transaction:
+            buf.append(format_args_in_redis_protocol("EXEC"))
+        # one collector object per pipeline (replies are stored by index)
+        collector = _ReplyCollector(callback, replies)
+        self.__callback_queue.extend(itertools.repeat(collector, replies))
+        self._write(buf)
+
+    def _raw_call(self, data, replies, callback):
+        # data must contain already formatted commands with the given
+        # number of replies
+        collector = _ReplyCollector(callback, replies)
+        self.__callback_queue.extend(itertools.repeat(collector, replies))
+        self._write(data)
+
+    def _decode_reply_cb(self, callback, reply):
+        callback(self.codec.decode_reply(reply))
+
+    def _decode_replies_cb(self, callback, decoded, replies):
+        # replies can be None/an exception (aborted transaction)
+        if isinstance(replies, list) and len(replies) == len(decoded):
+            replies = [self.codec.decode_reply(x) if y else x
+                       for x, y in zip(replies, decoded)]
+        callback(replies)
+
+    def _scripts_reply_cb(self, callback, replies):
+        # a script was flushed on the redis side => forget loaded scripts
+        # to reload them with the next pipeline
+        for reply in replies:
+            if isinstance(reply, list):
+                if any(is_noscript_error(x) for x in reply):
+                    self._loaded_scripts.clear()
+            elif is_noscript_error(reply):
+                self._loaded_scripts.clear()
+        callback(replies)
+
+    def _transaction_reply_cb(self, callback, replies):
+        # replies are: MULTI reply, n * QUEUED, EXEC reply
+        # we only give back the EXEC reply (list of results, None if the
+        # transaction was aborted, ClientError in case of EXECABORT)
+        reply = replies[-1]
+        if isinstance(reply, ClientError):
+            # (errors of queued commands are attached to the EXECABORT
+            # error, for example MOVED/ASK redirections in a cluster)
+            reply.queued_errors = [x for x in replies[1:-1]
+                                   if isinstance(x, TornadisException)]
+        callback(reply)
+
+    @tornado.gen.coroutine
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic (WATCH based) transaction with retries.
+
+        The given keys are WATCHed, then fn(client, pipeline) is called
+        (fn can be a coroutine). Inside fn, you can read values with the
+        client and stack the commands of the transaction in the (transaction
+        enabled) pipeline. Then the pipeline is executed (MULTI, stacked
+        commands and EXEC in a single write). If the transaction is aborted
+        because a watched key was modified, the whole process is retried
+        (after a small jittered exponential backoff).
+
+        Note: as WATCH is bound to a connection, do not run multiple
+        transactions on the same Client object at the same time (use a
+        ClientPool to get one connection per transaction).
+
+        Following options are available as keyword parameters:
+
+        - max_retries (int)
+            max number of retries after an aborted transaction (default 10).
+        - backoff (float)
+            first backoff delay in seconds (default 0.01).
+        - max_backoff (float)
+            max backoff delay in seconds (default 0.5).
+
+        Args:
+            fn: callable (or coroutine) called with (client, pipeline) as
+                arguments at each try.
+            *watched_keys: keys to WATCH before calling fn.
+            **kwargs: options as keyword parameters.
+
+        Returns:
+            a Future with the list of replies (one per stacked command) as
+                result (an empty list if nothing was stacked), a WatchError
+                object if the transaction was aborted too many times or
+                another TornadisException object in case of errors.
+
+        Examples:
+
+            >>> @tornado.gen.coroutine
+                def incr(client, pipeline):
+                    value = yield client.call("GET", "counter")
+                    pipeline.stack_call("SET", "counter", int(value) + 1)
+            >>> results = yield client.transaction(incr, "counter")
+        """
+        max_retries = kwargs.get('max_retries', 10)
+        backoff = kwargs.get('backoff', 0.01)
+        max_backoff = kwargs.get('max_backoff', 0.5)
+        retries = 0
+        while True:
+            if len(watched_keys) > 0:
+                res = yield self.call("WATCH", *watched_keys)
+                if isinstance(res, TornadisException):
+                    raise tornado.gen.Return(res)
+            pipeline = Pipeline(transaction=True)
+            try:
+                yield tornado.gen.maybe_future(fn(self, pipeline))
+            except Exception:
+                self.async_call("UNWATCH")
+                raise
+            if pipeline.number_of_stacked_calls == 0:
+                if len(watched_keys) > 0:
+                    yield self.call("UNWATCH")
+                raise tornado.gen.Return([])
+            res = yield self.call(pipeline)
+            if res is not None:
+                raise tornado.gen.Return(res)
+            retries = retries + 1
+            if retries > max_retries:
+                raise tornado.gen.Return(
+                    WatchError("transaction aborted %i times" % retries))
+            delay = min(max_backoff, backoff * (2 ** (retries - 1)))
+            LOG.debug("transaction aborted, retrying in %f seconds", delay)
+            yield tornado.gen.sleep(random.uniform(0, delay))
+
+    def bulk_writer(self, flush_size=65536):
+        """Returns a fire-and-forget writer object for write-only workloads.
+
+        Commands are bracketed with CLIENT REPLY OFF/ON so redis does not
+        send any reply for them (see :class:`BulkWriter`).
+
+        Args:
+            flush_size (int): size (in bytes) of buffered commands which
+                triggers an automatic flush.
+
+        Returns:
+            a BulkWriter object.
+
+        Examples:
+
+            >>> writer = client.bulk_writer()
+            >>> writer.call("RPUSH", "events", "event1")
+            >>> writer.call("INCR", "counter")
+            >>> result = yield writer.finish()
+        """
+        return BulkWriter(self, flush_size=flush_size)
+
+    def scan_iter(self, match=None, count=100, type=None, **kwargs):
+        """Returns an iterator object over the SCAN redis command.
+
+        Keys are returned by batches with a prefetch of the next page
+        and an adaptive COUNT argument (see :class:`ScanIterator`).
+
+        Args:
+            match (string): MATCH pattern (None means no pattern).
+            count (int): initial COUNT argument.
+            type (string): TYPE filter (None means no filter).
+            **kwargs: other :class:`ScanIterator` constructor arguments.
+
+        Returns:
+            a ScanIterator object.
+
+        Examples:
+
+            >>> iterator = client.scan_iter(match="foo*")
+            >>> while True:
+                    keys = yield iterator.next_batch()
+                    if keys is None:
+                        break
+            >>> # or with python >= 3.5
+            >>> async for keys in client.scan_iter(match="foo*"):
+                    pass
+        """
+        return ScanIterator(self, "SCAN", match=match, count=count,
+                            type=type, **kwargs)
+
+    def hscan_iter(self, key, match=None, count=100, **kwargs):
+        """Returns an iterator object over the HSCAN redis command.
+
+        Same as :meth:`scan_iter` but batches are lists of (field, value)
+        tuples.
+
+        Args:
+            key (string): the hash key to scan.
+            match (string): MATCH pattern (None means no pattern).
+            count (int): initial COUNT argument.
+            **kwargs: other :class:`ScanIterator` constructor arguments.
+
+        Returns:
+            a ScanIterator object.
+        """
+        return ScanIterator(self, "HSCAN", key=key, match=match, count=count,
+                            **kwargs)
+
+    def sscan_iter(self, key, match=None, count=100, **kwargs):
+        """Returns an iterator object over the SSCAN redis command.
+
+        Same as :meth:`scan_iter` but batches are lists of set members.
+
+        Args:
+            key (string): the set key to scan.
+            match (string): MATCH pattern (None means no pattern).
+            count (int): initial COUNT argument.
+            **kwargs: other :class:`ScanIterator` constructor arguments.
+
+        Returns:
+            a ScanIterator object.
+        """
+        return ScanIterator(self, "SSCAN", key=key, match=match, count=count,
+                            **kwargs)
+
+    def zscan_iter(self, key, match=None, count=100, **kwargs):
+        """Returns an iterator object over the ZSCAN redis command.
+
+        Same as :meth:`scan_iter` but batches are lists of (member, score)
+        tuples.
+
+        Args:
+            key (string): the sorted set key to scan.
+            match (string): MATCH pattern (None means no pattern).
+            count (int): initial COUNT argument.
+            **kwargs: other :class:`ScanIterator` constructor arguments.
+
+        Returns:
+            a ScanIterator object.
+        """
+        return ScanIterator(self, "ZSCAN", key=key, match=match, count=count,
+                            **kwargs)
+
+    def get_number_of_pending_replies(self):
+        """Returns the number of replies the client is waiting for.
+
+        Commands waiting in the offline queue (autoconnect mode) are
+        counted too.
+
+        Returns:
+            the number of pending replies (int).
+        """
+        pending = len(self.__offline_queue)
+        if self.__callback_queue is not None:
+            pending += len(self.__callback_queue)
+        return pending
 
     def get_last_state_change_timedelta(self):
         return self.__connection._state.get_last_state_change_timedelta()
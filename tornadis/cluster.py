@@ -0,0 +1,551 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.ioloop
+import tornado.concurrent
+import functools
+import logging
+import random
+import six
+
+from tornadis.pool import ClientPool
+from tornadis.pipeline import Pipeline
+from tornadis.commands import command_keys, is_readonly_call
+from tornadis.fanout import SplitCall, fanout
+from tornadis.hashing import key_slot, NUMBER_OF_SLOTS
+from tornadis.exceptions import ConnectionError, ClientError
+from tornadis.exceptions import TornadisException
+
+LOG = logging.getLogger(__name__)
+
+
+def _to_str(value):
+    if isinstance(value, six.binary_type):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def _node(host, port, default_host):
+    host = _to_str(host)
+    if not host or host == "?":
+        # (the node doesn't know its own address)
+        host = default_host
+    return (host, int(port))
+
+
+def parse_cluster_slots(reply, default_host="127.0.0.1"):
+    """Parses a CLUSTER SLOTS reply.
+
+    Args:
+        reply (list): CLUSTER SLOTS reply.
+        default_host (string): host to use when a node doesn't know its
+            address (the host of the asked node).
+
+    Returns:
+        a list of (start slot, end slot, (host, port) of the primary)
+            tuples.
+    """
+    res = []
+    for item in reply:
+        primary = item[2]
+        res.append((int(item[0]), int(item[1]),
+                    _node(primary[0], primary[1], default_host)))
+    return res
+
+
+def parse_cluster_shards(reply, default_host="127.0.0.1"):
+    """Parses a CLUSTER SHARDS reply (redis >= 7.0).
+
+    Args:
+        reply (list): CLUSTER SHARDS reply.
+        default_host (string): host to use when a node doesn't know its
+            address (the host of the asked node).
+
+    Returns:
+        a list of (start slot, end slot, (host, port) of the primary)
+            tuples.
+    """
+    res = []
+    for shard in reply:
+        shard = dict(zip([_to_str(x) for x in shard[0::2]], shard[1::2]))
+        primary = None
+        for fields in shard.get("nodes", []):
+            node = dict(zip([_to_str(x) for x in fields[0::2]],
+                            fields[1::2]))
+            if _to_str(node.get("role")) == "master" and \
+                    _to_str(node.get("health", "online")) == "online":
+                port = node.get("port", node.get("tls-port"))
+                primary = _node(node.get("ip", node.get("endpoint")), port,
+                                default_host)
+                break
+        if primary is None:
+            continue
+        slots = shard.get("slots", [])
+        for i in range(0, len(slots) - 1, 2):
+            res.append((int(slots[i]), int(slots[i + 1]), primary))
+    return res
+
+
+def parse_redirection(reply):
+    """Parses a MOVED or ASK error.
+
+    Args:
+        reply: a call result.
+
+    Returns:
+        a (kind, slot, (host, port)) tuple (kind is "MOVED" or "ASK") or
+            None if the reply is not a redirection.
+    """
+    if not isinstance(reply, ClientError):
+        return None
+    parts = str(reply).split()
+    if len(parts) != 3 or parts[0] not in ("MOVED", "ASK"):
+        return None
+    host, _, port = parts[2].rpartition(":")
+    try:
+        return (parts[0], int(parts[1]), _node(host, port, None))
+    except ValueError:
+        return None
+
+
+def is_retryable(reply, args):
+    """Returns True if a call can be sent again after a slot map refresh.
+
+    Args:
+        reply: the call result.
+        args: full redis command as a tuple or a tuple with a single
+            Pipeline object.
+
+    Returns:
+        True for errors of calls which were not executed (connection
+            failures, CLUSTERDOWN and TRYAGAIN errors) and for connection
+            errors of read-only calls (other calls may have been executed).
+    """
+    if isinstance(reply, ConnectionError):
+        return is_readonly_call(args)
+    return isinstance(reply, ClientError) and \
+        str(reply).startswith(("can't connect", "CLUSTERDOWN", "TRYAGAIN"))
+
+
+def call_slot(args):
+    """Returns the slot of a call (command or pipeline).
+
+    Args:
+        args: full redis command as a tuple or a tuple with a single
+            Pipeline object.
+
+    Returns:
+        the slot number, None if the call has no key or a ClientError if
+            the keys belong to several slots.
+    """
+    if len(args) == 1 and isinstance(args[0], Pipeline):
+        commands = args[0].pipelined_args
+    else:
+        commands = [args]
+    slots = set()
+    for command in commands:
+        for key in command_keys(command):
+            slots.add(key_slot(key))
+    if len(slots) > 1:
+        return ClientError("CROSSSLOT Keys in request don't hash to the same "
+                           "slot")
+    return slots.pop() if slots else None
+
+
+class ClusterClient(object):
+    """Redis Cluster client (which looks like a single Client).
+
+    The slot map (hash slot => primary node) is loaded with CLUSTER SLOTS
+    (or CLUSTER SHARDS with recent redis versions) and each command is
+    sent to the node which serves the slot of its keys (CRC16 of the key
+    or of its hash tag modulo 16384) through a per-node ClientPool.
+
+    MOVED redirections update the slot map (and trigger a background
+    refresh of the whole map), ASK redirections are followed with an
+    ASKING command (without updating the map). The map can also be
+    refreshed on a regular interval (refresh_interval).
+
+    Pipelines (and MGET, MSET, DEL, UNLINK, EXISTS and TOUCH commands) with
+    keys in several slots are split: one sub-pipeline is sent to each node
+    (concurrently), multi-key commands are split by slot and replies are
+    reassembled in the original order (see :class:`tornadis.fanout.SplitCall`).
+    Redirected commands of a split pipeline are retried one by one. Other
+    commands (and transactions) must use keys of a single slot (hash tags
+    can be used to force that).
+
+    Attributes:
+        startup_nodes (list): list of (host, port) tuples used to load the
+            slot map (known nodes are asked first).
+        max_redirections (int): max number of redirections (MOVED, ASK,
+            connection errors) for a call.
+        refresh_interval (float): interval (in seconds) between two
+            background refreshes of the slot map (None means "no periodic
+            refresh").
+        pool_kwargs (dict): ClientPool constructor arguments (used for
+            each node).
+    """
+
+    def __init__(self, startup_nodes=(("127.0.0.1", 6379),),
+                 max_redirections=5, refresh_interval=None, **pool_kwargs):
+        """Constructor.
+
+        Args:
+            startup_nodes (list): list of (host, port) tuples used to load
+                the slot map.
+            max_redirections (int): max number of redirections (MOVED, ASK,
+                connection errors) for a call.
+            refresh_interval (float): interval (in seconds) between two
+                background refreshes of the slot map (None means "no
+                periodic refresh").
+            pool_kwargs (dict): ClientPool constructor arguments (used for
+                each node, host and port are set automatically).
+        """
+        if 'host' in pool_kwargs or 'port' in pool_kwargs:
+            raise Exception("host and port are not allowed here (use "
+                            "startup_nodes).")
+        self.startup_nodes = [(h, int(p)) for h, p in startup_nodes]
+        self.max_redirections = max_redirections
+        self.refresh_interval = refresh_interval
+        self.pool_kwargs = pool_kwargs
+        self.__ioloop = pool_kwargs.get('ioloop',
+                                        tornado.ioloop.IOLoop.instance())
+        self.__slots = None
+        self.__pools = {}
+        self.__refresh = None
+        self.__refresh_periodic = None
+        if self.refresh_interval is not None:
+            every = int(self.refresh_interval * 1000)
+            if int(tornado.version[0]) >= 5:
+                cb = tornado.ioloop.PeriodicCallback(self._background_refresh,
+                                                     every)
+            else:
+                cb = tornado.ioloop.PeriodicCallback(self._background_refresh,
+                                                     every, self.__ioloop)
+            self.__refresh_periodic = cb
+            self.__refresh_periodic.start()
+
+    def is_connected(self):
+        """Returns True if the slot map is loaded."""
+        return self.__slots is not None
+
+    @tornado.gen.coroutine
+    def connect(self):
+        """Loads the slot map.
+
+        Returns:
+            a Future with True as result (or False if no node answered).
+        """
+        res = yield self.refresh_slots()
+        raise tornado.gen.Return(not isinstance(res, TornadisException))
+
+    def disconnect(self):
+        """Stops the background refreshes and destroys all node pools."""
+        if self.__refresh_periodic is not None:
+            self.__refresh_periodic.stop()
+            self.__refresh_periodic = None
+        for pool in self.__pools.values():
+            pool.destroy()
+        self.__pools = {}
+        self.__slots = None
+
+    def _get_pool(self, node):
+        pool = self.__pools.get(node)
+        if pool is None:
+            kwargs = dict(self.pool_kwargs)
+            kwargs.update({"host": node[0], "port": node[1]})
+            pool = ClientPool(**kwargs)
+            self.__pools[node] = pool
+        return pool
+
+    def get_node(self, key):
+        """Returns the node which serves a key (with the current map).
+
+        Args:
+            key: the key.
+
+        Returns:
+            the (host, port) tuple of the node (or None if the map is not
+                loaded or if the slot is not served).
+        """
+        if self.__slots is None:
+            return None
+        return self.__slots[key_slot(key)]
+
+    def get_pool(self, key):
+        """Returns the ClientPool of the node which serves a key.
+
+        It can be useful to borrow a client for commands which need a
+        dedicated connection (blocking commands for example).
+
+        Args:
+            key: the key.
+
+        Returns:
+            a ClientPool (or None if the map is not loaded or if the slot
+                is not served).
+        """
+        node = self.get_node(key)
+        return self._get_pool(node) if node is not None else None
+
+    def refresh_slots(self):
+        """Reloads the slot map.
+
+        Concurrent calls share the same refresh.
+
+        Returns:
+            a Future with True as result (or a ClientError object if no
+                node answered).
+        """
+        if self.__refresh is None:
+            self.__refresh = self._refresh_slots()
+            self.__refresh.add_done_callback(self._refresh_done)
+        return self.__refresh
+
+    def _refresh_done(self, future):
+        self.__refresh = None
+
+    def _background_refresh(self):
+        if self.__refresh is None:
+            self.refresh_slots()
+
+    @tornado.gen.coroutine
+    def _ask_slots(self, node):
+        pool = self._get_pool(node)
+        reply = yield pool.call("CLUSTER", "SLOTS")
+        if isinstance(reply, ClientError) and \
+                not isinstance(reply, ConnectionError):
+            shards = yield pool.call("CLUSTER", "SHARDS")
+            if not isinstance(shards, TornadisException):
+                raise tornado.gen.Return(parse_cluster_shards(shards,
+                                                              node[0]))
+        if isinstance(reply, TornadisException):
+            LOG.warning("can't get the slot map from %s:%s: %s", node[0],
+                        node[1], reply)
+            raise tornado.gen.Return(None)
+        raise tornado.gen.Return(parse_cluster_slots(reply, node[0]))
+
+    @tornado.gen.coroutine
+    def _refresh_slots(self):
+        # (known nodes first)
+        candidates = list(self.__pools.keys())
+        random.shuffle(candidates)
+        candidates += [n for n in self.startup_nodes if n not in candidates]
+        for node in candidates:
+            ranges = yield self._ask_slots(node)
+            if not ranges:
+                continue
+            slots = [None] * NUMBER_OF_SLOTS
+            for start, end, primary in ranges:
+                for slot in range(start, end + 1):
+                    slots[slot] = primary
+            self.__slots = slots
+            self._drop_unused_pools()
+            raise tornado.gen.Return(True)
+        raise tornado.gen.Return(ClientError("can't load the cluster slot "
+                                             "map"))
+
+    def _drop_unused_pools(self):
+        used = set(self.__slots)
+        for node in list(self.__pools.keys()):
+            if node not in used:
+                self.__pools.pop(node).drain()
+
+    def _random_node(self):
+        nodes = [n for n in set(self.__slots) if n is not None]
+        return random.choice(nodes) if nodes else None
+
+    @tornado.gen.coroutine
+    def call(self, *args, **kwargs):
+        """Calls a redis command on the node which serves its keys.
+
+        See :meth:`Client.call` for arguments (a pipeline with keys in
+        several slots is split by node, transactions must use a single
+        slot).
+
+        Returns:
+            a Future with the decoded redis reply as result (or a
+                TornadisException object in case of errors).
+        """
+        if self.__slots is None:
+            res = yield self.refresh_slots()
+            if isinstance(res, TornadisException):
+                raise tornado.gen.Return(res)
+        slot = call_slot(args)
+        if isinstance(slot, TornadisException):
+            if len(args) == 1 and isinstance(args[0], Pipeline) and \
+                    args[0].transaction:
+                raise tornado.gen.Return(slot)
+            res = yield self._split_call(args, kwargs)
+        else:
+            res = yield self._call_slot(slot, args, kwargs)
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def _split_call(self, args, kwargs):
+        split = SplitCall(args, key_slot)
+        replies = yield fanout(split, self._node_of_slot,
+                               functools.partial(self._node_call, kwargs))
+        # redirected (or not executed) sub-commands are retried one by one
+        retries = [i for i, (reply, (_, sub_args)) in
+                   enumerate(zip(replies, split.sub_commands))
+                   if parse_redirection(reply) is not None or
+                   is_retryable(reply, sub_args)]
+        if retries:
+            if any(isinstance(replies[i], ConnectionError) for i in retries):
+                self._background_refresh()
+            res = yield [self._call_slot(split.sub_commands[i][0],
+                                         split.sub_commands[i][1], kwargs)
+                         for i in retries]
+            for index, reply in zip(retries, res):
+                replies[index] = reply
+        raise tornado.gen.Return(split.merge(replies))
+
+    def _node_of_slot(self, slot):
+        node = self.__slots[slot] if slot is not None else None
+        return node if node is not None else self._random_node()
+
+    def _node_call(self, kwargs, node, pipeline):
+        if node is None:
+            future = tornado.concurrent.Future()
+            future.set_result(ClientError("no node available"))
+            return future
+        return self._get_pool(node).call(pipeline, **kwargs)
+
+    @tornado.gen.coroutine
+    def _call_slot(self, slot, args, kwargs):
+        node = self._random_node() if slot is None else self.__slots[slot]
+        asking = False
+        res = None
+        for _ in range(self.max_redirections + 1):
+            if node is None:
+                raise tornado.gen.Return(ClientError("slot %s is not served"
+                                                     % slot))
+            pool = self._get_pool(node)
+            if asking:
+                res = yield self._asking_call(pool, args, kwargs)
+            else:
+                res = yield pool.call(*args, **kwargs)
+            redirection = self._find_redirection(args, res)
+            if redirection is not None:
+                kind, slot, node = redirection
+                asking = (kind == "ASK")
+                if not asking:
+                    self.__slots[slot] = node
+                    self._background_refresh()
+                continue
+            if isinstance(res, ConnectionError):
+                # (the node may have been replaced by a failover)
+                self._background_refresh()
+            if is_retryable(res, args):
+                yield tornado.gen.sleep(0.05)
+                yield self.refresh_slots()
+                asking = False
+                node = self._random_node() if slot is None \
+                    else self.__slots[slot]
+                continue
+            raise tornado.gen.Return(res)
+        raise tornado.gen.Return(res)
+
+    def _find_redirection(self, args, res):
+        if len(args) == 1 and isinstance(args[0], Pipeline):
+            # pipeline (keys of the same slot => the whole pipeline is
+            # redirected)
+            if isinstance(res, list):
+                replies = res
+            else:
+                # (redirections of queued commands abort a transaction)
+                replies = [res] + getattr(res, "queued_errors", [])
+            for reply in replies:
+                redirection = parse_redirection(reply)
+                if redirection is not None:
+                    return redirection
+            return None
+        return parse_redirection(res)
+
+    @tornado.gen.coroutine
+    def _asking_call(self, pool, args, kwargs):
+        # (ASKING only applies to the next command, except for MULTI: it
+        # lasts until EXEC)
+        is_pipeline = len(args) == 1 and isinstance(args[0], Pipeline)
+        if is_pipeline:
+            if args[0].transaction:
+                res = yield self._asking_transaction(pool, args[0], kwargs)
+                raise tornado.gen.Return(res)
+            pipeline = Pipeline()
+            for pargs in args[0].pipelined_args:
+                pipeline.stack_call("ASKING")
+                pipeline.stack_call(*pargs)
+            pipeline.scripts = args[0].scripts
+        else:
+            pipeline = Pipeline()
+            pipeline.stack_call("ASKING")
+            pipeline.stack_call(*args)
+        res = yield pool.call(pipeline, **kwargs)
+        if isinstance(res, TornadisException):
+            raise tornado.gen.Return(res)
+        # (ASKING replies are ignored)
+        if is_pipeline:
+            raise tornado.gen.Return(res[1::2])
+        raise tornado.gen.Return(res[1])
+
+    @tornado.gen.coroutine
+    def _asking_transaction(self, pool, pipeline, kwargs):
+        client = yield pool.get_connected_client()
+        if isinstance(client, TornadisException):
+            raise tornado.gen.Return(client)
+        try:
+            # (ASKING and MULTI...EXEC are sent on the same connection,
+            # the ASKING reply is ignored)
+            asking = client.call("ASKING")
+            res = yield client.call(pipeline, **kwargs)
+            yield asking
+        finally:
+            pool.release_client(client)
+        raise tornado.gen.Return(res)
+
+    def async_call(self, *args, **kwargs):
+        """Calls a redis command, waits for the reply and calls a callback.
+
+        See :meth:`Client.async_call` for arguments.
+        """
+        callback = kwargs.pop("callback", None)
+        future = self.call(*args, **kwargs)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        else:
+            # (the reply is silently discarded)
+            future.add_done_callback(lambda f: f.result())
+
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction on the node of watched keys.
+
+        All watched keys (and keys used by fn) must belong to the same
+        slot.
+
+        See :meth:`ClientPool.transaction` for arguments.
+        """
+        pool = self.get_pool(watched_keys[0]) if watched_keys else None
+        if pool is None:
+            future = tornado.concurrent.Future()
+            future.set_result(ClientError("the slot map is not loaded (or "
+                                          "no watched key)"))
+            return future
+        return pool.transaction(fn, *watched_keys, **kwargs)
+
+    def stats(self):
+        """Returns some statistics about the cluster client.
+
+        Returns:
+            A dict with following keys: nodes (dict (host, port) => stats
+                of the node pool, see :meth:`ClientPool.stats`) and
+                covered_slots (number of served slots).
+        """
+        slots = self.__slots or []
+        return {
+            "nodes": dict((n, p.stats()) for n, p in self.__pools.items()),
+            "covered_slots": sum(1 for s in slots if s is not None)
+        }
@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import zlib
+import logging
+import six
+
+try:
+    import lzma
+except ImportError:  # pragma: no cover
+    # python2 (without backports.lzma)
+    lzma = None
+
+from tornadis.commands import command_name
+
+LOG = logging.getLogger(__name__)
+
+# header of compressed values (followed by the compressor id byte)
+MAGIC = b"\x00TZ"
+MAGIC_LENGTH = len(MAGIC) + 1
+
+
+def _every_arg_from(first):
+    return lambda args: range(first, len(args))
+
+
+def _every_other_arg_from(first):
+    return lambda args: range(first, len(args), 2)
+
+
+def _single_arg(index):
+    return lambda args: (index,) if len(args) > index else ()
+
+
+# command => function giving indexes of value arguments
+VALUE_ARGUMENTS = {
+    b"SET": _single_arg(2),
+    b"SETNX": _single_arg(2),
+    b"GETSET": _single_arg(2),
+    b"SETEX": _single_arg(3),
+    b"PSETEX": _single_arg(3),
+    b"MSET": _every_other_arg_from(2),
+    b"MSETNX": _every_other_arg_from(2),
+    b"HSET": _every_other_arg_from(3),
+    b"HSETNX": _single_arg(3),
+    b"HMSET": _every_other_arg_from(3),
+    b"LPUSH": _every_arg_from(2),
+    b"RPUSH": _every_arg_from(2),
+    b"LPUSHX": _every_arg_from(2),
+    b"RPUSHX": _every_arg_from(2),
+    b"LSET": _single_arg(3),
+    # (compared values are compressed too so they match stored values)
+    b"LREM": _single_arg(3),
+    b"LPOS": _single_arg(2),
+    b"LINSERT": _every_arg_from(3),
+}
+
+
+def _is_get_option(arg):
+    if isinstance(arg, six.text_type):
+        arg = arg.encode('utf-8')
+    return isinstance(arg, six.binary_type) and arg.upper() == b"GET"
+
+
+# commands with replies which can contain compressed values
+VALUE_REPLIES = frozenset([
+    b"GET", b"GETSET", b"GETDEL", b"GETEX", b"MGET", b"HGET", b"HMGET",
+    b"HVALS", b"HGETALL", b"LRANGE", b"LINDEX", b"LPOP", b"RPOP",
+    b"BLPOP", b"BRPOP", b"RPOPLPUSH", b"BRPOPLPUSH", b"LMOVE", b"BLMOVE",
+])
+
+
+class Compressor(object):
+    """Base class for compressors used by :class:`CompressionCodec`.
+
+    Attributes:
+        id (bytes): a single byte identifying the compressor in the header
+            of compressed values.
+    """
+
+    id = None
+
+    def compress(self, data):
+        """Compresses the given data.
+
+        Args:
+            data (bytes): the data to compress.
+
+        Returns:
+            compressed data (bytes).
+        """
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        """Decompresses the given data.
+
+        Args:
+            data (bytes): the data to decompress.
+
+        Returns:
+            decompressed data (bytes).
+        """
+        raise NotImplementedError()
+
+
+class ZlibCompressor(Compressor):
+    """Zlib compressor (from the standard library)."""
+
+    id = b"z"
+
+    def __init__(self, level=6):
+        """Constructor.
+
+        Args:
+            level (int): compression level (0-9).
+        """
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class LzmaCompressor(Compressor):
+    """Lzma compressor (from the standard library, python3 only)."""
+
+    id = b"x"
+
+    def __init__(self, preset=1):
+        """Constructor.
+
+        Args:
+            preset (int): compression preset (0-9).
+        """
+        if lzma is None:
+            raise Exception("lzma module is not available")
+        self.preset = preset
+
+    def compress(self, data):
+        return lzma.compress(data, preset=self.preset)
+
+    def decompress(self, data):
+        return lzma.decompress(data)
+
+
+class CompressionCodec(object):
+    """Transparent compression of values (for Client/ClientPool objects).
+
+    Values (of SET-like commands) bigger than threshold are compressed
+    and prefixed with a small header (magic bytes and compressor id).
+    Replies of GET-like commands (and of SET with the GET option) are
+    transparently decompressed if they start with this header, so
+    uncompressed (legacy) values can still be read.
+
+    Note: commands which work on the bytes of string values (APPEND,
+    SETRANGE, GETRANGE, STRLEN, GETBIT, SETBIT, BITCOUNT...) are not
+    supported on compressed values (they see compressed bytes). Values
+    compared by LREM, LPOS and LINSERT are compressed the same way as
+    stored values, so they only match values written with the same
+    compressor and threshold.
+
+    Attributes:
+        compressor (Compressor): the compressor used for new values.
+        threshold (int): min size (in bytes) of a value to be compressed.
+        decompressors (dict): compressors usable for decompression (indexed
+            by their ids).
+    """
+
+    def __init__(self, compressor=None, threshold=1024, decompressors=None):
+        """Constructor.
+
+        Args:
+            compressor (Compressor): the compressor used for new values
+                (default: ZlibCompressor).
+            threshold (int): min size (in bytes) of a value to be
+                compressed.
+            decompressors (list): other compressors usable for
+                decompression (zlib and lzma (if available) are always
+                usable).
+        """
+        self.compressor = compressor or ZlibCompressor()
+        self.threshold = threshold
+        self.decompressors = {ZlibCompressor.id: ZlibCompressor()}
+        if lzma is not None:
+            self.decompressors[LzmaCompressor.id] = LzmaCompressor()
+        for decompressor in (decompressors or []):
+            self.decompressors[decompressor.id] = decompressor
+        self.decompressors[self.compressor.id] = self.compressor
+        self.__header = MAGIC + self.compressor.id
+
+    def encode_value(self, value):
+        """Compresses a value (if it's big enough).
+
+        Args:
+            value: the value to encode.
+
+        Returns:
+            the encoded value (the original value is returned if it's
+                not a string, if it's too small or if the compression does
+                not help).
+        """
+        if isinstance(value, six.text_type):
+            value = value.encode('utf-8')
+        elif not isinstance(value, six.binary_type):
+            return value
+        if len(value) < self.threshold:
+            return value
+        compressed = self.compressor.compress(value)
+        if len(compressed) + MAGIC_LENGTH >= len(value):
+            return value
+        return self.__header + compressed
+
+    def decode_value(self, value):
+        """Decompresses a value (if it starts with the header).
+
+        Args:
+            value: the value to decode.
+
+        Returns:
+            the decoded value.
+        """
+        if not isinstance(value, six.binary_type) or \
+                not value.startswith(MAGIC):
+            return value
+        decompressor = self.decompressors.get(value[len(MAGIC):MAGIC_LENGTH])
+        if decompressor is None:
+            LOG.warning("unknown compressor id for a compressed value")
+            return value
+        try:
+            return decompressor.decompress(value[MAGIC_LENGTH:])
+        except Exception:
+            LOG.warning("can't decompress a compressed value")
+            return value
+
+    def encode_command(self, args):
+        """Compresses values of a redis command (if any).
+
+        Args:
+            args: full redis command as a tuple.
+
+        Returns:
+            the (possibly new) full redis command as a tuple.
+        """
+        get_indexes = VALUE_ARGUMENTS.get(command_name(args))
+        if get_indexes is None:
+            return args
+        args = list(args)
+        for i in get_indexes(args):
+            args[i] = self.encode_value(args[i])
+        return tuple(args)
+
+    def decodes_reply(self, args):
+        """Returns True if the reply of the redis command must be decoded.
+
+        Args:
+            args: full redis command as a tuple.
+
+        Returns:
+            True or False.
+        """
+        name = command_name(args)
+        if name == b"SET":
+            # (SET key value ... GET returns the old value)
+            return any(_is_get_option(x) for x in args[3:])
+        return name in VALUE_REPLIES
+
+    def decode_reply(self, reply):
+        """Decompresses compressed values inside a reply.
+
+        Args:
+            reply: the decoded redis reply.
+
+        Returns:
+            the reply with decompressed values.
+        """
+        if isinstance(reply, list):
+            return [self.decode_reply(x) for x in reply]
+        return self.decode_value(reply)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import six
+
+from tornadis.pipeline import Pipeline
+
+# commands which can block the connection (waiting for data)
+BLOCKING_COMMANDS = frozenset([
+    b"BLPOP", b"BRPOP", b"BRPOPLPUSH", b"BLMOVE", b"BLMPOP", b"BZPOPMIN",
+    b"BZPOPMAX", b"BZMPOP", b"WAIT", b"WAITAOF"
+])
+
+# commands which can block the connection with a BLOCK option
+BLOCK_OPTION_COMMANDS = frozenset([b"XREAD", b"XREADGROUP"])
+
+# commands which change the state of the connection (so the following
+# commands on the same connection depend on them)
+STATEFUL_COMMANDS = frozenset([
+    b"MULTI", b"EXEC", b"DISCARD", b"WATCH", b"UNWATCH", b"SELECT", b"AUTH",
+    b"HELLO", b"RESET", b"CLIENT", b"SUBSCRIBE", b"PSUBSCRIBE",
+    b"SSUBSCRIBE", b"UNSUBSCRIBE", b"PUNSUBSCRIBE", b"SUNSUBSCRIBE",
+    b"MONITOR", b"READONLY", b"READWRITE", b"QUIT"
+])
+
+# read-only commands (which can be sent to replicas)
+READONLY_COMMANDS = frozenset([
+    b"GET", b"MGET", b"STRLEN", b"GETRANGE", b"SUBSTR", b"GETBIT",
+    b"BITCOUNT", b"BITPOS", b"BITFIELD_RO", b"LCS", b"EXISTS", b"TYPE",
+    b"TTL", b"PTTL", b"EXPIRETIME", b"PEXPIRETIME", b"DUMP", b"TOUCH",
+    b"SCAN", b"KEYS", b"RANDOMKEY", b"DBSIZE", b"HGET", b"HMGET", b"HGETALL",
+    b"HKEYS", b"HVALS", b"HLEN", b"HEXISTS", b"HSTRLEN", b"HSCAN",
+    b"HRANDFIELD", b"LRANGE", b"LLEN", b"LINDEX", b"LPOS", b"SMEMBERS",
+    b"SISMEMBER", b"SMISMEMBER", b"SCARD", b"SRANDMEMBER", b"SSCAN",
+    b"SINTER", b"SINTERCARD", b"SUNION", b"SDIFF", b"ZRANGE",
+    b"ZRANGEBYSCORE", b"ZREVRANGE", b"ZREVRANGEBYSCORE", b"ZRANGEBYLEX",
+    b"ZREVRANGEBYLEX", b"ZSCORE", b"ZMSCORE", b"ZCARD", b"ZCOUNT",
+    b"ZLEXCOUNT", b"ZRANK", b"ZREVRANK", b"ZSCAN", b"ZRANDMEMBER",
+    b"ZINTER", b"ZUNION", b"ZDIFF", b"ZINTERCARD", b"PFCOUNT", b"XRANGE",
+    b"XREVRANGE", b"XLEN", b"XINFO", b"XPENDING", b"GEOPOS", b"GEODIST",
+    b"GEOHASH", b"GEORADIUS_RO", b"GEORADIUSBYMEMBER_RO", b"GEOSEARCH",
+    b"EVAL_RO", b"EVALSHA_RO", b"FCALL_RO", b"SORT_RO"
+])
+
+# commands without keys (sent to any node of a cluster)
+KEYLESS_COMMANDS = frozenset([
+    b"PING", b"ECHO", b"INFO", b"TIME", b"DBSIZE", b"RANDOMKEY", b"KEYS",
+    b"SCAN", b"FLUSHDB", b"FLUSHALL", b"CONFIG", b"CLUSTER", b"COMMAND",
+    b"SCRIPT", b"FUNCTION", b"LASTSAVE", b"MULTI", b"EXEC", b"DISCARD",
+    b"UNWATCH", b"AUTH", b"HELLO", b"CLIENT", b"SELECT", b"PUBLISH",
+    b"READONLY", b"READWRITE", b"ASKING", b"WAIT", b"SLOWLOG", b"LATENCY"
+])
+
+# commands whose arguments are all keys
+ALL_KEYS_COMMANDS = frozenset([
+    b"MGET", b"DEL", b"UNLINK", b"EXISTS", b"TOUCH", b"WATCH", b"SINTER",
+    b"SUNION", b"SDIFF", b"SINTERSTORE", b"SUNIONSTORE", b"SDIFFSTORE",
+    b"PFCOUNT", b"PFMERGE", b"RENAME", b"RENAMENX", b"RPOPLPUSH"
+])
+
+# commands whose arguments are all keys (except the last one: a timeout)
+BLOCKING_ALL_KEYS_COMMANDS = frozenset([
+    b"BLPOP", b"BRPOP", b"BRPOPLPUSH", b"BZPOPMIN", b"BZPOPMAX"
+])
+
+# commands with two keys as first arguments (followed by options)
+TWO_KEYS_COMMANDS = frozenset([b"LMOVE", b"BLMOVE", b"COPY", b"SMOVE"])
+
+# commands with (key, value) couples as arguments
+KEY_VALUE_COMMANDS = frozenset([b"MSET", b"MSETNX"])
+
+# commands with a numkeys argument (followed by keys) at position 1
+FIRST_NUMKEYS_COMMANDS = frozenset([
+    b"ZUNION", b"ZINTER", b"ZDIFF", b"SINTERCARD", b"ZINTERCARD", b"LMPOP",
+    b"ZMPOP"
+])
+
+# commands with a numkeys argument (followed by keys) at position 2
+# (scripts and blocking commands with a timeout at position 1)
+NUMKEYS_COMMANDS = frozenset([
+    b"EVAL", b"EVALSHA", b"EVAL_RO", b"EVALSHA_RO", b"FCALL", b"FCALL_RO",
+    b"BLMPOP", b"BZMPOP"
+])
+
+# commands with a destination key, a numkeys argument and keys
+STORE_NUMKEYS_COMMANDS = frozenset([
+    b"ZUNIONSTORE", b"ZINTERSTORE", b"ZDIFFSTORE"
+])
+
+# commands with a subcommand followed by a key
+SUBCOMMAND_KEY_COMMANDS = frozenset([
+    b"OBJECT", b"MEMORY", b"XINFO", b"XGROUP"
+])
+
+
+def command_name(args):
+    """Returns the (uppercased bytes) command name of a redis command.
+
+    Args:
+        args: full redis command as a tuple.
+
+    Returns:
+        the uppercased command name (bytes).
+    """
+    name = args[0]
+    if isinstance(name, six.text_type):
+        name = name.encode('utf-8')
+    return name.upper()
+
+
+# options (before STREAMS) of XREAD/XREADGROUP => number of arguments
+_XREAD_OPTIONS = {b"GROUP": 2, b"COUNT": 1, b"BLOCK": 1, b"NOACK": 0}
+
+
+def _has_block_option(args):
+    # (only option positions are checked: stream names, IDs, group and
+    # consumer names can be "block" too)
+    i = 1
+    while i < len(args):
+        option = _upper(args[i])
+        if option == b"BLOCK":
+            return True
+        if option not in _XREAD_OPTIONS:
+            # (STREAMS or an unknown option)
+            break
+        i += 1 + _XREAD_OPTIONS[option]
+    return False
+
+
+def is_exclusive_command(args):
+    """Returns True if the command needs an exclusive connection.
+
+    Blocking commands (BLPOP, XREAD BLOCK...) and commands which change the
+    state of the connection (MULTI, WATCH, SELECT, SUBSCRIBE...) can't be
+    sent on a connection shared with other coroutines.
+
+    Args:
+        args: full redis command as a tuple.
+
+    Returns:
+        True or False.
+    """
+    name = command_name(args)
+    if name in BLOCKING_COMMANDS or name in STATEFUL_COMMANDS:
+        return True
+    return name in BLOCK_OPTION_COMMANDS and _has_block_option(args)
+
+
+def is_exclusive_call(args):
+    """Returns True if the call needs an exclusive connection.
+
+    Args:
+        args: full redis command as a tuple or a tuple with a single
+            Pipeline object.
+
+    Returns:
+        True or False (transactional pipelines and pipelines with
+            exclusive commands need an exclusive connection).
+    """
+    if len(args) == 1 and isinstance(args[0], Pipeline):
+        pipeline = args[0]
+        if pipeline.transaction:
+            return True
+        for pargs in pipeline.pipelined_args:
+            if is_exclusive_command(pargs):
+                return True
+        return False
+    return is_exclusive_command(args)
+
+
+def is_readonly_command(args):
+    """Returns True if the command is a read-only command.
+
+    Args:
+        args: full redis command as a tuple.
+
+    Returns:
+        True or False (XREAD without the BLOCK option is read-only too).
+    """
+    name = command_name(args)
+    if name in READONLY_COMMANDS:
+        return True
+    return name == b"XREAD" and not _has_block_option(args)
+
+
+def is_readonly_call(args):
+    """Returns True if the call contains only read-only commands.
+
+    Args:
+        args: full redis command as a tuple or a tuple with a single
+            Pipeline object.
+
+    Returns:
+        True or False (transactional pipelines and pipelines with scripts
+            are never read-only).
+    """
+    if len(args) == 1 and isinstance(args[0], Pipeline):
+        pipeline = args[0]
+        if pipeline.transaction or len(pipeline.scripts) > 0:
+            return False
+        for pargs in pipeline.pipelined_args:
+            if not is_readonly_command(pargs):
+                return False
+        return pipeline.number_of_stacked_calls > 0
+    return is_readonly_command(args)
+
+
+def _upper(arg):
+    if isinstance(arg, six.text_type):
+        arg = arg.encode('utf-8')
+    return arg.upper() if isinstance(arg, six.binary_type) else arg
+
+
+def command_keys(args):
+    """Returns the keys of a redis command.
+
+    Common key layouts are supported (first argument, all arguments, key
+    value couples, numkeys arguments, STREAMS option of XREAD, BITOP,
+    subcommands...). For other commands, the first argument is returned as key.
+
+    Args:
+        args: full redis command as a tuple.
+
+    Returns:
+        the list of keys (empty for commands without keys).
+    """
+    name = command_name(args)
+    if name in KEYLESS_COMMANDS or len(args) < 2:
+        return []
+    if name in ALL_KEYS_COMMANDS:
+        return list(args[1:])
+    if name in BLOCKING_ALL_KEYS_COMMANDS:
+        return list(args[1:-1])
+    if name in TWO_KEYS_COMMANDS:
+        return list(args[1:3])
+    if name in KEY_VALUE_COMMANDS:
+        return list(args[1::2])
+    if name in FIRST_NUMKEYS_COMMANDS:
+        return list(args[2:2 + int(args[1])])
+    if name in NUMKEYS_COMMANDS:
+        return list(args[3:3 + int(args[2])]) if len(args) > 2 else []
+    if name in STORE_NUMKEYS_COMMANDS:
+        if len(args) < 3:
+            return [args[1]]
+        return [args[1]] + list(args[3:3 + int(args[2])])
+    if name in (b"XREAD", b"XREADGROUP"):
+        for i, arg in enumerate(args):
+            if _upper(arg) == b"STREAMS":
+                streams = args[i + 1:]
+                return list(streams[:len(streams) // 2])
+        return []
+    if name == b"BITOP":
+        return list(args[2:])
+    if name in SUBCOMMAND_KEY_COMMANDS:
+        # (OBJECT ENCODING key, MEMORY USAGE key, XINFO STREAM key...)
+        return list(args[2:3])
+    return [args[1]]
@@ -11,6 +11,7 @@ import tornado.gen
 from tornado.util import errno_from_exception
 from tornadis.write_buffer import WriteBuffer
 from tornadis.state import ConnectionState
+from tornadis.utils import get_pid
 from tornado.ioloop import IOLoop
 import tornadis
 import errno
@@ -109,6 +110,8 @@ class Connection(object):
         self._write_buffer = WriteBuffer()
         self._listened_events = 0
         self._last_read = datetime.now()
+        # pid of the process which owns the socket
+        self._pid = get_pid()
 
     def _redis_server(self):
         if self.unix_domain_socket:
@@ -145,6 +148,7 @@ class Connection(object):
                 raise tornado.gen.Return(False)
             self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         self.__socket.setblocking(0)
+        self._pid = get_pid()
         self.__periodic_callback.start()
         try:
             LOG.debug("connecting to %s...", self._redis_server())
@@ -213,6 +217,9 @@ class Connection(object):
         """
         if not self.is_connected() and not self.is_connecting():
             return
+        if self._pid != get_pid():
+            self._drop_after_fork()
+            return
         LOG.debug("disconnecting from %s...", self._redis_server())
         self.__periodic_callback.stop()
         try:
@@ -229,6 +236,34 @@ class Connection(object):
         self._close_callback()
         LOG.debug("disconnected from %s", self._redis_server())
 
+    def _drop_after_fork(self):
+        """Drops a connection inherited from a parent process (after a fork).
+
+        Nothing is sent on the socket: we just close our copy of the file
+        descriptor (the parent one is still open so the connection is not
+        closed on the redis side). The file descriptor is closed *before*
+        removing the ioloop handler so that a poller shared with the parent
+        process (inherited epoll/kqueue) is never modified. The close
+        callback is not called.
+        """
+        LOG.debug("dropping a connection inherited from the parent process")
+        self.__periodic_callback.stop()
+        fileno = self.__socket_fileno
+        self.__socket_fileno = -1
+        try:
+            self.__socket.close()
+        except Exception:
+            pass
+        if self._listened_events != 0:
+            try:
+                self._ioloop.remove_handler(fileno)
+            except Exception:
+                pass
+            self._listened_events = 0
+        self._write_buffer.clear()
+        self._state.set_disconnected()
+        self._pid = get_pid()
+
     def _handle_events(self, fd, event):
         if self.is_connecting():
             err = self.__socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
@@ -17,3 +17,7 @@ class ConnectionError(TornadisException):
 
 class ClientError(TornadisException):
     """Exception raised when there is a client error."""
+
+
+class WatchError(ClientError):
+    """Exception raised when a transaction is aborted too many times."""
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import time
+import functools
+import logging
+import tornado.gen
+import tornado.locks
+import tornado.ioloop
+
+from tornadis.exceptions import TornadisException
+from tornadis.scan import _StopAsyncIteration
+
+LOG = logging.getLogger(__name__)
+
+# max number of buffered commands before sending them
+FLUSH_THRESHOLD = 128
+# max delay (in seconds) before sending buffered commands
+FLUSH_DELAY = 0.001
+
+
+class _Slot(object):
+
+    __slots__ = ('index', 'reply', 'done', 'sent_at')
+
+    def __init__(self, index, sent_at):
+        self.index = index
+        self.reply = None
+        self.done = False
+        self.sent_at = sent_at
+
+
+class StreamingExecutor(object):
+    """Streaming command executor with a sliding window (mass insertion).
+
+    Commands are read from a (sync or async) iterator and sent on one
+    or several clients while keeping at most `window` commands in flight.
+    Results are returned in order (by batches) and the memory usage is
+    bounded (at most 2 * window commands are in flight or waiting for the
+    consumer).
+
+    If adaptive is True, the window is tuned after each epoch (at least
+    window completed commands) from the observed throughput and round trip
+    time: the window is doubled while it improves the throughput and set
+    back to its previous value when it only makes the round trip time
+    longer (with new probes from time to time). Epochs during which the
+    window is never full (the commands iterator is the bottleneck) do
+    not change the window.
+
+    Attributes:
+        clients (list): Client objects used to send commands.
+        window (int): current window (max number of commands in flight).
+        min_window (int): min window.
+        max_window (int): max window.
+        adaptive (boolean): if True, the window is tuned automatically.
+        errors_only (boolean): if True, only errors are returned (as
+            (index, error) tuples).
+        min_epoch_duration (float): min duration (in seconds) of an epoch
+            (adaptive mode).
+    """
+
+    def __init__(self, clients, commands, window=64, min_window=1,
+                 max_window=10000, adaptive=True, errors_only=False,
+                 min_epoch_duration=0.05):
+        """Constructor.
+
+        Args:
+            clients: a Client object or a list of Client objects.
+            commands: a sync or async iterable of commands (each command
+                is a tuple of arguments as given to Client.call()).
+            window (int): initial window (max number of commands in
+                flight).
+            min_window (int): min window.
+            max_window (int): max window.
+            adaptive (boolean): if True, the window is tuned automatically.
+            errors_only (boolean): if True, only errors are returned (as
+                (index, error) tuples).
+            min_epoch_duration (float): min duration (in seconds) of an
+                epoch (adaptive mode).
+        """
+        if not isinstance(clients, (list, tuple)):
+            clients = [clients]
+        self.clients = list(clients)
+        self.window = window
+        self.min_window = min_window
+        self.max_window = max_window
+        self.adaptive = adaptive
+        self.errors_only = errors_only
+        if hasattr(commands, "__anext__") or hasattr(commands, "__aiter__"):
+            self.__async = True
+            self.__iterator = commands.__aiter__()
+        else:
+            self.__async = False
+            self.__iterator = iter(commands)
+        self.__slots = []
+        self.__head = 0
+        self.__in_flight = 0
+        self.__index = 0
+        self.__exhausted = False
+        self.__space = tornado.locks.Condition()
+        self.__results = tornado.locks.Condition()
+        self.__producer = None
+        self.__to_send = []
+        self.__flush_timeout = None
+        self.min_epoch_duration = min_epoch_duration
+        self.__previous = None
+        self.__stable_epochs = 0
+        self.__epoch_start = None
+        self.__epoch_completed = 0
+        self.__epoch_rtt = 0.0
+        self.__epoch_limited = False
+
+    def _pending(self):
+        return len(self.__slots) - self.__head
+
+    def _is_full(self):
+        return self.__in_flight >= self.window or \
+            self._pending() >= 2 * self.window
+
+    @tornado.gen.coroutine
+    def _produce(self):
+        try:
+            yield [x.connect() for x in self.clients]
+            self.__epoch_start = time.time()
+            while True:
+                while self._is_full():
+                    self._flush()
+                    self.__epoch_limited = True
+                    yield self.__space.wait()
+                if self.__async:
+                    try:
+                        args = yield self.__iterator.__anext__()
+                    except _StopAsyncIteration:
+                        break
+                else:
+                    try:
+                        args = next(self.__iterator)
+                    except StopIteration:
+                        break
+                self._send(args)
+        finally:
+            self._flush()
+            self.__exhausted = True
+            self.__results.notify_all()
+
+    def _send(self, args):
+        # commands are buffered and sent by batches (so with a few big writes
+        # even with an async commands iterator which gives the hand back
+        # to the ioloop between two commands)
+        slot = _Slot(self.__index, None)
+        self.__index = self.__index + 1
+        self.__slots.append(slot)
+        self.__in_flight = self.__in_flight + 1
+        self.__to_send.append((slot, args))
+        if len(self.__to_send) >= FLUSH_THRESHOLD:
+            self._flush()
+        elif self.__flush_timeout is None:
+            ioloop = tornado.ioloop.IOLoop.current()
+            self.__flush_timeout = ioloop.call_later(FLUSH_DELAY,
+                                                     self._flush)
+
+    def _flush(self):
+        if self.__flush_timeout is not None:
+            ioloop = tornado.ioloop.IOLoop.current()
+            ioloop.remove_timeout(self.__flush_timeout)
+            self.__flush_timeout = None
+        now = time.time()
+        to_send = self.__to_send
+        self.__to_send = []
+        for slot, args in to_send:
+            slot.sent_at = now
+            client = self.clients[slot.index % len(self.clients)]
+            cb = functools.partial(self._on_reply, slot)
+            client.async_call(*args, callback=cb)
+
+    def _on_reply(self, slot, reply):
+        now = time.time()
+        slot.reply = reply
+        slot.done = True
+        self.__in_flight = self.__in_flight - 1
+        self.__epoch_rtt = self.__epoch_rtt + now - slot.sent_at
+        self.__epoch_completed = self.__epoch_completed + 1
+        if self.adaptive and self.__epoch_completed >= self.window:
+            self._adapt_window(now)
+        if self.__in_flight <= self.window // 2:
+            # low watermark: the window is refilled by batches (and so with
+            # a few big writes instead of a lot of small ones)
+            self.__space.notify_all()
+        if self.__slots[self.__head] is slot:
+            self.__results.notify_all()
+
+    def _adapt_window(self, now):
+        elapsed = now - self.__epoch_start
+        if elapsed < self.min_epoch_duration:
+            return
+        completed = self.__epoch_completed
+        throughput = completed / elapsed
+        avg_rtt = self.__epoch_rtt / completed
+        window = self.window
+        if not self.__epoch_limited:
+            # the window was never full during the epoch, the throughput
+            # is limited by the commands iterator (and not by the window)
+            # => we keep the current window
+            pass
+        elif self.__previous is None:
+            window = window * 2
+        else:
+            previous_window, previous_throughput = self.__previous
+            if self.window > previous_window:
+                if throughput > previous_throughput * 1.05:
+                    # the growth paid => let's continue
+                    window = window * 2
+                else:
+                    # the growth did not pay (only a longer rtt)
+                    # => let's go back
+                    window = previous_window
+                    self.__stable_epochs = 0
+            elif self.window < previous_window:
+                self.__stable_epochs = 0
+            else:
+                self.__stable_epochs = self.__stable_epochs + 1
+                if self.__stable_epochs >= 10:
+                    # let's probe again from time to time
+                    self.__stable_epochs = 0
+                    window = window * 2
+        window = min(self.max_window, max(self.min_window, window))
+        if self.__epoch_limited:
+            self.__previous = (self.window, throughput)
+        if window != self.window:
+            LOG.debug("new window: %i => %i (throughput: %f commands/s, "
+                      "avg rtt: %f s)", self.window, window, throughput,
+                      avg_rtt)
+            self.window = window
+        self.__epoch_start = now
+        self.__epoch_completed = 0
+        self.__epoch_rtt = 0.0
+        self.__epoch_limited = self._is_full()
+
+    @tornado.gen.coroutine
+    def next_batch(self):
+        """Returns a Future of the next batch of results (in order).
+
+        Returns:
+            a Future with the next (non empty) list of results as result
+                (or None if all commands have been executed). If errors_only
+                is True, the list contains (index, error) tuples.
+
+        Examples:
+
+            >>> executor = StreamingExecutor(client, commands)
+            >>> while True:
+                    results = yield executor.next_batch()
+                    if results is None:
+                        break
+        """
+        if self.__producer is None:
+            self.__producer = self._produce()
+        while True:
+            batch = []
+            while self.__head < len(self.__slots):
+                slot = self.__slots[self.__head]
+                if not slot.done:
+                    break
+                self.__head = self.__head + 1
+                if not self.errors_only:
+                    batch.append(slot.reply)
+                elif isinstance(slot.reply, TornadisException):
+                    batch.append((slot.index, slot.reply))
+            if self.__head > 0 and self.__head * 2 >= len(self.__slots):
+                # compaction
+                del self.__slots[:self.__head]
+                self.__head = 0
+            self.__space.notify_all()
+            if len(batch) > 0:
+                raise tornado.gen.Return(batch)
+            if self.__exhausted and self._pending() == 0:
+                if self.__producer.done() and \
+                        self.__producer.exception() is not None:
+                    raise self.__producer.exception()
+                raise tornado.gen.Return(None)
+            yield self.__results.wait()
+
+    @tornado.gen.coroutine
+    def run(self):
+        """Executes all commands and returns a Future of errors.
+
+        Returns:
+            a Future with the list of (index, error) tuples as result.
+        """
+        errors = []
+        position = 0
+        while True:
+            batch = yield self.next_batch()
+            if batch is None:
+                break
+            if self.errors_only:
+                errors.extend(batch)
+            else:
+                errors.extend((position + i, x) for i, x in enumerate(batch)
+                              if isinstance(x, TornadisException))
+                position = position + len(batch)
+        raise tornado.gen.Return(errors)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self._anext()
+
+    @tornado.gen.coroutine
+    def _anext(self):
+        batch = yield self.next_batch()
+        if batch is None:
+            raise _StopAsyncIteration()
+        raise tornado.gen.Return(batch)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+
+from tornadis.pipeline import Pipeline
+from tornadis.commands import command_name, command_keys
+from tornadis.exceptions import ClientError, TornadisException
+
+# default error for commands whose keys belong to several groups
+CROSS_GROUP_ERROR = "CROSSSLOT Keys in request don't hash to the same slot"
+
+
+def _first_error(replies):
+    for reply in replies:
+        if isinstance(reply, TornadisException):
+            return reply
+    return None
+
+
+def _merge_ok(replies):
+    error = _first_error(replies)
+    return error if error is not None else b"OK"
+
+
+def _merge_sum(replies):
+    error = _first_error(replies)
+    return error if error is not None else sum(replies)
+
+
+def _make_merge_mget(positions, size):
+    def merge(replies):
+        error = _first_error(replies)
+        if error is not None:
+            return error
+        res = [None] * size
+        for sub_positions, reply in zip(positions, replies):
+            for position, value in zip(sub_positions, reply):
+                res[position] = value
+        return res
+    return merge
+
+
+def _merge_single(replies):
+    return replies[0]
+
+
+# multi-key commands which can be split by key group:
+# command name => (number of arguments per key, merge function or None
+# for MGET like commands)
+SPLITTABLE_COMMANDS = {
+    b"MGET": (1, None),
+    b"MSET": (2, _merge_ok),
+    b"DEL": (1, _merge_sum),
+    b"UNLINK": (1, _merge_sum),
+    b"EXISTS": (1, _merge_sum),
+    b"TOUCH": (1, _merge_sum)
+}
+
+
+class SplitCall(object):
+    """A call (command or pipeline) split in sub-commands by key group.
+
+    Each command is associated with the group of its keys (for example a
+    cluster slot or a shard). Splittable multi-key commands (MGET, MSET,
+    DEL, UNLINK, EXISTS, TOUCH) with keys in several groups are split in
+    one sub-command per group, their replies are merged back by merge().
+    Other commands with keys in several groups are not sent (their reply
+    is a ClientError).
+
+    Attributes:
+        sub_commands (list): list of (group, args) tuples (group is None
+            for commands without key).
+        scripts (dict): scripts of the pipeline (see Pipeline.scripts).
+    """
+
+    def __init__(self, args, key_group, error_message=CROSS_GROUP_ERROR):
+        """Constructor.
+
+        Args:
+            args: full redis command as a tuple or a tuple with a single
+                (not transactional) Pipeline object.
+            key_group (callable): function which returns the group of a
+                key.
+            error_message (string): message of the error returned for
+                commands which can't be split.
+        """
+        self.error_message = error_message
+        self.sub_commands = []
+        self.scripts = {}
+        self.__parts = []
+        self.__pipeline = len(args) == 1 and isinstance(args[0], Pipeline)
+        if self.__pipeline:
+            self.scripts = args[0].scripts
+            for command in args[0].pipelined_args:
+                self._add_command(command, key_group)
+        else:
+            self._add_command(args, key_group)
+
+    def _add_sub_command(self, group, args):
+        self.sub_commands.append((group, args))
+        return len(self.sub_commands) - 1
+
+    def _add_command(self, args, key_group):
+        keys = command_keys(args)
+        groups = [key_group(key) for key in keys]
+        if len(set(groups)) <= 1:
+            group = groups[0] if groups else None
+            index = self._add_sub_command(group, args)
+            self.__parts.append(([index], _merge_single))
+            return
+        name = command_name(args)
+        if name not in SPLITTABLE_COMMANDS:
+            self.__parts.append(ClientError(self.error_message))
+            return
+        step, merge = SPLITTABLE_COMMANDS[name]
+        # group => (arguments, positions of keys)
+        by_group = {}
+        order = []
+        for position, group in enumerate(groups):
+            if group not in by_group:
+                by_group[group] = ([], [])
+                order.append(group)
+            start = 1 + position * step
+            by_group[group][0].extend(args[start:start + step])
+            by_group[group][1].append(position)
+        indexes = [self._add_sub_command(g, (args[0],) +
+                                         tuple(by_group[g][0]))
+                   for g in order]
+        if merge is None:
+            merge = _make_merge_mget([by_group[g][1] for g in order],
+                                     len(groups))
+        self.__parts.append((indexes, merge))
+
+    def merge(self, replies):
+        """Merges the replies of sub-commands.
+
+        Args:
+            replies (list): replies of sub-commands (same order than
+                sub_commands).
+
+        Returns:
+            the reply of the original call (a list for a pipeline).
+        """
+        res = []
+        for part in self.__parts:
+            if isinstance(part, TornadisException):
+                res.append(part)
+            else:
+                indexes, merge = part
+                res.append(merge([replies[i] for i in indexes]))
+        return res if self.__pipeline else res[0]
+
+
+@tornado.gen.coroutine
+def fanout(split, node_of_group, call_node):
+    """Sends the sub-commands of a SplitCall (one pipeline per node).
+
+    All pipelines are sent concurrently (so the latency is the latency of
+    the slowest node).
+
+    Args:
+        split (SplitCall): the split call.
+        node_of_group (callable): function which returns the node (any
+            hashable object) of a group.
+        call_node (callable): function called with a node and a Pipeline
+            object which returns a Future with the list of replies (or a
+            TornadisException object).
+
+    Returns:
+        a Future with the list of replies of sub-commands as result (same
+            order than split.sub_commands).
+    """
+    by_node = {}
+    for index, (group, _) in enumerate(split.sub_commands):
+        by_node.setdefault(node_of_group(group), []).append(index)
+    nodes = list(by_node.keys())
+    futures = []
+    for node in nodes:
+        pipeline = Pipeline()
+        pipeline.scripts = split.scripts
+        for index in by_node[node]:
+            pipeline.stack_call(*split.sub_commands[index][1])
+        futures.append(call_node(node, pipeline))
+    results = yield futures
+    replies = [None] * len(split.sub_commands)
+    for node, res in zip(nodes, results):
+        for position, index in enumerate(by_node[node]):
+            if isinstance(res, TornadisException):
+                replies[index] = res
+            else:
+                replies[index] = res[position]
+    raise tornado.gen.Return(replies)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import mmap
+import os
+import six
+
+
+class FileArgument(object):
+    """File backed redis command argument.
+
+    It can be used (as an argument) with Client.call(),
+    Client.async_call() or Pipeline.stack_call() to send a big value without
+    reading the whole file in memory: the file is mapped in memory (mmap)
+    and the argument is a memoryview over the mapping, so the connection
+    sends it by write_page_size chunks (only file backed pages, which can be
+    reclaimed by the kernel, are used).
+
+    Note: with python2, the file content is read (no memoryview over mmap
+    objects).
+
+    Attributes:
+        path (string): path of the file.
+        offset (int): offset (in bytes) of the value in the file.
+        length (int): length (in bytes) of the value (None means "until the
+            end of the file").
+
+    Examples:
+
+        >>> yield client.call("SET", "key", FileArgument("/path/to/blob"))
+    """
+
+    def __init__(self, path, offset=0, length=None):
+        """Constructor.
+
+        Args:
+            path (string): path of the file.
+            offset (int): offset (in bytes) of the value in the file.
+            length (int): length (in bytes) of the value (None means "until
+                the end of the file").
+        """
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def get_buffer(self):
+        """Returns a buffer (without copy) over the file content.
+
+        The file is read at this moment (so it must not be modified until
+        the command is sent).
+
+        Returns:
+            a memoryview over a read only memory mapping of the file (or a
+                string with python2 or for an empty value).
+        """
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            length = size - self.offset if self.length is None \
+                else min(self.length, size - self.offset)
+            if length <= 0:
+                return b""
+            if six.PY2:  # pragma: no cover
+                f.seek(self.offset)
+                return f.read(length)
+            # (mmap offset must be a multiple of ALLOCATIONGRANULARITY)
+            start = self.offset - self.offset % mmap.ALLOCATIONGRANULARITY
+            mapping = mmap.mmap(f.fileno(), self.offset - start + length,
+                                access=mmap.ACCESS_READ, offset=start)
+        view = memoryview(mapping)
+        return view[self.offset - start:]
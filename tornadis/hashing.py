@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import six
+
+# number of hash slots of a redis cluster
+NUMBER_OF_SLOTS = 16384
+
+
+def _make_crc16_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE = _make_crc16_table()
+
+
+def crc16(data):
+    """Computes the CRC16 (XMODEM variant) of a string.
+
+    Args:
+        data (bytes): the string.
+
+    Returns:
+        the CRC16 (int).
+    """
+    crc = 0
+    for byte in six.iterbytes(data):
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def to_bytes(key):
+    """Converts a key (str, bytes or number) to bytes (as sent to redis)."""
+    if isinstance(key, six.binary_type):
+        return key
+    if isinstance(key, six.text_type):
+        return key.encode('utf-8')
+    return str(key).encode('utf-8')
+
+
+def hash_tag(key):
+    """Returns the part of a key which is hashed.
+
+    If the key contains a non empty hash tag ("{...}", the first "{" and the
+    first following "}"), only the hash tag content is hashed (so keys with
+    the same hash tag are stored on the same node).
+
+    Args:
+        key: the key (str, bytes or number).
+
+    Returns:
+        the hashed part of the key (bytes).
+    """
+    key = to_bytes(key)
+    start = key.find(b"{")
+    if start != -1:
+        end = key.find(b"}", start + 1)
+        if end > start + 1:
+            return key[start + 1:end]
+    return key
+
+
+def key_slot(key):
+    """Returns the redis cluster hash slot of a key (hash tags included).
+
+    Args:
+        key: the key (str, bytes or number).
+
+    Returns:
+        the slot number (int between 0 and NUMBER_OF_SLOTS - 1).
+    """
+    return crc16(hash_tag(key)) % NUMBER_OF_SLOTS
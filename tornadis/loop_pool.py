@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.ioloop
+import functools
+import threading
+
+from tornadis.pool import ClientPool
+from tornadis.client import Client
+from tornadis.utils import ContextManagerFuture
+
+
+def merge_stats(stats_list):
+    """Merges several stats dicts (numbers are summed, dicts are merged)."""
+    res = {}
+    for stats in stats_list:
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                res[key] = merge_stats([res.get(key, {}), value])
+            elif isinstance(value, (int, float)) and \
+                    not isinstance(value, bool):
+                res[key] = res.get(key, 0) + value
+    return res
+
+
+class LoopAwareClientPool(object):
+    """Pool facade with one sub-pool (ClientPool) per tornado IOLoop.
+
+    This is useful for "one ioloop per thread" deployments: a connection is
+    bound to a single ioloop so it must never be used from another one. With
+    this object, each ioloop gets its own sub-pool (lazily created when the
+    pool is used for the first time from this ioloop). The sub-pool of the
+    current ioloop is automatically selected.
+
+    Note: max_size (and other ClientPool options) are per ioloop.
+    """
+
+    def __init__(self, **pool_kwargs):
+        """Constructor.
+
+        Args:
+            pool_kwargs (dict): ClientPool constructor arguments (used for
+                each sub-pool, ioloop is set automatically).
+        """
+        if 'ioloop' in pool_kwargs:
+            raise Exception("ioloop is not allowed to be used here.")
+        self.pool_kwargs = pool_kwargs
+        self.__shards = {}
+        self.__lock = threading.Lock()
+
+    def _get_shard(self, ioloop=None):
+        if ioloop is None:
+            ioloop = tornado.ioloop.IOLoop.current()
+        pool = self.__shards.get(ioloop)
+        if pool is None:
+            with self.__lock:
+                pool = self.__shards.get(ioloop)
+                if pool is None:
+                    pool = ClientPool(ioloop=ioloop, **self.pool_kwargs)
+                    self.__shards[ioloop] = pool
+        return pool
+
+    def get_connected_client(self):
+        """Gets a connected Client object bound to the current ioloop.
+
+        See :meth:`ClientPool.get_connected_client`.
+        """
+        return self._get_shard().get_connected_client()
+
+    def get_client_nowait(self):
+        """Gets a Client object bound to the current ioloop (or None).
+
+        See :meth:`ClientPool.get_client_nowait`.
+        """
+        return self._get_shard().get_client_nowait()
+
+    def connected_client(self):
+        """Returns a ContextManagerFuture to be yielded in a with statement.
+
+        See :meth:`ClientPool.connected_client`.
+        """
+        future = self.get_connected_client()
+        cb = functools.partial(self._connected_client_release_cb, future)
+        return ContextManagerFuture(future, cb)
+
+    def _connected_client_release_cb(self, future=None):
+        client = future.result()
+        self.release_client(client)
+
+    def release_client(self, client):
+        """Releases a client object to the sub-pool which owns it.
+
+        If the client is released from another ioloop, it is handed back
+        to its own ioloop.
+
+        Args:
+            client: Client object.
+        """
+        if not isinstance(client, Client):
+            return
+        ioloop = client.connection_kwargs['ioloop']
+        pool = self.__shards.get(ioloop)
+        # (the sub-pool doesn't exist anymore after a destroy() call)
+        cb = client.disconnect if pool is None else \
+            functools.partial(pool.release_client, client)
+        if ioloop is tornado.ioloop.IOLoop.current(instance=False):
+            cb()
+        else:
+            ioloop.add_callback(cb)
+
+    def call(self, *args, **kwargs):
+        """Calls a redis command on a client of the current ioloop sub-pool.
+
+        See :meth:`ClientPool.call`.
+        """
+        return self._get_shard().call(*args, **kwargs)
+
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction with the current ioloop sub-pool.
+
+        See :meth:`ClientPool.transaction`.
+        """
+        return self._get_shard().transaction(fn, *watched_keys, **kwargs)
+
+    def preconnect(self, size=-1):
+        """(pre)Connects redis clients of the current ioloop sub-pool.
+
+        See :meth:`ClientPool.preconnect`.
+        """
+        return self._get_shard().preconnect(size)
+
+    def destroy(self):
+        """Disconnects all pooled client objects (of all sub-pools).
+
+        Sub-pools of other ioloops are destroyed by their own ioloop (and
+        forgotten: new sub-pools will be created if the pool is used
+        again).
+        """
+        current = tornado.ioloop.IOLoop.current(instance=False)
+        with self.__lock:
+            shards = list(self.__shards.items())
+            self.__shards = {}
+        for ioloop, pool in shards:
+            if ioloop is current:
+                pool.destroy()
+            else:
+                ioloop.add_callback(pool.destroy)
+
+    def stats(self):
+        """Returns statistics aggregated over all sub-pools.
+
+        Returns:
+            A dict with the sum of the sub-pools statistics (see
+                :meth:`ClientPool.stats`, hit_ratio is computed from the
+                sums) and the number of sub-pools ("shards" key).
+        """
+        with self.__lock:
+            pools = list(self.__shards.values())
+        res = merge_stats([pool.stats() for pool in pools])
+        res['shards'] = len(pools)
+        # (ratios can't be summed)
+        total = res.get('hits', 0) + res.get('misses', 0)
+        res['hit_ratio'] = float(res['hits']) / total if total > 0 else None
+        return res
@@ -16,17 +16,35 @@ class Pipeline(object):
 
     More informations on the redis side: http://redis.io/topics/pipelining
 
+    If the transaction flag is set, the stacked commands are wrapped
+    into a MULTI/EXEC block (in the same write) and the result of the call
+    is the EXEC reply: a list with one reply per stacked command (or None
+    if the transaction was aborted because of a WATCHed key).
+
+    More informations on the redis side: http://redis.io/topics/transactions
+
     Attributes:
         pipelined_args: A list of tuples, earch tuple is a complete
             redis command.
         number_of_stacked_calls: the number of stacked redis commands
             (integer).
+        transaction (boolean): True if the stacked commands are executed
+            inside a MULTI/EXEC block.
+        scripts (dict): Script objects used by stacked commands (indexed
+            by their SHA1 digests).
     """
 
-    def __init__(self):
-        """Constructor."""
+    def __init__(self, transaction=False):
+        """Constructor.
+
+        Args:
+            transaction (boolean): if True, the stacked commands are executed
+                inside a MULTI/EXEC block (default False).
+        """
         self.pipelined_args = []
         self.number_of_stacked_calls = 0
+        self.transaction = transaction
+        self.scripts = {}
 
     def stack_call(self, *args):
         """Stacks a redis command inside the object.
@@ -44,3 +62,16 @@ class Pipeline(object):
         """
         self.pipelined_args.append(args)
         self.number_of_stacked_calls = self.number_of_stacked_calls + 1
+
+    def stack_script(self, script, *args):
+        """Stacks a redis command which uses the given Script object.
+
+        You should use the stack_call() method of the Script object instead.
+
+        Args:
+            script (Script): the Script object used by the command.
+            *args: full redis command (EVALSHA...) as variable length
+                argument list.
+        """
+        self.scripts[script.sha] = script
+        self.stack_call(*args)
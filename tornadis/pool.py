@@ -6,90 +6,420 @@
 
 import tornado.gen
 import tornado.ioloop
-import tornado.locks
+import tornado.concurrent
 import logging
 import functools
+import time
+import bisect
 from collections import deque
+from datetime import timedelta
 
 from tornadis.client import Client
-from tornadis.utils import ContextManagerFuture
+from tornadis.commands import is_exclusive_call
+from tornadis.utils import ContextManagerFuture, get_pid
 from tornadis.exceptions import ClientError
 
 LOG = logging.getLogger(__name__)
 
+# upper bounds (in seconds) of the acquire wait time histogram buckets
+WAIT_HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+WAIT_HISTOGRAM_LABELS = tuple("%g" % x for x in WAIT_HISTOGRAM_BOUNDS) + \
+    ("inf",)
+DESTROY_REASONS = ("expired", "autoclose", "max_idle", "failed",
+                   "disconnected", "destroy")
+
 
 class ClientPool(object):
     """High level object to deal with a pool of redis clients."""
 
     def __init__(self, max_size=-1, client_timeout=-1, autoclose=False,
+                 min_idle=0, max_idle=-1, maintenance_interval=None,
+                 validate_idle_after=None, validate_on_return=False,
+                 validate_timeout=1.0, sweep_interval=None,
+                 acquire_timeout=None, max_waiters=-1, multiplex_size=0,
                  **client_kwargs):
         """Constructor.
 
+        Idle clients are reused in LIFO order (the most recently released
+        client is borrowed first) so hot connections stay hot and cold ones
+        age out (and are closed after client_timeout seconds of idle time).
+
         Args:
             max_size (int): max size of the pool (-1 means "no limit").
             client_timeout (int): timeout in seconds of a connection released
-                to the pool (-1 means "no timeout").
+                to the pool (idle time, -1 means "no timeout").
             autoclose (boolean): automatically disconnect released connections
-                with lifetime > client_timeout (test made every
+                idle for more than client_timeout (test made every
                 client_timeout/10 seconds).
+            min_idle (int): min number of idle connected clients (refilled
+                in background, 0 means "no minimum").
+            max_idle (int): max number of idle clients (extra clients are
+                disconnected when released, -1 means "no limit").
+            maintenance_interval (float): interval (in seconds) between two
+                maintenance tasks (expired clients closing and min_idle
+                refill), None means client_timeout/10 with autoclose, 1
+                second otherwise.
+            validate_idle_after (float): clients idle for more than this
+                number of seconds are validated (with a PING) before being
+                returned by get_connected_client() (None means "no
+                validation on borrow").
+            validate_on_return (boolean): if True, released clients are
+                validated (with a PING, in background) before going back
+                to the pool (they are still counted against max_size and
+                borrows wait for them instead of creating new clients).
+            validate_timeout (float): timeout (in seconds) of validation
+                PINGs (clients which do not answer in time are
+                disconnected).
+            sweep_interval (float): interval (in seconds) between two
+                validations of all idle clients in background (None means
+                "no background validation").
+            acquire_timeout (float): max time (in seconds) to wait for a
+                client when max_size is reached (None means "no timeout").
+            max_waiters (int): max number of coroutines waiting for a
+                client when max_size is reached (others get an error
+                immediately, -1 means "no limit").
+            multiplex_size (int): number of shared (multiplexed) clients
+                used by call() for commands which do not need an exclusive
+                connection (0 means "no multiplexing"). These clients are
+                not counted in max_size.
             client_kwargs (dict): Client constructor arguments.
         """
         self.max_size = max_size
         self.client_timeout = client_timeout
+        self.min_idle = min_idle
+        self.max_idle = max_idle
         self.client_kwargs = client_kwargs
         self.__ioloop = client_kwargs.get('ioloop',
                                           tornado.ioloop.IOLoop.instance())
         self.autoclose = autoclose
+        if maintenance_interval is None:
+            if self.autoclose and self.client_timeout > 0:
+                maintenance_interval = self.client_timeout / 10.
+            else:
+                maintenance_interval = 1.
+        self.maintenance_interval = maintenance_interval
+        self.validate_idle_after = validate_idle_after
+        self.validate_on_return = validate_on_return
+        self.validate_timeout = validate_timeout
+        self.sweep_interval = sweep_interval
+        self.acquire_timeout = acquire_timeout
+        self.max_waiters = max_waiters
+        self.multiplex_size = multiplex_size
+        # shared clients (multiplexed mode, lazily created)
+        self.__shared = None
+        # idle clients (the most recently released on the right)
         self.__pool = deque()
-        if self.max_size != -1:
-            self.__sem = tornado.locks.Semaphore(self.max_size)
-        else:
-            self.__sem = None
-        self.__autoclose_periodic = None
-        if self.autoclose and self.client_timeout > 0:
-            every = int(self.client_timeout) * 100
+        # client => time of its release to the pool
+        self.__idle_since = {}
+        # number of borrowed clients (<= max_size)
+        self.__borrowed = 0
+        self.__creating = 0
+        self.__refilling = False
+        # released client being validated => Future (validate_on_return,
+        # these clients are still counted as borrowed)
+        self.__validating = {}
+        # futures of coroutines waiting for a client (FIFO)
+        self.__waiters = deque()
+        # True if the pool is drained (see drain())
+        self.__draining = False
+        self._reset_stats()
+        # pid of the process which owns the pool (and the size of the last
+        # preconnect() call to prewarm the pool again after a fork)
+        self.__pid = get_pid()
+        self.__preconnect_size = None
+        self.__maintenance_periodic = None
+        self.__sweep_periodic = None
+        self._start_maintenance()
+
+    def _reset_stats(self):
+        self.__created = 0
+        self.__destroyed = dict((x, 0) for x in DESTROY_REASONS)
+        self.__hits = 0
+        self.__misses = 0
+        self.__timeouts = 0
+        self.__rejected = 0
+        self.__wait_histogram = [0] * len(WAIT_HISTOGRAM_LABELS)
+
+    def _destroy_client(self, client, reason):
+        self.__destroyed[reason] += 1
+        client.disconnect()
+
+    def _start_maintenance(self):
+        if self.sweep_interval is not None:
+            every = int(self.sweep_interval * 1000)
+            if int(tornado.version[0]) >= 5:
+                cb = tornado.ioloop.PeriodicCallback(self._sweep, every)
+            else:
+                cb = tornado.ioloop.PeriodicCallback(self._sweep, every,
+                                                     self.__ioloop)
+            self.__sweep_periodic = cb
+            self.__sweep_periodic.start()
+        if (self.autoclose and self.client_timeout > 0) or self.min_idle > 0:
+            every = int(self.maintenance_interval * 1000)
             if int(tornado.version[0]) >= 5:
-                cb = tornado.ioloop.PeriodicCallback(self._autoclose,
+                cb = tornado.ioloop.PeriodicCallback(self._maintenance,
                                                      every)
             else:
-                cb = tornado.ioloop.PeriodicCallback(self._autoclose,
+                cb = tornado.ioloop.PeriodicCallback(self._maintenance,
                                                      every, self.__ioloop)
-            self.__autoclose_periodic = cb
-            self.__autoclose_periodic.start()
+            self.__maintenance_periodic = cb
+            self.__maintenance_periodic.start()
+            if self.min_idle > 0:
+                self.__ioloop.add_callback(self._maintenance)
+
+    def _stop_maintenance(self):
+        if self.__maintenance_periodic is not None:
+            self.__maintenance_periodic.stop()
+            self.__maintenance_periodic = None
+        if self.__sweep_periodic is not None:
+            self.__sweep_periodic.stop()
+            self.__sweep_periodic = None
+
+    def _check_fork(self):
+        if self.__pid != get_pid():
+            self._reset_after_fork()
+
+    def _reset_after_fork(self):
+        """Forgets the state inherited from the parent process (after a fork).
+
+        Pooled connections (which belong to the parent process) are dropped
+        without sending anything on them, waiters (which belong to the
+        parent process) are forgotten and, if the pool was
+        prewarmed with preconnect(), it is prewarmed again (in background)
+        for this process.
+        """
+        LOG.debug("fork detected, resetting the pool state")
+        self.__pid = get_pid()
+        if 'ioloop' not in self.client_kwargs:
+            self.__ioloop = tornado.ioloop.IOLoop.current()
+        for client in self.__pool:
+            client._reset_after_fork()
+        for client in self.__shared or []:
+            client._reset_after_fork()
+        self.__shared = None
+        self.__pool = deque()
+        self.__idle_since = {}
+        self.__borrowed = 0
+        self.__creating = 0
+        self.__refilling = False
+        self.__validating = {}
+        self.__waiters = deque()
+        self._reset_stats()
+        self._stop_maintenance()
+        self._start_maintenance()
+        if self.__preconnect_size is not None:
+            self.__ioloop.spawn_callback(self.preconnect,
+                                         self.__preconnect_size)
 
     def _get_client_from_pool_or_make_it(self):
-        try:
-            while True:
-                client = self.__pool.popleft()
-                if client.is_connected():
-                    if self._is_expired_client(client):
-                        client.disconnect()
-                        continue
-                    break
-        except IndexError:
+        client, idle_time = self._pop_idle_client()
+        if client is None:
+            self.__misses += 1
             client = self._make_client()
+            self._schedule_refill()
             return (True, client)
+        self.__hits += 1
+        self._schedule_refill()
         return (False, client)
 
+    def _pop_idle_client(self):
+        """Pops a connected (not expired) idle client (LIFO).
+
+        Returns:
+            A (client, idle time in seconds) tuple ((None, None) if there
+                is no idle client).
+        """
+        now = time.time()
+        while True:
+            try:
+                client = self.__pool.pop()
+            except IndexError:
+                return (None, None)
+            expired = self._is_expired_client(client)
+            idle_since = self.__idle_since.pop(client, now)
+            if client.is_connected():
+                if expired:
+                    self._destroy_client(client, "expired")
+                    continue
+                return (client, now - idle_since)
+            self.__destroyed["disconnected"] += 1
+
+    @tornado.gen.coroutine
+    def _validate(self, client, destroy=True):
+        """Validates a client with a PING (disconnected if it fails).
+
+        Args:
+            client: the Client object to validate.
+            destroy (boolean): if False, an invalid client is not
+                disconnected (the caller has to do it).
+
+        Returns:
+            A Future with True (valid client) or False as result.
+        """
+        if not client.is_connected():
+            raise tornado.gen.Return(False)
+        future = client.call("PING")
+        try:
+            res = yield tornado.gen.with_timeout(
+                timedelta(seconds=self.validate_timeout), future)
+        except tornado.gen.TimeoutError:
+            res = None
+        if res != b"PONG":
+            LOG.warning("invalid pooled client (PING => %s), disconnecting",
+                        res)
+            if destroy:
+                self._destroy_client(client, "failed")
+            raise tornado.gen.Return(False)
+        raise tornado.gen.Return(True)
+
+    @tornado.gen.coroutine
+    def _sweep(self):
+        clients = list(self.__pool)
+        if len(clients) == 0:
+            return
+        res = yield [self._validate(client, destroy=False)
+                     for client in clients]
+        for client, valid in zip(clients, res):
+            if not valid:
+                try:
+                    self.__pool.remove(client)
+                except ValueError:
+                    # borrowed in the meantime (the borrower gets the
+                    # error)
+                    continue
+                self.__idle_since.pop(client, None)
+                if client.is_connected():
+                    self._destroy_client(client, "failed")
+                else:
+                    self.__destroyed["disconnected"] += 1
+        self._schedule_refill()
+
+    def _try_acquire(self):
+        # (no barging: if there are waiters, free slots are for them)
+        if len(self.__waiters) == 0 and \
+                (self.max_size == -1 or self.__borrowed < self.max_size):
+            self.__borrowed += 1
+            return True
+        return False
+
+    def _release_slot(self):
+        while len(self.__waiters) > 0:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                # the slot is given to the first (not cancelled) waiter
+                waiter.set_result(True)
+                return
+        self.__borrowed -= 1
+
     @tornado.gen.coroutine
+    def _acquire(self, caller_future):
+        if self._try_acquire():
+            self.__wait_histogram[0] += 1
+            raise tornado.gen.Return(True)
+        if self.max_waiters != -1 and \
+                len(self.__waiters) >= self.max_waiters:
+            self.__rejected += 1
+            raise tornado.gen.Return(ClientError("too many waiters"))
+        before = self.__ioloop.time()
+        waiter = tornado.concurrent.Future()
+        self.__waiters.append(waiter)
+
+        def abandon(future=None, result=None):
+            # the caller gave up (result=None) or timeout (result=False)
+            if not waiter.done():
+                waiter.set_result(result)
+                self.__waiters.remove(waiter)
+
+        caller_future.add_done_callback(abandon)
+        if self.acquire_timeout is not None:
+            timeout = self.__ioloop.call_later(self.acquire_timeout, abandon,
+                                               result=False)
+            try:
+                res = yield waiter
+            finally:
+                self.__ioloop.remove_timeout(timeout)
+        else:
+            res = yield waiter
+        if isinstance(res, ClientError):
+            # (drained pool)
+            raise tornado.gen.Return(res)
+        if res is None:
+            # (nobody will read this error)
+            raise tornado.gen.Return(ClientError("abandoned wait"))
+        if res is False:
+            self.__timeouts += 1
+            raise tornado.gen.Return(ClientError("timeout while waiting for "
+                                                 "a client"))
+        wait = self.__ioloop.time() - before
+        self.__wait_histogram[bisect.bisect_left(WAIT_HISTOGRAM_BOUNDS,
+                                                 wait)] += 1
+        raise tornado.gen.Return(True)
+
     def get_connected_client(self):
         """Gets a connected Client object.
 
         If max_size is reached, this method will block until a new client
-        object is available.
+        object is available (with a FIFO order) or until acquire_timeout.
+
+        If the returned Future is cancelled, the wait is cancelled (or the
+        client automatically released).
 
         Returns:
             A Future object with connected Client instance as a result
-                (or ClientError if there was a connection problem)
+                (or ClientError if there was a connection problem, a
+                timeout or too many waiters)
         """
-        if self.__sem is not None:
-            yield self.__sem.acquire()
-        client = None
+        self._check_fork()
+        future = tornado.concurrent.Future()
+        self._get_connected_client(future)
+        return future
+
+    @tornado.gen.coroutine
+    def _get_connected_client(self, future):
+        res = yield self._acquire(future)
+        if res is not True:
+            if not future.done():
+                future.set_result(res)
+            return
+        try:
+            client = yield self._get_connected_client_with_slot()
+        except Exception as e:
+            self._release_slot()
+            if not future.done():
+                future.set_exception(e)
+            return
+        if future.done():
+            # cancelled by the caller
+            self.release_client(client)
+        else:
+            future.set_result(client)
+
+    @tornado.gen.coroutine
+    def _get_connected_client_with_slot(self):
+        while len(self.__pool) == 0 and len(self.__validating) > 0:
+            # (a released client is being validated: wait for it instead
+            # of opening a new connection)
+            yield tornado.gen.WaitIterator(
+                *self.__validating.values()).next()
+        if self.validate_idle_after is not None:
+            while True:
+                client, idle_time = self._pop_idle_client()
+                if client is None or idle_time <= self.validate_idle_after:
+                    break
+                valid = yield self._validate(client)
+                if valid:
+                    break
+            if client is not None:
+                self.__hits += 1
+                self._schedule_refill()
+                raise tornado.gen.Return(client)
         newly_created, client = self._get_client_from_pool_or_make_it()
         if newly_created:
             res = yield client.connect()
             if not res:
                 LOG.warning("can't connect to %s", client.title)
+                self.__destroyed["failed"] += 1
+                self._release_slot()
                 raise tornado.gen.Return(
                     ClientError("can't connect to %s" % client.title))
         raise tornado.gen.Return(client)
@@ -102,30 +432,81 @@ class ClientPool(object):
         Returns:
             A Client instance (not necessary connected) as result (or None).
         """
-        if self.__sem is not None:
-            if self.__sem._value == 0:
-                return None
-            self.__sem.acquire()
+        self._check_fork()
+        if not self._try_acquire():
+            return None
         _, client = self._get_client_from_pool_or_make_it()
         return client
 
-    def _autoclose(self):
-        newpool = deque()
+    def _maintenance(self):
+        if self.autoclose:
+            # the coldest clients are on the left (disconnected clients
+            # are dropped too so they don't block the cleanup)
+            while len(self.__pool) > 0:
+                client = self.__pool[0]
+                if not client.is_connected():
+                    reason = "disconnected"
+                elif self._is_expired_client(client):
+                    reason = "autoclose"
+                else:
+                    break
+                self.__pool.popleft()
+                self.__idle_since.pop(client, None)
+                self._destroy_client(client, reason)
+        self._schedule_refill()
+
+    def _schedule_refill(self):
+        if not self.__refilling and self._missing_idle_clients() > 0:
+            self.__refilling = True
+            self.__ioloop.spawn_callback(self._refill)
+
+    def _missing_idle_clients(self):
+        missing = self.min_idle - len(self.__pool) - self.__creating - \
+            len(self.__validating)
+        if self.max_size != -1:
+            missing = min(missing, self.max_size - len(self.__pool) -
+                          self.__borrowed - self.__creating)
+        return missing
+
+    @tornado.gen.coroutine
+    def _refill(self):
         try:
             while True:
-                client = self.__pool.popleft()
-                if client.is_connected():
-                    if self._is_expired_client(client):
-                        client.disconnect()
+                missing = self._missing_idle_clients()
+                if missing <= 0:
+                    break
+                self.__creating += missing
+                try:
+                    clients = [self._make_client() for _ in range(0, missing)]
+                    res = yield [client.connect() for client in clients]
+                finally:
+                    self.__creating -= missing
+                for client, connected in zip(clients, res):
+                    if connected:
+                        self._add_idle_client(client)
                     else:
-                        newpool.append(client)
-        except IndexError:
-            self.__pool = newpool
+                        self.__destroyed["failed"] += 1
+                if not all(res):
+                    LOG.warning("can't refill the pool to min_idle")
+                    break
+        finally:
+            self.__refilling = False
+
+    def _add_idle_client(self, client):
+        self.__pool.append(client)
+        self.__idle_since[client] = time.time()
+        if self.max_idle != -1:
+            while len(self.__pool) > self.max_idle:
+                # too many idle clients => disconnect the coldest ones
+                cold_client = self.__pool.popleft()
+                self.__idle_since.pop(cold_client, None)
+                self._destroy_client(cold_client, "max_idle")
 
     def _is_expired_client(self, client):
         if self.client_timeout != -1 and client.is_connected():
-            delta = client.get_last_state_change_timedelta()
-            if delta.total_seconds() >= self.client_timeout:
+            idle_since = self.__idle_since.get(client)
+            if idle_since is not None and \
+                    time.time() - idle_since >= self.client_timeout:
                 return True
         return False
 
@@ -146,6 +527,81 @@ class ClientPool(object):
         cb = functools.partial(self._connected_client_release_cb, future)
         return ContextManagerFuture(future, cb)
 
+    def call(self, *args, **kwargs):
+        """Calls a redis command on a pooled client and returns a Future.
+
+        A connected client is borrowed from the pool for the call and
+        released when the reply is available.
+
+        In multiplexed mode (multiplex_size > 0), commands are sent on the
+        shared client with the fewest pending replies instead (except
+        blocking commands, commands which change the connection state and
+        transactional pipelines which still use an exclusive client).
+
+        See :meth:`Client.call` for arguments.
+
+        Returns:
+            a Future with the decoded redis reply as result (or a
+                TornadisException object in case of errors).
+        """
+        if self.multiplex_size > 0 and not is_exclusive_call(args):
+            self._check_fork()
+            return self._get_shared_client().call(*args, **kwargs)
+        return self._exclusive_call(*args, **kwargs)
+
+    def _get_shared_client(self):
+        if self.__shared is None:
+            kwargs = dict(self.client_kwargs)
+            kwargs['autoconnect'] = True
+            self.__shared = [Client(**kwargs)
+                             for _ in range(0, self.multiplex_size)]
+            self.__created += self.multiplex_size
+        # least outstanding requests
+        best = None
+        best_pending = None
+        for client in self.__shared:
+            pending = client.get_number_of_pending_replies()
+            if pending == 0:
+                return client
+            if best is None or pending < best_pending:
+                best = client
+                best_pending = pending
+        return best
+
+    @tornado.gen.coroutine
+    def _exclusive_call(self, *args, **kwargs):
+        client = yield self.get_connected_client()
+        if not isinstance(client, Client):
+            raise tornado.gen.Return(client)
+        try:
+            res = yield client.call(*args, **kwargs)
+        finally:
+            self.release_client(client)
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction on a pinned pooled client.
+
+        A connected client is borrowed from the pool for the whole
+        transaction (WATCH, fn calls, MULTI/EXEC and retries) and released
+        at the end.
+
+        See :meth:`Client.transaction` for arguments and options.
+
+        Returns:
+            a Future with the list of replies (one per stacked command) as
+                result (or a TornadisException object in case of errors).
+        """
+        client = yield self.get_connected_client()
+        if not isinstance(client, Client):
+            raise tornado.gen.Return(client)
+        try:
+            res = yield client.transaction(fn, *watched_keys, **kwargs)
+        finally:
+            self.release_client(client)
+        raise tornado.gen.Return(res)
+
     def _connected_client_release_cb(self, future=None):
         client = future.result()
         self.release_client(client)
@@ -153,33 +609,130 @@ class ClientPool(object):
     def release_client(self, client):
         """Releases a client object to the pool.
 
+        Other objects (for example the ClientError returned by
+        get_connected_client()) are ignored.
+
         Args:
             client: Client object.
         """
+        self._check_fork()
         if isinstance(client, Client):
-            if not self._is_expired_client(client):
+            if self.__draining:
+                self._destroy_client(client, "destroy")
+            elif not self._is_expired_client(client):
                 LOG.debug('Client is not expired. Adding back to pool')
-                self.__pool.append(client)
+                if self.validate_on_return:
+                    # (the slot is released after the validation)
+                    validated = tornado.concurrent.Future()
+                    self.__validating[client] = validated
+                    self.__ioloop.spawn_callback(self._validate_and_add,
+                                                 client, validated)
+                    return
+                self._add_idle_client(client)
             elif client.is_connected():
                 LOG.debug('Client is expired and connected. Disconnecting')
-                client.disconnect()
-        if self.__sem is not None:
-            self.__sem.release()
+                self._destroy_client(client, "expired")
+            self._release_slot()
+
+    @tornado.gen.coroutine
+    def _validate_and_add(self, client, validated):
+        valid = False
+        try:
+            valid = yield self._validate(client)
+        finally:
+            self.__validating.pop(client, None)
+            if valid:
+                if self.__draining:
+                    self._destroy_client(client, "destroy")
+                else:
+                    self._add_idle_client(client)
+            self._release_slot()
+            validated.set_result(valid)
+        self._schedule_refill()
 
     def destroy(self):
         """Disconnects all pooled client objects."""
+        self._check_fork()
+        self._stop_maintenance()
+        self.min_idle = 0
+        for client in self.__shared or []:
+            self._destroy_client(client, "destroy")
+        self.__shared = None
         while True:
             try:
                 client = self.__pool.popleft()
                 if isinstance(client, Client):
-                    client.disconnect()
+                    self._destroy_client(client, "destroy")
             except IndexError:
                 break
+        self.__idle_since = {}
+
+    def drain(self):
+        """Destroys the pool and disconnects borrowed clients when released.
+
+        Coroutines waiting for a client get a ClientError. This is useful
+        when the redis server must not be used anymore (for example after
+        a failover), the pool must not be used after this call.
+        """
+        self.__draining = True
+        while len(self.__waiters) > 0:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(ClientError("the pool is drained"))
+        self.destroy()
+
+    def stats(self):
+        """Returns some statistics about the pool.
+
+        Counters are cumulative (since the pool creation).
+
+        Returns:
+            A dict with following keys:
+
+            - in_use: number of borrowed clients (and of released clients
+              being validated, see validate_on_return),
+            - shared: number of shared clients (multiplexed mode),
+            - idle: number of clients waiting in the pool,
+            - waiters: number of coroutines waiting for a client,
+            - created: number of created clients,
+            - destroyed: dict of destroyed clients by reason (expired:
+              expired at borrow or release time, autoclose: expired in
+              background, max_idle: too many idle clients, failed:
+              connection or validation failure, disconnected: found
+              disconnected in the pool, destroy: destroy() call),
+            - hits: number of borrows served by an idle client,
+            - misses: number of borrows which created a new client,
+            - hit_ratio: hits / (hits + misses) (None if no borrow),
+            - wait_histogram: dict of acquire wait times (upper bound in
+              seconds => count, "inf" for longer waits),
+            - timeouts: number of acquire timeouts (acquire_timeout
+              expiries only),
+            - rejected: number of borrows rejected (max_waiters).
+        """
+        total = self.__hits + self.__misses
+        return {
+            "in_use": self.__borrowed,
+            "shared": len(self.__shared or []),
+            "idle": len(self.__pool),
+            "waiters": len(self.__waiters),
+            "created": self.__created,
+            "destroyed": dict(self.__destroyed),
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "hit_ratio": float(self.__hits) / total if total > 0 else None,
+            "wait_histogram": dict(zip(WAIT_HISTOGRAM_LABELS,
+                                       self.__wait_histogram)),
+            "timeouts": self.__timeouts,
+            "rejected": self.__rejected
+        }
 
     @tornado.gen.coroutine
     def preconnect(self, size=-1):
         """(pre)Connects some or all redis clients inside the pool.
 
+        The pool is automatically prewarmed again (with the same size) in
+        forked child processes.
+
         Args:
             size (int): number of redis clients to build and to connect
                 (-1 means all clients if pool max_size > -1)
@@ -189,7 +742,13 @@ class ClientPool(object):
         """
         if size == -1 and self.max_size == -1:
             raise ClientError("size=-1 not allowed with pool max_size=-1")
-        limit = min(size, self.max_size) if size != -1 else self.max_size
+        self.__preconnect_size = size
+        if size == -1:
+            limit = self.max_size
+        elif self.max_size == -1:
+            limit = size
+        else:
+            limit = min(size, self.max_size)
         clients = yield [self.get_connected_client() for _ in range(0, limit)]
         for client in clients:
             self.release_client(client)
@@ -198,4 +757,5 @@ class ClientPool(object):
         """Makes and returns a Client object."""
         kwargs = self.client_kwargs
         client = Client(**kwargs)
+        self.__created += 1
         return client
@@ -10,6 +10,7 @@ from datetime import timedelta
 import logging
 
 from tornadis.client import Client
+from tornadis.utils import format_args_in_redis_protocol
 from tornadis.exceptions import ConnectionError, ClientError
 
 
@@ -136,6 +137,21 @@ class PubSubClient(Client):
                 self.subscribed = False
         raise tornado.gen.Return(True)
 
+    def pubsub_ping(self):
+        """Sends a PING on the subscribed connection (without waiting).
+
+        This is useful to detect dead (half-open) connections: the reply
+        (a [b"pong", b""] message) is returned by pubsub_pop_message().
+
+        Returns:
+            True if the PING was sent (False if the client is not
+                connected or not subscribed).
+        """
+        if not self.subscribed or not self.is_connected():
+            return False
+        self._write(format_args_in_redis_protocol("PING"))
+        return True
+
     @tornado.gen.coroutine
     def pubsub_pop_message(self, deadline=None):
         """Pops a message for a subscribed client.
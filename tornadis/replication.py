@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.ioloop
+import functools
+import logging
+import random
+import weakref
+import six
+
+from tornadis.pool import ClientPool
+from tornadis.client import Client
+from tornadis.commands import is_readonly_call
+from tornadis.utils import ContextManagerFuture
+from tornadis.exceptions import ConnectionError
+from tornadis.exceptions import TornadisException
+
+LOG = logging.getLogger(__name__)
+
+
+def parse_info(reply):
+    """Parses an INFO reply.
+
+    Args:
+        reply (bytes): INFO reply.
+
+    Returns:
+        a dict (field => value as string).
+    """
+    if isinstance(reply, six.binary_type):
+        reply = reply.decode('utf-8', 'replace')
+    res = {}
+    for line in reply.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.partition(":")
+        res[key] = value
+    return res
+
+
+def replica_lag(primary_info, replica_info):
+    """Returns the replication lag (in bytes) of a replica.
+
+    Args:
+        primary_info (dict): parsed INFO replication of the primary.
+        replica_info (dict): parsed INFO replication of the replica.
+
+    Returns:
+        the lag in bytes (int) or None if the replica is not a connected
+            replica.
+    """
+    if replica_info.get("master_link_status") != "up":
+        return None
+    try:
+        primary_offset = int(primary_info["master_repl_offset"])
+        replica_offset = int(replica_info["slave_repl_offset"])
+    except (KeyError, ValueError):
+        return None
+    return max(0, primary_offset - replica_offset)
+
+
+@tornado.gen.coroutine
+def node_call(pool, *args, **kwargs):
+    """Calls a redis command on a client borrowed from the given pool.
+
+    Args:
+        pool (ClientPool): the pool to use.
+        *args: full redis command as variable length argument list or
+            a Pipeline object (as a single argument).
+        **kwargs: Client.call() options.
+
+    Returns:
+        a Future with a (reply, node_failure) tuple as result (node_failure
+            is True if the node is not available: connection error).
+    """
+    client = yield pool.get_connected_client()
+    if not isinstance(client, Client):
+        raise tornado.gen.Return((client, True))
+    try:
+        res = yield client.call(*args, **kwargs)
+    finally:
+        pool.release_client(client)
+    raise tornado.gen.Return((res, isinstance(res, ConnectionError)))
+
+
+def _node_key(node):
+    return tuple(sorted(node.items()))
+
+
+class _Replica(object):
+
+    __slots__ = ("node", "pool", "latency", "lag", "excluded",
+                 "excluded_until")
+
+    def __init__(self, node, pool, latency):
+        self.node = node
+        self.pool = pool
+        self.latency = latency
+        self.lag = None
+        # excluded by the last check
+        self.excluded = False
+        # excluded after a failure (until this ioloop time)
+        self.excluded_until = None
+
+    def is_excluded(self, now):
+        return self.excluded or \
+            (self.excluded_until is not None and now < self.excluded_until)
+
+
+class ReplicatedClientPool(object):
+    """Topology aware pool (one primary and N replicas).
+
+    Read-only calls (read-only commands or pipelines of read-only
+    commands, see tornadis.commands.READONLY_COMMANDS) are sent to a
+    replica selected at random with a probability proportional to the
+    inverse of its latency (exponentially weighted moving average). Other
+    calls (writes, transactions, scripts...) are sent to the primary.
+
+    Replicas are checked in background (INFO replication): replicas which
+    are not connected to the primary or (if max_lag is set) with a
+    replication lag bigger than max_lag bytes are excluded. If no replica
+    is available (or if a replica does not answer), reads are sent to the
+    primary. A replica which does not answer is excluded for retry_delay
+    seconds (or until the next successful check).
+
+    Note: replicas are read with exclusive clients (their multiplexed mode
+    is not used).
+
+    Attributes:
+        max_lag (int): max replication lag (in bytes) of a replica to serve
+            reads (None means "no limit").
+        check_interval (float): interval (in seconds) between two replicas
+            checks (None means "no check").
+        latency_alpha (float): weight of the last measure in the latency
+            moving average.
+        retry_delay (float): delay (in seconds) before sending reads again
+            to a replica which didn't answer.
+        pool_kwargs (dict): ClientPool constructor arguments (used for
+            each node).
+    """
+
+    def __init__(self, primary=None, replicas=(), max_lag=None,
+                 check_interval=1.0, latency_alpha=0.2, retry_delay=5.0,
+                 **pool_kwargs):
+        """Constructor.
+
+        Args:
+            primary (dict): ClientPool constructor arguments specific to
+                the primary node (for example: {"host": "10.0.0.1",
+                "port": 6379}).
+            replicas (list): list of dicts, ClientPool constructor arguments
+                specific to each replica node.
+            max_lag (int): max replication lag (in bytes) of a replica to
+                serve reads (None means "no limit").
+            check_interval (float): interval (in seconds) between two
+                replicas checks (None means "no check").
+            latency_alpha (float): weight of the last measure in the
+                latency moving average.
+            retry_delay (float): delay (in seconds) before sending reads
+                again to a replica which didn't answer.
+            pool_kwargs (dict): ClientPool constructor arguments (common to
+                each node).
+        """
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.latency_alpha = latency_alpha
+        self.retry_delay = retry_delay
+        self.pool_kwargs = pool_kwargs
+        self.__ioloop = pool_kwargs.get('ioloop',
+                                        tornado.ioloop.IOLoop.instance())
+        self.__primary_node = None
+        self.__primary = None
+        self.__replicas = []
+        # borrowed client => pool which owns it
+        self.__owners = weakref.WeakKeyDictionary()
+        self.__checking = False
+        if primary is not None:
+            self.set_topology(primary, replicas)
+        self.__check_periodic = None
+        if self.check_interval is not None:
+            every = int(self.check_interval * 1000)
+            if int(tornado.version[0]) >= 5:
+                cb = tornado.ioloop.PeriodicCallback(self._check_replicas,
+                                                     every)
+            else:
+                cb = tornado.ioloop.PeriodicCallback(self._check_replicas,
+                                                     every, self.__ioloop)
+            self.__check_periodic = cb
+            self.__check_periodic.start()
+
+    def _make_pool(self, node):
+        kwargs = dict(self.pool_kwargs)
+        kwargs.update(node)
+        return ClientPool(**kwargs)
+
+    def set_topology(self, primary, replicas=()):
+        """Changes the topology (primary and replicas nodes).
+
+        Pools of unchanged nodes are kept, other ones are drained (see
+        :meth:`ClientPool.drain`).
+
+        Args:
+            primary (dict): ClientPool constructor arguments specific to
+                the primary node.
+            replicas (list): list of dicts, ClientPool constructor arguments
+                specific to each replica node.
+        """
+        old_pools = dict((_node_key(r.node), r.pool) for r in self.__replicas)
+        if self.__primary is not None:
+            old_pools[_node_key(self.__primary_node)] = self.__primary
+        old_replicas = dict((_node_key(r.node), r) for r in self.__replicas)
+        primary_key = _node_key(primary)
+        if self.__primary is not None and \
+                _node_key(self.__primary_node) == primary_key:
+            primary_pool = self.__primary
+        else:
+            primary_pool = self._make_pool(primary)
+        new_replicas = []
+        for node in replicas:
+            key = _node_key(node)
+            replica = old_replicas.get(key)
+            if replica is None or key == primary_key:
+                replica = _Replica(node, self._make_pool(node),
+                                   self._default_latency())
+            new_replicas.append(replica)
+        kept = set([id(primary_pool)] + [id(r.pool) for r in new_replicas])
+        for pool in old_pools.values():
+            if id(pool) not in kept:
+                pool.drain()
+        self.__primary_node = primary
+        self.__primary = primary_pool
+        self.__replicas = new_replicas
+
+    def _default_latency(self):
+        # (new replicas get the best known latency to be tried)
+        latencies = [r.latency for r in self.__replicas]
+        return min(latencies) if latencies else 0.001
+
+    def _select_replica(self):
+        now = self.__ioloop.time()
+        candidates = [r for r in self.__replicas if not r.is_excluded(now)]
+        if len(candidates) == 0:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        weights = [1.0 / max(r.latency, 0.00001) for r in candidates]
+        point = random.random() * sum(weights)
+        for replica, weight in zip(candidates, weights):
+            point -= weight
+            if point < 0:
+                return replica
+        return candidates[-1]
+
+    def _update_latency(self, replica, latency):
+        replica.latency = (1.0 - self.latency_alpha) * replica.latency + \
+            self.latency_alpha * latency
+
+    @tornado.gen.coroutine
+    def _replica_call(self, replica, *args, **kwargs):
+        before = self.__ioloop.time()
+        res, failure = yield node_call(replica.pool, *args, **kwargs)
+        if failure:
+            LOG.warning("replica %s not available (%s), excluded for %s "
+                        "seconds", replica.node, res, self.retry_delay)
+            replica.excluded_until = self.__ioloop.time() + self.retry_delay
+        else:
+            self._update_latency(replica, self.__ioloop.time() - before)
+        raise tornado.gen.Return((res, failure))
+
+    @tornado.gen.coroutine
+    def call(self, *args, **kwargs):
+        """Calls a redis command on the primary or on a replica.
+
+        See :meth:`Client.call` for arguments.
+
+        Returns:
+            a Future with the decoded redis reply as result (or a
+                TornadisException object in case of errors).
+        """
+        if len(self.__replicas) > 0 and is_readonly_call(args):
+            replica = self._select_replica()
+            if replica is not None:
+                res, failure = yield self._replica_call(replica, *args,
+                                                        **kwargs)
+                if not failure:
+                    raise tornado.gen.Return(res)
+        res = yield self.__primary.call(*args, **kwargs)
+        raise tornado.gen.Return(res)
+
+    def get_connected_client(self):
+        """Gets a connected Client object (to the primary).
+
+        See :meth:`ClientPool.get_connected_client`.
+        """
+        pool = self.__primary
+        future = pool.get_connected_client()
+        future.add_done_callback(functools.partial(self._remember_owner,
+                                                   pool))
+        return future
+
+    def _remember_owner(self, pool, future):
+        if not future.cancelled() and isinstance(future.result(), Client):
+            self.__owners[future.result()] = pool
+
+    def connected_client(self):
+        """Returns a ContextManagerFuture to be yielded in a with statement.
+
+        The client is connected to the primary.
+
+        See :meth:`ClientPool.connected_client`.
+        """
+        future = self.get_connected_client()
+        cb = functools.partial(self._connected_client_release_cb, future)
+        return ContextManagerFuture(future, cb)
+
+    def _connected_client_release_cb(self, future=None):
+        self.release_client(future.result())
+
+    def release_client(self, client):
+        """Releases a client object to the pool which owns it.
+
+        Args:
+            client: Client object.
+        """
+        if not isinstance(client, Client):
+            return
+        pool = self.__owners.pop(client, None)
+        (pool or self.__primary).release_client(client)
+
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction on the primary.
+
+        See :meth:`ClientPool.transaction`.
+        """
+        return self.__primary.transaction(fn, *watched_keys, **kwargs)
+
+    @tornado.gen.coroutine
+    def _check_replicas(self):
+        if self.__checking or len(self.__replicas) == 0:
+            return
+        self.__checking = True
+        try:
+            replicas = list(self.__replicas)
+            primary_info, replicas_res = yield [
+                node_call(self.__primary, "INFO", "replication"),
+                [self._replica_call(r, "INFO", "replication")
+                 for r in replicas]]
+            reply, failure = primary_info
+            if failure or isinstance(reply, TornadisException):
+                LOG.warning("can't check the primary: %s", reply)
+                return
+            primary_info = parse_info(reply)
+            for replica, (reply, failure) in zip(replicas, replicas_res):
+                if failure:
+                    # (excluded for retry_delay seconds by _replica_call)
+                    continue
+                if isinstance(reply, TornadisException):
+                    replica.excluded = True
+                    continue
+                replica.excluded_until = None
+                lag = replica_lag(primary_info, parse_info(reply))
+                replica.lag = lag
+                excluded = lag is None or \
+                    (self.max_lag is not None and lag > self.max_lag)
+                if excluded and not replica.excluded:
+                    LOG.warning("replica %s excluded (lag: %s)",
+                                replica.node, lag)
+                replica.excluded = excluded
+        finally:
+            self.__checking = False
+
+    def destroy(self):
+        """Stops the background checks and destroys all pools."""
+        if self.__check_periodic is not None:
+            self.__check_periodic.stop()
+            self.__check_periodic = None
+        if self.__primary is not None:
+            self.__primary.destroy()
+        for replica in self.__replicas:
+            replica.pool.destroy()
+
+    def stats(self):
+        """Returns some statistics about the pools.
+
+        Returns:
+            A dict with following keys: primary (stats of the primary pool,
+                see :meth:`ClientPool.stats`) and replicas (list of dicts
+                with node, latency, lag, excluded and stats keys).
+        """
+        now = self.__ioloop.time()
+        return {
+            "primary": self.__primary.stats()
+            if self.__primary is not None else None,
+            "replicas": [{"node": r.node, "latency": r.latency,
+                          "lag": r.lag, "excluded": r.is_excluded(now),
+                          "stats": r.pool.stats()} for r in self.__replicas]
+        }
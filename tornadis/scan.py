@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import time
+import six
+import tornado.gen
+
+from tornadis.exceptions import TornadisException, ClientError
+
+# StopAsyncIteration does not exist with python < 3.5
+_StopAsyncIteration = getattr(six.moves.builtins, "StopAsyncIteration",
+                              StopIteration)
+
+
+class ScanIterator(object):
+    """Iterator object over SCAN/HSCAN/SSCAN/ZSCAN redis commands.
+
+    Elements are returned by batches (one batch by redis page). The next
+    page is requested (prefetched) as soon as a batch is returned so the
+    redis round trip overlaps with the processing of the current batch.
+
+    The COUNT argument is adapted after each page to get closer to the
+    target_latency (page round trip duration).
+
+    Note: as with the underlying redis commands, an element can be returned
+    multiple times.
+
+    More informations on the redis side: http://redis.io/commands/scan
+
+    Attributes:
+        target: Client (or ClientPool) object used to send commands.
+        command (string): the scan command (SCAN, HSCAN, SSCAN or ZSCAN).
+        key (string): the key to scan (None for SCAN command).
+        match (string): MATCH pattern (None means no pattern).
+        type (string): TYPE filter (SCAN command only, None means no
+            filter).
+        count (int): current COUNT argument.
+        min_count (int): min COUNT argument.
+        max_count (int): max COUNT argument.
+        target_latency (float): target duration (in seconds) of a page
+            round trip (None means fixed COUNT).
+        pairs (boolean): if True, elements are returned as (field, value)
+            tuples (HSCAN/ZSCAN).
+    """
+
+    def __init__(self, target, command, key=None, match=None, count=100,
+                 type=None, min_count=10, max_count=10000,
+                 target_latency=0.005):
+        """Constructor.
+
+        Args:
+            target: Client (or ClientPool) object used to send commands.
+            command (string): the scan command (SCAN, HSCAN, SSCAN or ZSCAN).
+            key (string): the key to scan (None for SCAN command).
+            match (string): MATCH pattern (None means no pattern).
+            count (int): initial COUNT argument.
+            type (string): TYPE filter (SCAN command only, None means no
+                filter).
+            min_count (int): min COUNT argument.
+            max_count (int): max COUNT argument.
+            target_latency (float): target duration (in seconds) of a page
+                round trip (None means fixed COUNT).
+        """
+        self.target = target
+        self.command = command.upper()
+        self.key = key
+        self.match = match
+        self.type = type
+        self.count = count
+        self.min_count = min_count
+        self.max_count = max_count
+        self.target_latency = target_latency
+        self.pairs = self.command in ("HSCAN", "ZSCAN")
+        self.__next_future = None
+        self.__started = False
+        self.__finished = False
+
+    def _adapt_count(self, elapsed):
+        if self.target_latency is None:
+            return
+        ratio = self.target_latency / max(elapsed, 0.000001)
+        # smoothing: never more than x2 or /2 between two pages
+        ratio = min(2.0, max(0.5, ratio))
+        count = int(self.count * ratio)
+        self.count = min(self.max_count, max(self.min_count, count))
+
+    @tornado.gen.coroutine
+    def _fetch(self, cursor):
+        args = [self.command]
+        if self.key is not None:
+            args.append(self.key)
+        args.append(cursor)
+        if self.match is not None:
+            args.extend(("MATCH", self.match))
+        args.extend(("COUNT", self.count))
+        if self.type is not None:
+            args.extend(("TYPE", self.type))
+        before = time.time()
+        reply = yield self.target.call(*args)
+        self._adapt_count(time.time() - before)
+        raise tornado.gen.Return(reply)
+
+    @tornado.gen.coroutine
+    def next_batch(self):
+        """Returns a Future of the next batch of elements.
+
+        Returns:
+            a Future with the next (non empty) list of elements as result
+                (or None if the iteration is over or a TornadisException
+                object in case of errors).
+
+        Examples:
+
+            >>> iterator = client.scan_iter(match="foo*")
+            >>> while True:
+                    batch = yield iterator.next_batch()
+                    if batch is None:
+                        break
+                    # do something with batch
+        """
+        while True:
+            if self.__next_future is None:
+                if self.__finished:
+                    raise tornado.gen.Return(None)
+                if self.__started:
+                    raise tornado.gen.Return(
+                        ClientError("concurrent next_batch() calls"))
+                self.__next_future = self._fetch(0)
+            self.__started = True
+            future = self.__next_future
+            self.__next_future = None
+            reply = yield future
+            if isinstance(reply, TornadisException):
+                self.__finished = True
+                raise tornado.gen.Return(reply)
+            cursor, elements = reply
+            if int(cursor) == 0:
+                self.__finished = True
+            else:
+                # prefetch the next page
+                self.__next_future = self._fetch(cursor)
+            if len(elements) > 0:
+                if self.pairs:
+                    elements = list(zip(elements[::2], elements[1::2]))
+                raise tornado.gen.Return(elements)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self._anext()
+
+    @tornado.gen.coroutine
+    def _anext(self):
+        batch = yield self.next_batch()
+        if batch is None:
+            raise _StopAsyncIteration()
+        if isinstance(batch, TornadisException):
+            raise batch
+        raise tornado.gen.Return(batch)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import hashlib
+import six
+import tornado.gen
+
+from tornadis.pipeline import Pipeline
+from tornadis.exceptions import ClientError
+
+
+def is_noscript_error(reply):
+    """Returns True if the given reply is a NOSCRIPT redis error.
+
+    Args:
+        reply: a decoded redis reply.
+
+    Returns:
+        True or False.
+    """
+    return isinstance(reply, ClientError) and \
+        str(reply).startswith("NOSCRIPT")
+
+
+class Script(object):
+    """Lua script object which always uses EVALSHA.
+
+    The SHA1 digest of the script is computed locally so only the digest
+    is sent with EVALSHA. If the script is not loaded on the redis side
+    (NOSCRIPT error), the script is loaded (SCRIPT LOAD) and the call is
+    retried once (in the same write).
+
+    More informations on the redis side: http://redis.io/commands/evalsha
+
+    Attributes:
+        source (bytes): the lua source code of the script.
+        sha (string): the SHA1 hexadecimal digest of the script.
+        target: Client or ClientPool object used by default by call().
+    """
+
+    def __init__(self, source, target=None):
+        """Constructor.
+
+        Args:
+            source (string): the lua source code of the script.
+            target: Client or ClientPool object used by default by call().
+        """
+        if isinstance(source, six.text_type):
+            source = source.encode('utf-8')
+        self.source = source
+        self.sha = hashlib.sha1(source).hexdigest()
+        self.target = target
+
+    def _evalsha_args(self, keys, args):
+        return ("EVALSHA", self.sha, len(keys)) + tuple(keys) + tuple(args)
+
+    @tornado.gen.coroutine
+    def call(self, keys=(), args=(), target=None):
+        """Calls the script and returns a Future of the reply.
+
+        Args:
+            keys (list): KEYS arguments of the script.
+            args (list): ARGV arguments of the script.
+            target: Client or ClientPool object to use (if None, the
+                target given to the constructor is used).
+
+        Returns:
+            a Future with the decoded redis reply as result (or a
+                TornadisException object in case of errors).
+
+        Examples:
+
+            >>> script = Script("return redis.call('GET', KEYS[1])", client)
+            >>> result = yield script.call(keys=["key"])
+        """
+        target = target or self.target
+        if target is None:
+            raise tornado.gen.Return(ClientError("no target given"))
+        evalsha_args = self._evalsha_args(keys, args)
+        reply = yield target.call(*evalsha_args)
+        if is_noscript_error(reply):
+            pipeline = Pipeline()
+            pipeline.stack_call("SCRIPT", "LOAD", self.source)
+            pipeline.stack_call(*evalsha_args)
+            replies = yield target.call(pipeline)
+            if not isinstance(replies, list):
+                raise tornado.gen.Return(replies)
+            reply = replies[1]
+        raise tornado.gen.Return(reply)
+
+    def stack_call(self, pipeline, keys=(), args=()):
+        """Stacks a call of the script inside the given Pipeline object.
+
+        The script is registered in the pipeline so it is (pre)loaded in the
+        same write if necessary (when the pipeline is executed).
+
+        Args:
+            pipeline (Pipeline): the Pipeline object.
+            keys (list): KEYS arguments of the script.
+            args (list): ARGV arguments of the script.
+        """
+        pipeline.stack_script(self, *self._evalsha_args(keys, args))
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.ioloop
+import logging
+import six
+
+from tornadis.client import Client
+from tornadis.pubsub import PubSubClient
+from tornadis.replication import ReplicatedClientPool
+from tornadis.commands import is_readonly_call
+from tornadis.exceptions import ConnectionError, ClientError
+from tornadis.exceptions import TornadisException
+
+LOG = logging.getLogger(__name__)
+
+# replica flags which mean "don't use this replica"
+BAD_REPLICA_FLAGS = frozenset(["s_down", "o_down", "disconnected"])
+
+
+def is_failover_error(reply):
+    """Returns True if a call result may be caused by a failover.
+
+    Args:
+        reply: the call result.
+
+    Returns:
+        True for connection errors, connection failures (of pools) and
+            READONLY errors (write on a demoted primary).
+    """
+    if isinstance(reply, ConnectionError):
+        return True
+    return isinstance(reply, ClientError) and \
+        str(reply).startswith(("can't connect", "READONLY"))
+
+
+def _to_str(value):
+    if isinstance(value, six.binary_type):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def parse_sentinel_replicas(reply):
+    """Parses a SENTINEL REPLICAS reply.
+
+    Args:
+        reply (list): SENTINEL REPLICAS (or SLAVES) reply (a list of flat
+            lists of field names and values).
+
+    Returns:
+        a list of nodes (dicts with host and port keys) of usable replicas
+            (not down, not disconnected and with their link to the primary
+            up).
+    """
+    res = []
+    for fields in reply:
+        info = dict(zip([_to_str(x) for x in fields[0::2]],
+                        [_to_str(x) for x in fields[1::2]]))
+        flags = set(info.get("flags", "").split(","))
+        if flags & BAD_REPLICA_FLAGS:
+            continue
+        if info.get("master-link-status", "ok") != "ok":
+            continue
+        res.append({"host": info["ip"], "port": int(info["port"])})
+    return res
+
+
+def parse_switch_master(message):
+    """Parses the payload of a +switch-master message.
+
+    Args:
+        message: the payload ("<name> <old ip> <old port> <new ip>
+            <new port>").
+
+    Returns:
+        a (name, node) tuple (node is the new primary as a dict with host
+            and port keys) or None if the payload is invalid.
+    """
+    parts = _to_str(message).split()
+    if len(parts) != 5:
+        return None
+    try:
+        return (parts[0], {"host": parts[3], "port": int(parts[4])})
+    except ValueError:
+        return None
+
+
+class SentinelClientPool(ReplicatedClientPool):
+    """ReplicatedClientPool with a topology discovered by Redis Sentinel.
+
+    The primary and the replicas of a service are asked to sentinels
+    (SENTINEL get-master-addr-by-name and SENTINEL replicas). A PubSubClient
+    stays subscribed to the +switch-master channel of a sentinel so a
+    failover is applied as soon as it is announced: pools of the old
+    primary are drained (see :meth:`ClientPool.drain`) and new clients are
+    connected to the new primary.
+
+    Read-only calls which fail because of a connection error (for example
+    in-flight reads on the old primary during a failover) are retried once
+    after a topology refresh (see retry_reads). Other calls are never
+    retried (they may not be idempotent) but a connection error (or a
+    READONLY error) triggers a topology refresh.
+
+    Attributes:
+        service_name (string): name of the service (master name) in the
+            sentinels configuration.
+        sentinels (list): list of (host, port) tuples (the last sentinel
+            which answered is moved to the beginning of the list).
+        sentinel_kwargs (dict): Client constructor arguments to connect to
+            sentinels (for example: password or connect_timeout).
+        use_replicas (boolean): if False, replicas are ignored (all calls are
+            sent to the primary).
+        retry_reads (boolean): if True, read-only calls which fail with a
+            connection error are retried once.
+        watch_retry_delay (float): delay (in seconds) between two attempts
+            to subscribe to a sentinel.
+        watch_ping_interval (float): max delay (in seconds) without
+            message from the watched sentinel before sending a PING (the
+            sentinel is considered dead if there is no answer after the
+            same delay).
+    """
+
+    def __init__(self, service_name, sentinels, sentinel_kwargs=None,
+                 use_replicas=True, retry_reads=True, watch_retry_delay=1.0,
+                 watch_ping_interval=5.0, **kwargs):
+        """Constructor.
+
+        Args:
+            service_name (string): name of the service (master name) in the
+                sentinels configuration.
+            sentinels (list): list of (host, port) tuples.
+            sentinel_kwargs (dict): Client constructor arguments to connect
+                to sentinels.
+            use_replicas (boolean): if False, replicas are ignored.
+            retry_reads (boolean): if True, read-only calls which fail with
+                a connection error are retried once.
+            watch_retry_delay (float): delay (in seconds) between two
+                attempts to subscribe to a sentinel.
+            watch_ping_interval (float): max delay (in seconds) without
+                message from the watched sentinel before sending a PING.
+            kwargs (dict): ReplicatedClientPool constructor arguments
+                (except primary and replicas) and ClientPool constructor
+                arguments (common to each node).
+        """
+        if 'primary' in kwargs or 'replicas' in kwargs:
+            raise Exception("primary and replicas are discovered here.")
+        self.service_name = service_name
+        self.sentinels = list(sentinels)
+        self.sentinel_kwargs = sentinel_kwargs or {}
+        self.use_replicas = use_replicas
+        self.retry_reads = retry_reads
+        self.watch_retry_delay = watch_retry_delay
+        self.watch_ping_interval = watch_ping_interval
+        self.__ioloop = kwargs.get('ioloop',
+                                   tornado.ioloop.IOLoop.instance())
+        self.__primary_node = None
+        self.__discovery = None
+        self.__watch_client = None
+        self.__closed = False
+        self.__failovers = 0
+        ReplicatedClientPool.__init__(self, **kwargs)
+        self.__ioloop.spawn_callback(self._watch)
+
+    def _sentinel_client(self, host, port, cls=Client):
+        kwargs = dict(self.sentinel_kwargs)
+        kwargs.update({"host": host, "port": port, "autoconnect": False,
+                       "ioloop": self.__ioloop})
+        return cls(**kwargs)
+
+    @tornado.gen.coroutine
+    def _ask_sentinel(self, host, port):
+        client = self._sentinel_client(host, port)
+        connected = yield client.connect()
+        if not connected:
+            raise tornado.gen.Return(None)
+        try:
+            primary = yield client.call("SENTINEL", "get-master-addr-by-name",
+                                        self.service_name)
+            if isinstance(primary, TornadisException) or primary is None:
+                LOG.warning("sentinel %s:%s doesn't know the primary of %s "
+                            "(%s)", host, port, self.service_name, primary)
+                raise tornado.gen.Return(None)
+            replicas = []
+            if self.use_replicas:
+                reply = yield client.call("SENTINEL", "replicas",
+                                          self.service_name)
+                if isinstance(reply, ClientError):
+                    # (sentinel < 5.0)
+                    reply = yield client.call("SENTINEL", "slaves",
+                                              self.service_name)
+                if not isinstance(reply, TornadisException):
+                    replicas = parse_sentinel_replicas(reply)
+        finally:
+            client.disconnect()
+        primary = {"host": _to_str(primary[0]), "port": int(primary[1])}
+        raise tornado.gen.Return((primary, replicas))
+
+    def discover(self):
+        """Asks sentinels for the current topology (and applies it).
+
+        Concurrent calls share the same discovery.
+
+        Returns:
+            a Future with True as result (or a ClientError object if no
+                sentinel answered).
+        """
+        if self.__discovery is None:
+            self.__discovery = self._discover()
+            self.__discovery.add_done_callback(self._discovery_done)
+        return self.__discovery
+
+    def _discovery_done(self, future):
+        self.__discovery = None
+
+    @tornado.gen.coroutine
+    def _discover(self):
+        for host, port in list(self.sentinels):
+            res = yield self._ask_sentinel(host, port)
+            if res is None:
+                continue
+            # the last sentinel which answered is asked first next time
+            self.sentinels.remove((host, port))
+            self.sentinels.insert(0, (host, port))
+            self._apply_topology(*res)
+            raise tornado.gen.Return(True)
+        raise tornado.gen.Return(ClientError("no sentinel answered for %s" %
+                                             self.service_name))
+
+    def _apply_topology(self, primary, replicas):
+        if self.__closed:
+            return
+        if self.__primary_node is not None and primary != self.__primary_node:
+            LOG.warning("%s: new primary %s:%s", self.service_name,
+                        primary["host"], primary["port"])
+            self.__failovers += 1
+        replicas = [r for r in replicas if r != primary]
+        self.__primary_node = primary
+        self.set_topology(primary, replicas)
+
+    @tornado.gen.coroutine
+    def _ready(self):
+        if self.__primary_node is not None:
+            raise tornado.gen.Return(True)
+        res = yield self.discover()
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def _watch(self):
+        while not self.__closed:
+            host, port = self.sentinels[0]
+            client = self._sentinel_client(host, port, cls=PubSubClient)
+            self.__watch_client = client
+            connected = yield client.connect()
+            subscribed = False
+            if connected and not self.__closed:
+                subscribed = yield client.pubsub_subscribe("+switch-master")
+            if subscribed:
+                # (the topology may have changed while we were not watching)
+                yield self.discover()
+                pinged = False
+                while not self.__closed:
+                    msg = yield client.pubsub_pop_message(
+                        deadline=self.watch_ping_interval)
+                    if isinstance(msg, TornadisException):
+                        break
+                    if msg is None:
+                        # (no message: a half-open connection is detected
+                        # with a PING which is never answered)
+                        if pinged or not client.pubsub_ping():
+                            break
+                        pinged = True
+                        continue
+                    pinged = False
+                    if len(msg) == 3:
+                        self._on_switch_master(msg[2])
+            client.disconnect()
+            self.__watch_client = None
+            if self.__closed:
+                break
+            LOG.warning("can't watch sentinel %s:%s", host, port)
+            # (let's try another sentinel)
+            self.sentinels.append(self.sentinels.pop(0))
+            yield tornado.gen.sleep(self.watch_retry_delay)
+
+    def _on_switch_master(self, payload):
+        res = parse_switch_master(payload)
+        if res is None or res[0] != self.service_name:
+            return
+        # the new primary is used immediately (without replicas until
+        # the discovery of the new topology)
+        self._apply_topology(res[1], [])
+        self.__ioloop.spawn_callback(self.discover)
+
+    @tornado.gen.coroutine
+    def call(self, *args, **kwargs):
+        """Calls a redis command on the primary or on a replica.
+
+        See :meth:`ReplicatedClientPool.call`.
+        """
+        ready = yield self._ready()
+        if isinstance(ready, TornadisException):
+            raise tornado.gen.Return(ready)
+        failovers = self.__failovers
+        res = yield ReplicatedClientPool.call(self, *args, **kwargs)
+        if is_failover_error(res):
+            if failovers == self.__failovers:
+                yield self.discover()
+            if self.retry_reads and is_readonly_call(args):
+                res = yield ReplicatedClientPool.call(self, *args, **kwargs)
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def get_connected_client(self):
+        """Gets a connected Client object (to the current primary).
+
+        See :meth:`ClientPool.get_connected_client`.
+        """
+        ready = yield self._ready()
+        if isinstance(ready, TornadisException):
+            raise tornado.gen.Return(ready)
+        res = yield ReplicatedClientPool.get_connected_client(self)
+        raise tornado.gen.Return(res)
+
+    @tornado.gen.coroutine
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction on the current primary.
+
+        See :meth:`ClientPool.transaction`.
+        """
+        ready = yield self._ready()
+        if isinstance(ready, TornadisException):
+            raise tornado.gen.Return(ready)
+        res = yield ReplicatedClientPool.transaction(self, fn, *watched_keys,
+                                                     **kwargs)
+        raise tornado.gen.Return(res)
+
+    def destroy(self):
+        """Stops watching sentinels and destroys all pools."""
+        self.__closed = True
+        if self.__watch_client is not None:
+            self.__watch_client.disconnect()
+        ReplicatedClientPool.destroy(self)
+
+    def stats(self):
+        """Returns some statistics about the pools.
+
+        Returns:
+            A dict with the keys of :meth:`ReplicatedClientPool.stats` and
+                primary_node (current primary) and failovers (number of
+                primary changes).
+        """
+        res = ReplicatedClientPool.stats(self)
+        res["primary_node"] = self.__primary_node
+        res["failovers"] = self.__failovers
+        return res
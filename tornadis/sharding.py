@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# This file is part of tornadis library released under the MIT license.
+# See the LICENSE file for more information.
+
+import tornado.gen
+import tornado.concurrent
+import bisect
+import functools
+import hashlib
+import random
+
+from tornadis.pool import ClientPool
+from tornadis.pipeline import Pipeline
+from tornadis.commands import command_keys
+from tornadis.hashing import hash_tag
+from tornadis.fanout import SplitCall, fanout
+from tornadis.exceptions import ClientError
+
+# error for commands whose keys belong to several shards
+CROSS_SHARD_ERROR = "keys of the command belong to several shards"
+
+
+def _md5(data):
+    return bytearray(hashlib.md5(data).digest())
+
+
+def _ketama_points(name, number):
+    # each md5 digest gives 4 points (ketama)
+    points = []
+    for i in range((number + 3) // 4):
+        digest = _md5(("%s-%i" % (name, i)).encode('utf-8'))
+        for j in range(4):
+            if len(points) < number:
+                points.append(_digest_point(digest, j))
+    return points
+
+
+def _digest_point(digest, index):
+    return (digest[3 + index * 4] << 24) | (digest[2 + index * 4] << 16) | \
+        (digest[1 + index * 4] << 8) | digest[index * 4]
+
+
+class HashRing(object):
+    """Ketama like consistent hash ring with virtual nodes and weights.
+
+    Each node gets vnodes * weight points on the ring (md5 based), a key
+    (its hash tag if any) belongs to the node of the first point after its
+    own hash. Adding or removing a node only remaps the keys of this node
+    (about 1/N of the keys).
+
+    Attributes:
+        vnodes (int): number of points (virtual nodes) for a weight of 1.
+        weights (dict): node name => weight.
+    """
+
+    def __init__(self, weights=None, vnodes=160):
+        """Constructor.
+
+        Args:
+            weights (dict): node name => weight (a number > 0).
+            vnodes (int): number of points (virtual nodes) for a weight
+                of 1.
+        """
+        self.vnodes = vnodes
+        self.weights = dict(weights or {})
+        self._build()
+
+    def _build(self):
+        ring = []
+        for name, weight in self.weights.items():
+            number = max(1, int(round(self.vnodes * weight)))
+            for point in _ketama_points(name, number):
+                ring.append((point, name))
+        # (ties are broken by name so the ring doesn't depend on the
+        # insertion order)
+        ring.sort()
+        self.__points = [x[0] for x in ring]
+        self.__names = [x[1] for x in ring]
+
+    def add_node(self, name, weight=1):
+        """Adds (or updates) a node.
+
+        Args:
+            name (string): the node name.
+            weight (float): the node weight.
+        """
+        self.weights[name] = weight
+        self._build()
+
+    def remove_node(self, name):
+        """Removes a node (if it exists).
+
+        Args:
+            name (string): the node name.
+        """
+        if self.weights.pop(name, None) is not None:
+            self._build()
+
+    def get_node(self, key):
+        """Returns the name of the node of a key.
+
+        Args:
+            key: the key (str, bytes or number).
+
+        Returns:
+            the node name (or None if the ring is empty).
+        """
+        if not self.__points:
+            return None
+        digest = _md5(hash_tag(key))
+        index = bisect.bisect(self.__points, _digest_point(digest, 0))
+        return self.__names[index % len(self.__names)]
+
+
+def _node_name(node):
+    return node.get("name", "%s:%s" % (node.get("host", "127.0.0.1"),
+                                       node.get("port", 6379)))
+
+
+class ShardedClient(object):
+    """Client-side sharding over several standalone redis servers.
+
+    Keys are distributed with a consistent hash ring (see HashRing): each
+    node is a ClientPool, hash tags ("{...}") can be used to store several
+    keys on the same node. Pipelines and multi-key commands (MGET, MSET,
+    DEL, UNLINK, EXISTS, TOUCH) over several shards are split per shard and
+    sent concurrently (see :class:`tornadis.fanout.SplitCall`).
+
+    Commands without key are sent to a random node, transactions and other
+    multi-key commands must use keys of a single shard.
+
+    Attributes:
+        ring (HashRing): the hash ring.
+        pool_kwargs (dict): ClientPool constructor arguments (common to
+            each node).
+    """
+
+    def __init__(self, nodes, vnodes=160, **pool_kwargs):
+        """Constructor.
+
+        Args:
+            nodes (list): list of dicts, ClientPool constructor arguments
+                specific to each node (for example: {"host": "10.0.0.1",
+                "port": 6379}) with two optional keys: name (the name of
+                the node on the ring, default: "host:port") and weight
+                (default: 1).
+            vnodes (int): number of points (virtual nodes) on the ring for
+                a weight of 1.
+            pool_kwargs (dict): ClientPool constructor arguments (common to
+                each node).
+        """
+        self.pool_kwargs = pool_kwargs
+        self.ring = HashRing(vnodes=vnodes)
+        self.__pools = {}
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        """Adds a node (about 1/N of the keys are remapped to it).
+
+        Args:
+            node (dict): ClientPool constructor arguments specific to the
+                node (and optional name and weight keys).
+
+        Returns:
+            the node name.
+        """
+        node = dict(node)
+        name = _node_name(node)
+        node.pop("name", None)
+        weight = node.pop("weight", 1)
+        kwargs = dict(self.pool_kwargs)
+        kwargs.update(node)
+        old = self.__pools.get(name)
+        self.__pools[name] = ClientPool(**kwargs)
+        if old is not None:
+            old.drain()
+        self.ring.add_node(name, weight)
+        return name
+
+    def remove_node(self, name):
+        """Removes a node (its keys are remapped to other nodes).
+
+        Args:
+            name (string): the node name.
+        """
+        self.ring.remove_node(name)
+        pool = self.__pools.pop(name, None)
+        if pool is not None:
+            pool.drain()
+
+    def get_node(self, key):
+        """Returns the name of the node of a key.
+
+        Args:
+            key: the key.
+        """
+        return self.ring.get_node(key)
+
+    def get_pool(self, key):
+        """Returns the ClientPool of the node of a key (or None).
+
+        Args:
+            key: the key.
+        """
+        return self.__pools.get(self.ring.get_node(key))
+
+    def _pool_of_node(self, name):
+        if name is None:
+            # (command without key)
+            name = random.choice(list(self.__pools.keys()))
+        return self.__pools[name]
+
+    @tornado.gen.coroutine
+    def call(self, *args, **kwargs):
+        """Calls a redis command on the node(s) of its keys.
+
+        See :meth:`Client.call` for arguments.
+
+        Returns:
+            a Future with the decoded redis reply as result (or a
+                TornadisException object in case of errors).
+        """
+        if len(self.__pools) == 0:
+            raise tornado.gen.Return(ClientError("no node"))
+        pipeline = len(args) == 1 and isinstance(args[0], Pipeline)
+        commands = args[0].pipelined_args if pipeline else [args]
+        names = set(self.ring.get_node(key) for command in commands
+                    for key in command_keys(command))
+        if len(names) <= 1:
+            pool = self._pool_of_node(names.pop() if names else None)
+            res = yield pool.call(*args, **kwargs)
+            raise tornado.gen.Return(res)
+        if pipeline and args[0].transaction:
+            raise tornado.gen.Return(ClientError(CROSS_SHARD_ERROR))
+        split = SplitCall(args, self.ring.get_node,
+                          error_message=CROSS_SHARD_ERROR)
+        replies = yield fanout(split, lambda name: name,
+                               functools.partial(self._node_call, kwargs))
+        raise tornado.gen.Return(split.merge(replies))
+
+    def _node_call(self, kwargs, name, pipeline):
+        return self._pool_of_node(name).call(pipeline, **kwargs)
+
+    def transaction(self, fn, *watched_keys, **kwargs):
+        """Executes an optimistic transaction on the node of watched keys.
+
+        All watched keys (and keys used by fn) must belong to the same
+        shard.
+
+        See :meth:`ClientPool.transaction` for arguments.
+        """
+        names = set(self.ring.get_node(key) for key in watched_keys)
+        if len(names) != 1 or None in names:
+            future = tornado.concurrent.Future()
+            future.set_result(ClientError(CROSS_SHARD_ERROR))
+            return future
+        return self.__pools[names.pop()].transaction(fn, *watched_keys,
+                                                     **kwargs)
+
+    def destroy(self):
+        """Disconnects all pooled client objects (of all nodes)."""
+        for pool in self.__pools.values():
+            pool.destroy()
+
+    def stats(self):
+        """Returns some statistics about node pools.
+
+        Returns:
+            A dict (node name => stats of the node pool, see
+                :meth:`ClientPool.stats`).
+        """
+        return dict((name, pool.stats())
+                    for name, pool in self.__pools.items())
@@ -5,10 +5,29 @@
 # See the LICENSE file for more information.
 
 
+import os
 import six
 from tornado.concurrent import Future
 import contextlib
 from tornadis.write_buffer import WriteBuffer
+from tornadis.file_argument import FileArgument
+
+
+if hasattr(os, "register_at_fork"):
+    # python >= 3.7: the pid is cached and updated after each fork
+    # (os.getpid() is a syscall)
+    _PID = [os.getpid()]
+
+    def _update_pid_after_fork():
+        _PID[0] = os.getpid()
+
+    os.register_at_fork(after_in_child=_update_pid_after_fork)
+
+    def get_pid():
+        """Returns the current process id (cached)."""
+        return _PID[0]
+else:  # pragma: no cover
+    get_pid = os.getpid
 
 
 def format_args_in_redis_protocol(*args):
@@ -58,6 +77,9 @@ def format_args_in_redis_protocol(*args):
         elif isinstance(arg, WriteBuffer):
             # it's a WriteBuffer object => nothing to do
             pass
+        elif isinstance(arg, FileArgument):
+            # it's a file => memoryview over a memory mapping (without copy)
+            arg = arg.get_buffer()
         else:
             raise Exception("don't know what to do with %s" % type(arg))
         l = "$%d\r\n" % len(arg)  # noqa: E741